@@ -0,0 +1,55 @@
+import logging
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_api'))
+import api_logging
+
+
+def time_calls(fn, n):
+    latencies = np.empty(n)
+    for i in range(n):
+        start = time.perf_counter()
+        fn()
+        latencies[i] = time.perf_counter() - start
+    return latencies
+
+
+def report(name, latencies):
+    print(f"{name:<34} mean {latencies.mean() * 1e6:8.2f} us   p99 {np.percentile(latencies, 99) * 1e6:8.2f} us")
+
+
+def run(n=20000):
+    data = {'data': np.random.rand(194).tolist()}
+    probabilities = [[1.0]]
+    tmp_dir = tempfile.mkdtemp()
+
+    # Previous behaviour: two f-string INFO records per request on a synchronous file handler
+    legacy = logging.getLogger('legacy')
+    legacy.propagate = False
+    legacy.setLevel(logging.INFO)
+    handler = logging.FileHandler(os.path.join(tmp_dir, 'legacy.log'))
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    legacy.addHandler(handler)
+
+    def legacy_request():
+        legacy.info(f"Fraud prediction request received with data: {data}")
+        legacy.info(f"Fraud prediction probabilities: {probabilities}")
+
+    api_logging.setup_logging(os.path.join(tmp_dir, 'app.log'))
+    logger = logging.getLogger('serve_model')
+
+    def sampled_request():
+        api_logging.log_prediction(logger, 'fraud_model', data, probabilities)
+
+    report("sync file handler + f-strings", time_calls(legacy_request, n))
+    for rate in (1.0, 0.01, 0.0):
+        api_logging.payload_sample_rate = rate
+        report(f"queue handler, sample rate {rate}", time_calls(sampled_request, n))
+
+
+if __name__ == '__main__':
+    run()
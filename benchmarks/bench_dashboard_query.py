@@ -0,0 +1,98 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dashboard'))
+from query_engine import FraudQueryEngine
+from aggregates import build_aggregates
+from benchmarks.synthetic import make_fraud_data
+
+QUERIES = [
+    ('full range', {}),
+    ('one month', {'start_date': '2015-06-01', 'end_date': '2015-06-30'}),
+    ('one week, 3 countries', {'start_date': '2015-06-01', 'end_date': '2015-06-07',
+                               'countries': ['United States', 'China', 'Japan']}),
+    ('browser + source', {'browsers': ['Chrome'], 'sources': ['SEO', 'Ads']}),
+    ('quarter, all filters', {'start_date': '2015-04-01', 'end_date': '2015-06-30',
+                              'countries': ['United States'], 'browsers': ['Chrome', 'Safari'], 'sources': ['Ads']}),
+]
+
+
+def make_processed(n_rows):
+    """
+    A frame shaped like process_ecommerce_data's output.
+    """
+    fraud_data = make_fraud_data(n_rows, n_users=n_rows)
+    fraud_data['purchase_time'] = pd.to_datetime(fraud_data['purchase_time'])
+    fraud_data['purchase_day'] = fraud_data['purchase_time'].dt.day_name()
+    fraud_data['purchase_hour'] = fraud_data['purchase_time'].dt.hour
+    return fraud_data
+
+
+def filter_frame(frame, start_date=None, end_date=None, countries=None, browsers=None, sources=None):
+    mask = np.ones(len(frame), dtype=bool)
+    if start_date:
+        mask &= frame['purchase_time'] >= pd.Timestamp(start_date)
+    if end_date:
+        mask &= frame['purchase_time'] < pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    for column, values in (('country', countries), ('browser', browsers), ('source', sources)):
+        if values:
+            mask &= frame[column].isin(values)
+    return frame[mask]
+
+
+def check_parity(engine, frame):
+    """
+    Assert that every benchmark query matches build_aggregates on the filtered frame.
+    """
+    credit_data = pd.DataFrame({'Class': [0, 1]})
+    for name, filters in QUERIES:
+        result = engine.query(**filters)
+        expected = build_aggregates(filter_frame(frame, **filters), credit_data)
+        for key in ('daily_fraud', 'country_fraud'):
+            pd.testing.assert_frame_equal(result[key].reset_index(drop=True), expected[key].reset_index(drop=True),
+                                          check_dtype=False, obj=f"{name}: {key}")
+        pd.testing.assert_frame_equal(result['browser_class'], expected['browser_class'], check_dtype=False,
+                                      check_names=False, check_column_type=False, obj=f"{name}: browser_class")
+        for key in ('top_fraud', 'top_rate', 'histogram'):
+            pd.testing.assert_frame_equal(result['devices'][key], expected['devices'][key], check_dtype=False,
+                                          obj=f"{name}: devices {key}")
+        for key in ('hour_fraud', 'day_fraud'):
+            pd.testing.assert_series_equal(result[key], expected[key], check_dtype=False, check_index_type=False,
+                                           obj=f"{name}: {key}")
+        for key in ('total_transactions', 'fraud_cases'):
+            assert result['ecom_stats'][key] == expected['ecom_stats'][key], f"{name}: {key}"
+
+
+def run(n_rows, parity_rows=200_000):
+    engine = FraudQueryEngine.from_frame(make_processed(parity_rows))
+    check_parity(engine, make_processed(parity_rows))
+    print(f"Parity with the pandas aggregates: OK ({parity_rows:,} rows, {len(QUERIES)} queries)")
+
+    frame = make_processed(n_rows)
+    start = time.perf_counter()
+    engine = FraudQueryEngine.from_frame(frame)
+    print(f"Rows: {n_rows:,}  engine build: {time.perf_counter() - start:.1f}s")
+    print(f"{'query':24s} {'rows':>12s} {'first ms':>10s} {'cached ms':>10s} {'pandas ms':>10s}")
+    for name, filters in QUERIES:
+        start = time.perf_counter()
+        result = engine.query(**filters)
+        first = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        engine.query(**filters)
+        cached = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        build_aggregates(filter_frame(frame, **filters), pd.DataFrame({'Class': [0, 1]}))
+        baseline = (time.perf_counter() - start) * 1000
+        print(f"{name:24s} {result['ecom_stats']['total_transactions']:12,} {first:10.1f} {cached:10.3f} {baseline:10.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Dashboard query engine parity and latency.")
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    args = parser.parse_args()
+    run(args.rows)
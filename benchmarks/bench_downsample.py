@@ -0,0 +1,81 @@
+import argparse
+import io
+import os
+import sys
+import time
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dashboard'))
+from downsample import downsample, render_mode
+from scripts import EDA
+from benchmarks.synthetic import make_fraud_data
+
+
+def line_payload(frame, budget, method):
+    """
+    Seconds to build the fraud-over-time figure and serialize it, and the payload size in bytes.
+    """
+    start = time.perf_counter()
+    points = downsample(frame, 'purchase_time', 'class', budget, method)
+    payload = px.line(points, x='purchase_time', y='class', render_mode=render_mode(len(points))).to_json()
+    return time.perf_counter() - start, len(payload), len(points)
+
+
+def scatter_render(fraud_data, budget):
+    """
+    Seconds to draw the purchase_value vs age panel and render it to PNG.
+    """
+    EDA.scatter_point_budget = budget
+    start = time.perf_counter()
+    fig, ax = plt.subplots(figsize=(8, 6))
+    EDA.scatter_by_class(fraud_data, 'purchase_value', 'age', ax, 'viridis', 0.7)
+    fig.savefig(io.BytesIO(), format='png')
+    plt.close(fig)
+    return time.perf_counter() - start
+
+
+def check_extremes(frame, budget):
+    """
+    Min-max downsampling must keep the global extremes; LTTB must keep the first and last points.
+    """
+    values = frame['class'].to_numpy()
+    minmax = downsample(frame, 'purchase_time', 'class', budget, 'minmax')['class']
+    assert minmax.max() == values.max() and minmax.min() == values.min(), "minmax dropped an extreme"
+    lttb = downsample(frame, 'purchase_time', 'class', budget, 'lttb')
+    assert len(lttb) == budget and lttb.index[0] == frame.index[0] and lttb.index[-1] == frame.index[-1]
+
+
+def run(n_points, n_rows, budget):
+    rng = np.random.default_rng(0)
+    # A per-second fraud count series, far finer than the dashboard's daily one
+    series = pd.DataFrame({
+        'purchase_time': pd.date_range('2015-01-01', periods=n_points, freq='s'),
+        'class': rng.poisson(2, n_points) + (rng.random(n_points) < 1e-4) * 50,
+    })
+    check_extremes(series, budget)
+    print(f"Line chart, {n_points:,} points, budget {budget:,}")
+    print(f"{'method':10s} {'points':>10s} {'payload MB':>11s} {'build s':>8s}")
+    for method, method_budget in (('none', 0), ('lttb', budget), ('minmax', budget)):
+        seconds, size, points = line_payload(series, method_budget, method if method_budget else None)
+        print(f"{method:10s} {points:10,} {size / 1e6:11.2f} {seconds:8.2f}")
+
+    fraud_data = make_fraud_data(n_rows)
+    print(f"\nScatter, {n_rows:,} rows")
+    print(f"{'mode':10s} {'render s':>9s}")
+    print(f"{'scatter':10s} {scatter_render(fraud_data, n_rows):9.2f}")
+    print(f"{'hexbin':10s} {scatter_render(fraud_data, 0):9.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Downsampled line charts and binned scatter plots.")
+    parser.add_argument('--points', type=int, default=1_000_000)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--budget', type=int, default=2000)
+    args = parser.parse_args()
+    run(args.points, args.rows, args.budget)
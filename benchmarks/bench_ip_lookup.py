@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import socket
+import struct
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.ip_index import IpRangeIndex, normalize_ips
+from benchmarks.synthetic import make_ip_to_country, make_ips
+
+
+def legacy_map_ip_to_country(ips, ip_to_country):
+    """
+    The previous per-row scan from EDA.map_ip_to_country, kept for comparison.
+    """
+    def find_country_by_ip(ip):
+        matched_row = ip_to_country[(ip >= ip_to_country['lower_bound_ip_address']) &
+                                   (ip <= ip_to_country['upper_bound_ip_address'])]
+        if not matched_row.empty:
+            return matched_row['country'].values[0]
+        else:
+            return 'Unknown'
+
+    return pd.Series(ips).astype(int).apply(find_country_by_ip).to_numpy()
+
+
+def legacy_ip_to_int(ips):
+    """
+    The previous per-row conversion from the dashboard's process_ecommerce_data.
+    """
+    def ip_to_int(ip):
+        try:
+            return struct.unpack("!I", socket.inet_aton(ip))[0]
+        except socket.error:
+            return None
+    ints = pd.Series(ips).apply(lambda x: ip_to_int(str(int(x))) if isinstance(x, float) else ip_to_int(x))
+    return ints.fillna(-1).to_numpy(dtype=np.int64)
+
+
+def run_normalize(ips):
+    float_ips = ips.astype(float)
+    # Out-of-range IPs have no dotted form; both conversions must reject the empty string
+    dotted = np.array([socket.inet_ntoa(struct.pack("!I", ip)) if 0 <= ip < 2 ** 32 else ''
+                       for ip in ips.astype(np.int64)], dtype=object)
+    print(f"{'IP conversion':24s} {'per-row s':>10s} {'vectorized s':>13s}")
+    for name, values in (('float', float_ips), ('dotted quad', dotted)):
+        start = time.perf_counter()
+        legacy = legacy_ip_to_int(values)
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        normalized = normalize_ips(values)
+        vectorized_time = time.perf_counter() - start
+        assert (legacy == normalized).all(), f"normalize_ips disagrees on {name} IPs"
+        print(f"{name:24s} {legacy_time:10.3f} {vectorized_time:13.3f}")
+
+
+def run(n_ips=1_000_000, n_legacy=2_000, n_ranges=138846):
+    ip_to_country = make_ip_to_country(n_ranges)
+    ips = make_ips(n_ips, ip_to_country)
+
+    start = time.perf_counter()
+    ip_index = IpRangeIndex.from_frame(ip_to_country)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    countries = ip_index.lookup(ips.astype(np.int64))
+    index_time = time.perf_counter() - start
+
+    # The legacy scan is far too slow for the full batch; time a sample and extrapolate
+    start = time.perf_counter()
+    legacy = legacy_map_ip_to_country(ips[:n_legacy], ip_to_country)
+    legacy_time = (time.perf_counter() - start) * n_ips / n_legacy
+
+    assert (legacy == countries[:n_legacy]).all(), "Index lookup disagrees with legacy scan"
+
+    print(f"Ranges: {n_ranges:,}  IPs: {n_ips:,}")
+    print(f"Index build:            {build_time:8.3f} s")
+    print(f"Index lookup:           {index_time:8.3f} s")
+    print(f"Legacy scan (estimated): {legacy_time:8.1f} s  (from {n_legacy:,} IPs)")
+    print(f"Speedup:                {legacy_time / index_time:8.0f}x")
+    print()
+    run_normalize(ips)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,223 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts import EDA, FE, data_preprocessing
+from scripts.ip_index import IpRangeIndex
+from benchmarks.synthetic import add_duplicates, make_creditcard_data, make_fraud_data, make_ip_to_country
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+history_path = os.path.join(ROOT, 'benchmarks', 'results', 'pipeline_history.json')
+
+# Stages whose input doesn't grow with --rows (the range table is always 138,846 ranges): their
+# times are still compared across commits, but a rows scaling exponent would be meaningless
+FIXED_SIZE_STAGES = {'ip_index.build'}
+
+
+def make_datasets(n_rows):
+    """
+    Fraud_Data and creditcard frames of n_rows rows (plus 1% duplicated rows) and the IP range table.
+    The range table keeps the real table's 138,846 ranges at every size: it covers the IPv4 space.
+    """
+    return {
+        'fraud': add_duplicates(make_fraud_data(n_rows, with_country=False)),
+        'creditcard': add_duplicates(make_creditcard_data(n_rows)),
+        'ip_to_country': make_ip_to_country(),
+    }
+
+
+def make_cases(datasets, workdir):
+    """
+    (name, setup, function) per benchmarked stage. setup() builds fresh arguments outside the
+    measurement, since the pipeline functions modify their input frames.
+    """
+    fraud, creditcard, ip_to_country = datasets['fraud'], datasets['creditcard'], datasets['ip_to_country']
+    ip_index = IpRangeIndex.from_frame(ip_to_country)
+    mapped = EDA.map_ip_to_country(fraud.copy(), ip_index)
+    output = os.path.join(workdir, 'features.feather')
+
+    def feature_engineering(frame):
+        FE.feature_engineering(frame, output)
+        # feature_engineering logs errors instead of raising them
+        if not os.path.exists(output):
+            raise RuntimeError("FE.feature_engineering wrote no output; see logs/feature_engineering.log")
+        os.remove(output)
+
+    return [
+        ('check_duplicates', lambda: (fraud, creditcard, ip_to_country), data_preprocessing.check_duplicates),
+        ('ip_index.build', lambda: (ip_to_country,), IpRangeIndex.from_frame),
+        ('map_ip_to_country', lambda: (fraud.copy(), ip_index), EDA.map_ip_to_country),
+        ('feature_engineering', lambda: (mapped.copy(),), feature_engineering),
+    ]
+
+
+def measure(setup, function, repeat):
+    """
+    Best wall time of `repeat` calls, then the peak traced allocation (MB) of one more call.
+    Memory is traced in a separate call so that tracemalloc's overhead stays out of the timings.
+    """
+    seconds = []
+    for _ in range(repeat):
+        args = setup()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            function(*args)
+            seconds.append(time.perf_counter() - start)
+        del args
+
+    args = setup()
+    tracemalloc.start()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(seconds), peak / 1e6
+
+
+def git_commit():
+    """
+    The checked-out commit, suffixed with '-dirty' when the working tree has uncommitted changes.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + '-dirty' if status else commit
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_history(history, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(history, f, indent=2)
+
+
+def previous_run(history, commit):
+    """
+    The most recent run recorded for another commit, or None.
+    """
+    runs = [run for key, run in history.items() if key != commit]
+    return max(runs, key=lambda run: run['created']) if runs else None
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Regressions of results against a baseline run, matched by stage and row count: wall time or
+    peak memory more than `tolerance` (relative) higher.
+    """
+    before = {(r['stage'], r['rows']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        previous = before.get((result['stage'], result['rows']))
+        if previous is None:
+            continue
+        for key, unit in (('seconds', 's'), ('peak_mb', 'MB')):
+            if previous[key] and result[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{result['stage']} at {result['rows']:,} rows: {key} {result[key]:.3f} {unit} "
+                                   f"vs {previous[key]:.3f} {unit} at {baseline['commit']}")
+    return regressions
+
+
+def scaling(results):
+    """
+    Per stage, the exponent k in time ~ rows**k between consecutive sizes; 1 is linear scaling.
+    Stages in FIXED_SIZE_STAGES are left out.
+    """
+    exponents = {}
+    for stage in dict.fromkeys(r['stage'] for r in results if r['stage'] not in FIXED_SIZE_STAGES):
+        points = sorted((r['rows'], r['seconds']) for r in results if r['stage'] == stage)
+        exponents[stage] = [math.log(t2 / t1) / math.log(n2 / n1)
+                            for (n1, t1), (n2, t2) in zip(points, points[1:]) if t1 > 0 and n2 > n1]
+    return exponents
+
+
+def print_results(results, baseline):
+    before = {(r['stage'], r['rows']): r for r in baseline['results']} if baseline else {}
+    print(f"{'stage':20s} {'rows':>11s} {'seconds':>9s} {'us/row':>8s} {'peak MB':>9s} {'vs prev':>8s}")
+    for r in results:
+        previous = before.get((r['stage'], r['rows']))
+        change = f"{r['seconds'] / previous['seconds']:7.2f}x" if previous and previous['seconds'] else f"{'-':>8s}"
+        print(f"{r['stage']:20s} {r['rows']:11,} {r['seconds']:9.3f} {r['seconds'] / r['rows'] * 1e6:8.2f} "
+              f"{r['peak_mb']:9.1f} {change}")
+    for stage, exponents in scaling(results).items():
+        if exponents:
+            print(f"Scaling of {stage}: time ~ rows^" + ", rows^".join(f"{k:.2f}" for k in exponents))
+
+
+def run(sizes, repeat, stages, history_file, tolerance):
+    workdir = tempfile.mkdtemp()
+    results = []
+    try:
+        for n_rows in sizes:
+            datasets = make_datasets(n_rows)
+            for stage, setup, function in make_cases(datasets, workdir):
+                if stages and stage not in stages:
+                    continue
+                seconds, peak_mb = measure(setup, function, repeat if n_rows < 5_000_000 else 1)
+                results.append({'stage': stage, 'rows': n_rows, 'seconds': seconds, 'peak_mb': peak_mb})
+                print(f"{stage} at {n_rows:,} rows: {seconds:.3f} s, {peak_mb:.1f} MB")
+            del datasets
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    commit = git_commit()
+    history = load_history(history_file)
+    baseline = previous_run(history, commit)
+    print(f"\nCommit {commit}" + (f", compared with {baseline['commit']}" if baseline else ""))
+    print_results(results, baseline)
+
+    # Re-running on the same commit replaces that commit's measurements for the stages and sizes run
+    recorded = history.get(commit, {}).get('results', [])
+    measured = {(r['stage'], r['rows']) for r in results}
+    history[commit] = {
+        'commit': commit,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'results': [r for r in recorded if (r['stage'], r['rows']) not in measured] + results,
+    }
+    save_history(history, history_file)
+    print(f"Recorded in {history_file}")
+
+    regressions = compare(results, baseline, tolerance) if baseline else []
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time and memory of the scripts/ pipeline stages, tracked per commit.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 1_000_000],
+                        help="Fraud_Data / creditcard sizes, e.g. 10000 1000000 10000000")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed calls per stage; the best is kept")
+    parser.add_argument('--stage', action='append', default=[],
+                        help="Only run this stage (repeatable): check_duplicates, ip_index.build, "
+                             "map_ip_to_country, feature_engineering")
+    parser.add_argument('--history', default=history_path, help="JSON file of past runs, keyed by commit")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative time/memory increase")
+    args = parser.parse_args()
+    sys.exit(1 if run(sorted(args.rows), args.repeat, args.stage, args.history, args.tolerance) else 0)
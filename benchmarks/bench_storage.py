@@ -0,0 +1,71 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.storage import save_table, read_table, apply_types
+from benchmarks.synthetic import make_fraud_data
+
+
+def size_on_disk(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path)
+
+
+def timed(function, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(n_rows=1_000_000):
+    fraud_data = make_fraud_data(n_rows)
+    directory = tempfile.mkdtemp(prefix='bench_storage_')
+    paths = {
+        'csv': os.path.join(directory, 'fraud_data.csv'),
+        'parquet (by month)': os.path.join(directory, 'fraud_data.parquet'),
+        'feather': os.path.join(directory, 'fraud_data.feather'),
+    }
+    june = [('purchase_time', '>=', pd.Timestamp('2015-06-01')), ('purchase_time', '<', pd.Timestamp('2015-07-01'))]
+    projection = ['purchase_time', 'purchase_value', 'class']
+
+    try:
+        for path in paths.values():
+            save_table(fraud_data, path)
+
+        # The CSV timings include the type conversions every consumer of the CSV has to redo
+        def load_csv(columns=None):
+            return apply_types(pd.read_csv(paths['csv'], usecols=columns))
+
+        def filter_csv():
+            frame = load_csv()
+            return frame[(frame['purchase_time'] >= june[0][2]) & (frame['purchase_time'] < june[1][2])]
+
+        print(f"Rows: {n_rows:,}")
+        print(f"{'format':20s} {'size MB':>8s} {'full load s':>12s} {'3 columns s':>12s} {'one month s':>12s}")
+        for name, path in paths.items():
+            if name == 'csv':
+                full_time, full = timed(load_csv)
+                projection_time, _ = timed(lambda: load_csv(projection))
+                filter_time, month = timed(filter_csv)
+            else:
+                full_time, full = timed(lambda: read_table(path))
+                projection_time, _ = timed(lambda: read_table(path, columns=projection))
+                filter_time, month = timed(lambda: read_table(path, filters=june))
+            assert len(full) == n_rows
+            print(f"{name:20s} {size_on_disk(path) / 2**20:8.1f} {full_time:12.3f} {projection_time:12.3f} "
+                  f"{filter_time:12.3f}   ({len(month):,} rows in June; "
+                  f"purchase_time {full['purchase_time'].dtype}, source {full['source'].dtype})")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_api'))
+from inference import input_size, fraud_model_path, load_fraud_model, fraud_predictor
+from stream_score import NdjsonSink, QueueSource, SlidingWindowCounter, StreamScorer
+from scripts.feature_transformer import FraudFeatureTransformer
+from scripts.ip_index import IpRangeIndex
+from scripts.user_state import check_parity, series_to_ns
+from benchmarks.synthetic import make_fraud_data, make_ip_to_country
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_stream(n_rows, seed=3):
+    """
+    Raw transactions in purchase order, the IP range table, and a transformer fitted so that it
+    produces the fraud model's input_size features.
+    """
+    # 7 numeric columns + (3 - 1) sources + (5 - 1) browsers + (countries - 1) = input_size
+    countries = [f"Country {i:03d}" for i in range(input_size - 12)]
+    rng = np.random.default_rng(seed)
+    ip_to_country = make_ip_to_country()
+    ip_to_country['country'] = rng.choice(countries, size=len(ip_to_country))
+
+    training = make_fraud_data(20_000, with_country=False, seed=seed)
+    training['country'] = rng.choice(countries, size=len(training))
+    transformer = FraudFeatureTransformer().fit(training)
+    assert transformer.n_features_ == input_size, transformer.n_features_
+
+    # Few users and devices, so the sliding windows see repeat activity
+    stream = make_fraud_data(n_rows, n_users=max(1, n_rows // 20), with_country=False, seed=seed + 1)
+    stream['device_id'] = np.char.add('DEV', rng.integers(0, max(1, n_rows // 20), size=n_rows).astype(str))
+    stream = stream.sort_values('purchase_time', kind='stable').reset_index(drop=True)
+    return stream.drop(columns='class'), ip_to_country, transformer
+
+
+def check_windows(stream, window_seconds):
+    """
+    Assert that SlidingWindowCounter matches a pandas rolling count per user.
+    """
+    counter = SlidingWindowCounter(window_seconds)
+    times = series_to_ns(stream['purchase_time'])
+    counts = np.fromiter((counter.add(user_id, t) for user_id, t in zip(stream['user_id'].tolist(), times.tolist())),
+                         dtype=np.int64, count=len(stream))
+    frame = pd.DataFrame({'user_id': stream['user_id'], 'time': pd.to_datetime(stream['purchase_time']), 'one': 1})
+    grouped = frame.groupby('user_id')
+    # The rolling result comes back group by group, in the groups' row order
+    expected = np.empty(len(stream), dtype=np.int64)
+    expected[np.concatenate(list(grouped.indices.values()))] = \
+        grouped.rolling(f'{int(window_seconds)}s', on='time')['one'].sum().to_numpy()
+    assert np.array_equal(counts, expected), "Sliding window counts differ from the pandas rolling count"
+
+
+def run(n_rows, batch_size, max_wait_ms, window_seconds):
+    stream, ip_to_country, transformer = make_stream(n_rows)
+    check_windows(stream.iloc[:50_000], window_seconds)
+    print(f"Window counts match pandas rolling counts ({min(n_rows, 50_000):,} rows)")
+
+    lines = [json.dumps(record).encode() for record in stream.to_dict('records')]
+    source = QueueSource(queue.Queue(maxsize=10 * batch_size))
+    model = load_fraud_model(os.path.join(ROOT, fraud_model_path))
+    sink = NdjsonSink(os.devnull)
+    try:
+        scorer = StreamScorer(source, sink, transformer, fraud_predictor(model), IpRangeIndex.from_frame(ip_to_country),
+                              window_seconds=window_seconds, batch_size=batch_size, max_wait_ms=max_wait_ms,
+                              snapshot_interval=0)
+
+        # Replay as fast as the scorer takes it; the bounded queue applies backpressure
+        def replay():
+            for line in lines:
+                source.queue.put(line)
+            source.queue.put(None)
+
+        producer = threading.Thread(target=replay)
+        start = time.perf_counter()
+        producer.start()
+        scorer.run()
+        elapsed = time.perf_counter() - start
+        producer.join()
+    finally:
+        sink.close()
+
+    check_parity(stream, scorer.user_state)
+    stats = scorer.stats()
+    print("User state matches the batch transaction_frequency / transaction_velocity")
+    print(f"Rows: {n_rows:,}  batch size: {batch_size}  max wait: {max_wait_ms} ms  window: {window_seconds:.0f} s")
+    print(f"Throughput: {n_rows / elapsed:,.0f} transactions/s ({elapsed:.1f} s)")
+    print(f"Micro-batch latency: p50 {stats['batch_p50_ms']:.1f} ms, p99 {stats['batch_p99_ms']:.1f} ms over {stats['batches']:,} batches")
+    print(f"Alerts: {stats['alerts']:,} {stats['alert_reasons']}")
+    print(f"Still in the window after eviction: {stats['tracked_users']:,} users, {stats['tracked_devices']:,} devices")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay benchmark for the streaming fraud scorer.")
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=50)
+    parser.add_argument('--window-seconds', type=float, default=86_400)
+    args = parser.parse_args()
+    run(args.rows, args.batch_size, args.max_wait_ms, args.window_seconds)
@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+import warnings
+import joblib
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_api'))
+from inference import creditcard_model_path
+from tree_scorer import CompiledTree, check_parity
+
+
+def make_features(model, n, seed=0):
+    """
+    Random rows spread around each feature's split thresholds so every branch gets exercised.
+    """
+    rng = np.random.default_rng(seed)
+    tree = model.tree_
+    X = rng.standard_normal((n, model.n_features_in_))
+    for feature in np.unique(tree.feature[tree.feature >= 0]):
+        thresholds = tree.threshold[tree.feature == feature]
+        low, high = thresholds.min(), thresholds.max()
+        margin = max(high - low, abs(high), 1.0) * 0.5
+        X[:, feature] = rng.uniform(low - margin, high + margin, n)
+    return X.astype(np.float32)
+
+
+def time_calls(fn, n):
+    latencies = np.empty(n)
+    for i in range(n):
+        start = time.perf_counter()
+        fn()
+        latencies[i] = time.perf_counter() - start
+    return latencies
+
+
+def run(n_rows=1_000_000, n_single=5_000, path=creditcard_model_path):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # Pickled with an older scikit-learn
+        model = joblib.load(path)
+    compiled = CompiledTree.from_sklearn(model)
+    X = make_features(model, n_rows)
+    check_parity(model, compiled, X)
+
+    print(f"Tree: {model.tree_.node_count} nodes, depth {model.tree_.max_depth}, "
+          f"{model.n_features_in_} features")
+    print(f"Leaves reached: {len(np.unique(compiled.apply(X)))}")
+
+    row = X[:1]
+    for name, fn in (('sklearn predict_proba', lambda: model.predict_proba(row)),
+                     ('compiled predict_proba', lambda: compiled.predict_proba(row))):
+        latencies = time_calls(fn, n_single)
+        print(f"Single row, {name:<24} mean {latencies.mean() * 1e6:8.2f} us   "
+              f"p99 {np.percentile(latencies, 99) * 1e6:8.2f} us")
+
+    for batch_size in (64, 4096, n_rows):
+        batch = X[:batch_size]
+        repeats = max(1, 100_000 // batch_size)
+        sklearn_time = time_calls(lambda: model.predict_proba(batch), repeats).mean()
+        compiled_time = time_calls(lambda: compiled.predict_proba(batch), repeats).mean()
+        print(f"Batch {batch_size:>9,}: sklearn {sklearn_time * 1e3:9.3f} ms   compiled {compiled_time * 1e3:9.3f} ms"
+              f"   ({sklearn_time / compiled_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    run()
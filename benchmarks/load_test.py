@@ -0,0 +1,325 @@
+"""
+Load test and latency benchmark for the model API.
+
+Replays a request corpus against a running API (--url) or a local serve_model.py started for the run
+(--start). Two load models are supported:
+
+- open loop (--rate): requests are scheduled at a fixed arrival rate whatever the server does, and
+  latency is measured from the scheduled send time, so queueing behind a slow server is counted
+  instead of hidden;
+- closed loop (--concurrency): that many clients send requests back to back, which measures the
+  maximum throughput.
+
+Corpora: 'fraud' (random 194-feature vectors for /predict/fraud), 'creditcard' (random vectors for
+/predict/creditcard) or a JSON-lines file. Each file line is either {"path": ..., "body": ...} or a
+bare request body, routed by its key: 'data' to /predict/fraud, 'features' to /predict/creditcard and
+'transactions' to /predict/fraud/transaction. Lines that are not request bodies are skipped.
+
+Results (throughput, p50/p95/p99/p99.9 latency, error rate per scenario) are printed and saved as
+JSON with --output. With --baseline, the run fails (exit code 1) when a scenario's p50 or p99
+latency is more than --tolerance worse than in the baseline file, or its error rate is higher.
+
+    python benchmarks/load_test.py --start --corpus fraud --rate 50 --rate 200 --concurrency 8 \\
+        --duration 10 --output results.json --baseline baseline.json
+"""
+import argparse
+import http.client
+import json
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Input widths of the served models: inference.input_size and len(inference.CREDITCARD_FEATURES)
+FRAUD_FEATURES = 194
+CREDITCARD_FEATURES = 32
+
+ROUTES = {'data': '/predict/fraud', 'features': '/predict/creditcard', 'transactions': '/predict/fraud/transaction'}
+
+PERCENTILES = {'p50': 50, 'p95': 95, 'p99': 99, 'p999': 99.9}
+
+
+def synthetic_corpus(kind, size, seed=0):
+    """
+    (path, body) pairs of distinct random feature vectors for one model.
+    """
+    rng = np.random.default_rng(seed)
+    if kind == 'fraud':
+        rows = rng.standard_normal((size, FRAUD_FEATURES)).astype(np.float32)
+        return [('/predict/fraud', json.dumps({'data': row.tolist()}).encode()) for row in rows]
+    rows = rng.standard_normal((size, CREDITCARD_FEATURES))
+    return [('/predict/creditcard', json.dumps({'features': row.tolist()}).encode()) for row in rows]
+
+
+def load_corpus(path):
+    """
+    (path, body) pairs from a JSON-lines file, and the number of lines that weren't requests.
+    """
+    corpus, skipped = [], 0
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                skipped += 1
+                continue
+            if isinstance(record, dict) and 'path' in record and 'body' in record:
+                corpus.append((record['path'], json.dumps(record['body']).encode()))
+                continue
+            key = next((key for key in ROUTES if isinstance(record, dict) and key in record), None)
+            if key is None:
+                skipped += 1
+                continue
+            corpus.append((ROUTES[key], json.dumps(record).encode()))
+    return corpus, skipped
+
+
+class Client:
+    """
+    One keep-alive HTTP connection; reconnects after an error.
+    """
+
+    def __init__(self, url, timeout):
+        parsed = urllib.parse.urlsplit(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.timeout = timeout
+        self.connection = None
+
+    def post(self, path, body):
+        """
+        Send one request and return True if it succeeded (2xx).
+        """
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.connection.request('POST', path, body, {'Content-Type': 'application/json'})
+            response = self.connection.getresponse()
+            response.read()
+            return 200 <= response.status < 300
+        except (OSError, http.client.HTTPException):
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = None
+            return False
+
+
+def summarize(name, latencies, errors, elapsed, **config):
+    latencies = np.asarray(latencies) * 1000
+    total = len(latencies)
+    result = dict(name=name, **config, requests=total, errors=int(errors),
+                  error_rate=round(errors / total, 6) if total else 0.0,
+                  throughput=round(total / elapsed, 2) if elapsed else 0.0)
+    for label, q in PERCENTILES.items():
+        result[f'{label}_ms'] = round(float(np.percentile(latencies, q)), 3) if total else None
+    return result
+
+
+def run_open_loop(url, corpus, rate, duration, connections=64, timeout=30, seed=0):
+    """
+    Send requests at `rate` per second with Poisson arrivals for `duration` seconds.
+    """
+    rng = np.random.default_rng(seed)
+    n_requests = max(1, int(rate * duration))
+    offsets = np.cumsum(rng.exponential(1 / rate, n_requests))
+    scheduled = queue.Queue()
+    latencies, errors, lock = [], [0], threading.Lock()
+
+    def worker():
+        client = Client(url, timeout)
+        while True:
+            item = scheduled.get()
+            if item is None:
+                return
+            send_at, (path, body) = item
+            delay = send_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            ok = client.post(path, body)
+            # Measured from the scheduled time, so waiting for a free connection counts too
+            latency = time.perf_counter() - send_at
+            with lock:
+                latencies.append(latency)
+                errors[0] += not ok
+
+    start = time.perf_counter() + 0.1
+    for i, offset in enumerate(offsets):
+        scheduled.put((start + offset, corpus[i % len(corpus)]))
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(connections)]
+    for thread in threads:
+        scheduled.put(None)
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return summarize(f'open-loop {rate:g}/s', latencies, errors[0], elapsed, mode='open', rate=rate,
+                     duration=duration)
+
+
+def run_closed_loop(url, corpus, concurrency, duration, timeout=30):
+    """
+    `concurrency` clients sending back to back for `duration` seconds.
+    """
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        client = Client(url, timeout)
+        i = index
+        while time.perf_counter() < deadline:
+            path, body = corpus[i % len(corpus)]
+            i += concurrency
+            start = time.perf_counter()
+            ok = client.post(path, body)
+            latency = time.perf_counter() - start
+            with lock:
+                latencies.append(latency)
+                errors[0] += not ok
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return summarize(f'closed-loop x{concurrency}', latencies, errors[0], elapsed, mode='closed',
+                     concurrency=concurrency, duration=duration)
+
+
+def start_server(port, env=None):
+    """
+    Start serve_model.py's Flask app on localhost:port and wait until it answers.
+    """
+    code = ("import sys; sys.path.insert(0, 'model_api'); import serve_model; "
+            f"serve_model.app.run(host='127.0.0.1', port={port}, threaded=True)")
+    server = subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, env=dict(os.environ, **(env or {})),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("serve_model.py exited during startup")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("serve_model.py did not start within 120s")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Regressions of results against a baseline run, matched by scenario name: p50/p99 latency more
+    than `tolerance` (relative) higher, or a higher error rate.
+    """
+    if baseline.get('corpus') != results.get('corpus'):
+        return [f"baseline corpus {baseline.get('corpus')} differs from {results.get('corpus')}"]
+    previous = {scenario['name']: scenario for scenario in baseline['scenarios']}
+    regressions = []
+    for scenario in results['scenarios']:
+        before = previous.get(scenario['name'])
+        if before is None:
+            continue
+        for key in ('p50_ms', 'p99_ms'):
+            if before[key] and scenario[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{scenario['name']}: {key} {scenario[key]:.2f} vs baseline {before[key]:.2f}")
+        if scenario['error_rate'] > before['error_rate']:
+            regressions.append(f"{scenario['name']}: error rate {scenario['error_rate']:.4f} "
+                               f"vs baseline {before['error_rate']:.4f}")
+    return regressions
+
+
+def print_results(results):
+    print(f"{'scenario':22s} {'requests':>9s} {'req/s':>9s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} "
+          f"{'p99.9 ms':>9s} {'errors':>7s}")
+    for s in results['scenarios']:
+        print(f"{s['name']:22s} {s['requests']:9,} {s['throughput']:9.1f} {s['p50_ms']:8.2f} {s['p95_ms']:8.2f} "
+              f"{s['p99_ms']:8.2f} {s['p999_ms']:9.2f} {s['error_rate']:7.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the model API.")
+    parser.add_argument('--url', default=None, help="Base URL of a running API, e.g. http://127.0.0.1:5000")
+    parser.add_argument('--start', action='store_true', help="Start serve_model.py locally for the run")
+    parser.add_argument('--corpus', default='fraud', help="'fraud', 'creditcard' or a JSON-lines file")
+    parser.add_argument('--corpus-size', type=int, default=1000, help="Distinct synthetic requests")
+    parser.add_argument('--rate', type=float, action='append', default=[], help="Open-loop requests/s (repeatable)")
+    parser.add_argument('--concurrency', type=int, action='append', default=[],
+                        help="Closed-loop clients (repeatable)")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds per scenario")
+    parser.add_argument('--warmup', type=int, default=50, help="Requests sent before measuring")
+    parser.add_argument('--connections', type=int, default=64, help="Open-loop connection pool size")
+    parser.add_argument('--output', default=None, help="Write the results to this JSON file")
+    parser.add_argument('--baseline', default=None, help="Fail if latency regressed against this results file")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative latency increase")
+    args = parser.parse_args()
+    if not args.url and not args.start:
+        parser.error("pass --url of a running API or --start")
+    if not args.rate and not args.concurrency:
+        args.concurrency = [1]
+
+    if args.corpus in ('fraud', 'creditcard'):
+        corpus = synthetic_corpus(args.corpus, args.corpus_size)
+    else:
+        corpus, skipped = load_corpus(args.corpus)
+        if skipped:
+            print(f"Skipped {skipped} lines of {args.corpus} that are not API requests.")
+        if not corpus:
+            parser.error(f"{args.corpus} contains no API requests")
+
+    server = None
+    url = args.url
+    if args.start:
+        port = free_port()
+        server = start_server(port)
+        url = f'http://127.0.0.1:{port}'
+    try:
+        client = Client(url, 30)
+        for path, body in corpus[:args.warmup]:
+            client.post(path, body)
+        scenarios = [run_open_loop(url, corpus, rate, args.duration, args.connections) for rate in args.rate]
+        scenarios += [run_closed_loop(url, corpus, n, args.duration) for n in args.concurrency]
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'url': url if args.url else 'serve_model.py (local)',
+        'corpus': args.corpus,
+        'scenarios': scenarios,
+    }
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}.")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Latency regressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == '__main__':
+    main()
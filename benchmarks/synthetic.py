@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+COUNTRIES = [
+    'United States', 'China', 'Japan', 'United Kingdom', 'Korea Republic of', 'Germany',
+    'France', 'Canada', 'Brazil', 'Italy', 'Australia', 'Netherlands', 'Russian Federation',
+    'India', 'Taiwan; Republic of China (ROC)', 'Mexico', 'Sweden', 'Spain', 'South Africa',
+    'Switzerland',
+]
+
+
+def make_ip_to_country(n_ranges=138846, seed=0):
+    """
+    Generate a non-overlapping IpAddress_to_Country table with gaps between ranges.
+    """
+    rng = np.random.default_rng(seed)
+    widths = rng.integers(16, 60000, size=n_ranges)
+    gaps = rng.integers(0, 2000, size=n_ranges)
+    lower = 16777216 + np.cumsum(widths + gaps) - widths
+    upper = lower + widths - 1
+    return pd.DataFrame({
+        'lower_bound_ip_address': lower.astype('float64'),
+        'upper_bound_ip_address': upper.astype('int64'),
+        'country': rng.choice(COUNTRIES, size=n_ranges),
+    })
+
+
+def make_ips(n, ip_to_country, seed=1):
+    """
+    Generate float-encoded IPs spread over the range table, as in Fraud_Data.csv.
+    """
+    rng = np.random.default_rng(seed)
+    low = ip_to_country['lower_bound_ip_address'].min()
+    high = ip_to_country['upper_bound_ip_address'].max()
+    return rng.uniform(low, high, size=n)
+
+
+SOURCES = ['SEO', 'Ads', 'Direct']
+BROWSERS = ['Chrome', 'IE', 'Safari', 'FireFox', 'Opera']
+
+
+def make_fraud_data(n, n_users=None, with_country=True, seed=2):
+    """
+    Generate a Fraud_Data frame with the raw column layout (plus 'country' when requested).
+    """
+    rng = np.random.default_rng(seed)
+    n_users = n_users or max(1, n // 2)
+    signup = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 200 * 86400, size=n), unit='s')
+    purchase = signup + pd.to_timedelta(rng.integers(1, 120 * 86400, size=n), unit='s')
+    fraud_data = pd.DataFrame({
+        'user_id': rng.integers(1, n_users + 1, size=n),
+        'signup_time': signup.strftime('%Y-%m-%d %H:%M:%S'),
+        'purchase_time': purchase.strftime('%Y-%m-%d %H:%M:%S'),
+        'purchase_value': rng.integers(9, 155, size=n),
+        'device_id': np.char.add('DEV', rng.integers(0, max(1, n // 3), size=n).astype(str)),
+        'source': rng.choice(SOURCES, size=n),
+        'browser': rng.choice(BROWSERS, size=n),
+        'sex': rng.choice(['M', 'F'], size=n),
+        'age': rng.integers(18, 77, size=n),
+        'ip_address': rng.uniform(52093.0, 4294850499.0, size=n),
+        'class': (rng.random(n) < 0.094).astype(int),
+    })
+    if with_country:
+        fraud_data['country'] = rng.choice(COUNTRIES, size=n)
+    return fraud_data
+
+
+def make_creditcard_data(n, seed=4):
+    """
+    Generate a creditcard frame with the raw column layout: Time, V1..V28, Amount, Class.
+    """
+    rng = np.random.default_rng(seed)
+    creditcard_data = pd.DataFrame(rng.standard_normal((n, 28)), columns=[f'V{i}' for i in range(1, 29)])
+    creditcard_data.insert(0, 'Time', np.sort(rng.integers(0, 172_792, size=n)).astype('float64'))
+    creditcard_data['Amount'] = np.round(rng.lognormal(3, 1.5, size=n), 2)
+    creditcard_data['Class'] = (rng.random(n) < 0.0017).astype(int)
+    return creditcard_data
+
+
+def add_duplicates(frame, fraction=0.01, seed=5):
+    """
+    Append copies of a random fraction of the rows, as exported data often has.
+    """
+    rng = np.random.default_rng(seed)
+    copies = frame.iloc[rng.integers(0, len(frame), size=int(len(frame) * fraction))]
+    return pd.concat([frame, copies], ignore_index=True)
@@ -0,0 +1,189 @@
+"""
+Aggregate cache for the dashboard.
+
+The dashboard only draws a handful of small aggregates: daily fraud counts, fraud counts per country,
+device risk summaries, browser x class counts, and fraud by hour and day of week. They are computed
+once from the cleaned datasets and stored in a cache file together with the column arrays of the filter query engine
+(query_engine.py) and a fingerprint of the input files (path, size and modification time). The
+dashboard loads the cache at startup and rebuilds it only when the fingerprint no longer matches.
+
+Build (or refresh) the cache ahead of starting the dashboard:
+    python dashboard/aggregates.py
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import time
+import joblib
+import pandas as pd
+
+# Make the shared scripts package importable when run as dashboard/aggregates.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.ip_index import IpRangeIndex, normalize_ips
+from scripts.storage import load_table
+from query_engine import FraudQueryEngine
+from device_analytics import device_summary, shared_device_clusters
+
+# Bump when the aggregates below change, so caches built by older code are rebuilt
+CUBE_VERSION = 3
+
+data_dir = os.environ.get('DASHBOARD_DATA_DIR', 'C:/Users/ibsan/Desktop/TenX/week-8-9/Data/cleaned_data')
+aggregates_path = os.environ.get(
+    'DASHBOARD_AGGREGATES_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'aggregates.joblib'))
+query_cache_size = int(os.environ.get('DASHBOARD_QUERY_CACHE_SIZE', 256))
+top_devices = int(os.environ.get('DASHBOARD_TOP_DEVICES', 20))
+min_device_transactions = int(os.environ.get('DASHBOARD_DEVICE_MIN_TRANSACTIONS', 3))
+
+INPUT_FILES = {
+    'fraud_data': 'Preprocessed_Fraud_Data.csv',
+    'credit_data': 'Preprocessed_Creditcard_Data.csv',
+    'ip_country': 'Preprocessed_IpAddress_to_Country.csv',
+}
+
+
+# Load datasets; a .parquet or .feather copy next to a CSV is read instead of the CSV
+def load_data(directory=None):
+    directory = directory or data_dir
+    fraud_data = load_table(os.path.join(directory, INPUT_FILES['fraud_data']))
+    credit_data = load_table(os.path.join(directory, INPUT_FILES['credit_data']))
+    ip_country = load_table(os.path.join(directory, INPUT_FILES['ip_country']))
+    return fraud_data, credit_data, ip_country
+
+# Data processing functions
+def process_ecommerce_data(fraud_data, ip_country):
+    # Resolve countries first, so only matched rows are ever copied
+    ip_int = normalize_ips(fraud_data['ip_address'].to_numpy())
+    ip_index = IpRangeIndex.from_frame(ip_country)
+    country_codes = ip_index.lookup_codes(ip_int)
+    matched = country_codes >= 0
+    fraud_data_with_country = fraud_data[matched]
+
+    purchase_time = pd.to_datetime(fraud_data_with_country['purchase_time'])
+    return fraud_data_with_country.assign(
+        signup_time=pd.to_datetime(fraud_data_with_country['signup_time']),
+        purchase_time=purchase_time,
+        purchase_day=purchase_time.dt.day_name(),
+        purchase_hour=purchase_time.dt.hour,
+        ip_int=ip_int[matched],
+        country=ip_index.categories[country_codes[matched]],
+    )
+
+def create_summary_stats(fraud_data, credit_data):
+    ecom_stats = {
+        'total_transactions': len(fraud_data),
+        'fraud_cases': fraud_data['class'].sum(),
+        'fraud_percentage': (fraud_data['class'].sum() / len(fraud_data) * 100).round(2)
+    }
+    credit_stats = {
+        'total_transactions': len(credit_data),
+        'fraud_cases': credit_data['Class'].sum(),
+        'fraud_percentage': (credit_data['Class'].sum() / len(credit_data) * 100).round(2)
+    }
+    return ecom_stats, credit_stats
+
+
+def _input_paths(directory):
+    # The file load_table actually reads: a columnar copy when present, else the CSV
+    paths = []
+    for file_name in INPUT_FILES.values():
+        csv_path = os.path.join(directory, file_name)
+        stem = os.path.splitext(csv_path)[0]
+        paths.append(next((stem + extension for extension in ('.parquet', '.feather')
+                           if os.path.exists(stem + extension)), csv_path))
+    return paths
+
+
+def fingerprint(directory=None):
+    """
+    Hash of the input files' paths, sizes and modification times, plus CUBE_VERSION.
+    """
+    digest = hashlib.blake2b(f"cube-v{CUBE_VERSION}".encode(), digest_size=16)
+    for path in _input_paths(directory or data_dir):
+        files = [path]
+        if os.path.isdir(path):  # Partitioned Parquet dataset
+            files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        for file_path in files:
+            stat = os.stat(file_path)
+            digest.update(f"{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def build_aggregates(fraud_data_processed, credit_data):
+    """
+    Everything the dashboard layout draws, computed from the processed frames.
+    """
+    fraud_cases = fraud_data_processed[fraud_data_processed['class'] == 1]
+    ecom_stats, credit_stats = create_summary_stats(fraud_data_processed, credit_data)
+    per_device = fraud_data_processed.groupby(fraud_data_processed['device_id'].astype(str))['class'].agg(['size', 'sum'])
+    cluster_summary, clusters = shared_device_clusters(fraud_data_processed)
+    return {
+        'ecom_stats': ecom_stats,
+        'credit_stats': credit_stats,
+        'daily_fraud': fraud_data_processed.groupby(fraud_data_processed['purchase_time'].dt.date)['class'].sum().reset_index(),
+        'country_fraud': fraud_cases.groupby('country').size().reset_index(name='count'),
+        'devices': device_summary(per_device.index.to_numpy(), per_device['size'].to_numpy(),
+                                  per_device['sum'].to_numpy(), top_devices, min_device_transactions),
+        'device_clusters': {'summary': cluster_summary, 'top': clusters},
+        'browser_class': fraud_data_processed.groupby(['browser', 'class']).size().unstack().fillna(0),
+        'hour_fraud': fraud_cases.groupby('purchase_hour').size(),
+        'day_fraud': fraud_cases.groupby('purchase_day').size(),
+    }
+
+
+def rebuild_aggregates(directory=None, path=None):
+    """
+    Load and process the inputs, compute the aggregates and the query engine's columns and
+    write them to the cache. Returns (aggregates, engine).
+    """
+    directory = directory or data_dir
+    path = path or aggregates_path
+    key = fingerprint(directory)
+    start = time.perf_counter()
+    fraud_data, credit_data, ip_country = load_data(directory)
+    fraud_data_processed = process_ecommerce_data(fraud_data, ip_country)
+    aggregates = build_aggregates(fraud_data_processed, credit_data)
+    engine = FraudQueryEngine.from_frame(fraud_data_processed, query_cache_size, top_devices, min_device_transactions)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    joblib.dump({'fingerprint': key, 'aggregates': aggregates, 'engine_columns': engine.columns}, tmp_path)
+    os.replace(tmp_path, path)  # Readers see the old or the new cache, never a partial one
+    print(f"Dashboard aggregates built in {time.perf_counter() - start:.1f}s and saved to {path}.")
+    logging.info(f"Dashboard aggregates for {key} saved to {path}.")
+    return aggregates, engine
+
+
+def load_aggregates(directory=None, path=None, force=False):
+    """
+    Cached (aggregates, query engine) for the current inputs, rebuilt first if the inputs changed
+    or force is set. The engine's column arrays are memory-mapped from the cache file.
+    """
+    path = path or aggregates_path
+    if not force and os.path.exists(path):
+        try:
+            cached = joblib.load(path, mmap_mode='r')
+            if cached['fingerprint'] == fingerprint(directory):
+                logging.info(f"Dashboard aggregates loaded from {path}.")
+                return cached['aggregates'], FraudQueryEngine(cached['engine_columns'], query_cache_size,
+                                                                top_devices, min_device_transactions)
+            print("Dashboard inputs changed since the aggregates were built; rebuilding...")
+        except Exception as e:
+            print(f"Error reading dashboard aggregates from {path}: {e}; rebuilding...")
+            logging.error(f"Error reading dashboard aggregates from {path}: {e}")
+    return rebuild_aggregates(directory, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the dashboard's aggregate cache.")
+    parser.add_argument('--data-dir', default=None, help="Directory with the cleaned CSVs (default DASHBOARD_DATA_DIR)")
+    parser.add_argument('--output', default=None, help="Cache file (default DASHBOARD_AGGREGATES_PATH)")
+    parser.add_argument('--force', action='store_true', help="Rebuild even if the inputs haven't changed")
+    args = parser.parse_args()
+    load_aggregates(args.data_dir, args.output, force=args.force)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,9 @@
-from dash import Dash, html, dcc
+from dash import Dash, html, dcc, Input, Output
 import plotly.express as px
-import pandas as pd
 from flask import Flask
-from datetime import datetime
-import socket
-import struct
+import functools
+from aggregates import load_aggregates
+from downsample import downsample, render_mode
 
 # Initialize Flask app to run the prediction model
 server = Flask(__name__)
@@ -12,68 +11,92 @@ server = Flask(__name__)
 # Initialize Dash app
 app = Dash(__name__, server=server)
 
-# Helper function to convert IP to integer
-def ip_to_int(ip):
-    try:
-        return struct.unpack("!I", socket.inet_aton(ip))[0]
-    except socket.error:
-        return None  # Handle invalid IPs gracefully
-
-# Load datasets
-def load_data():
-    fraud_data = pd.read_csv('C:/Users/ibsan/Desktop/TenX/week-8-9/Data/cleaned_data/Preprocessed_Fraud_Data.csv')
-    credit_data = pd.read_csv('C:/Users/ibsan/Desktop/TenX/week-8-9/Data/cleaned_data/Preprocessed_Creditcard_Data.csv')
-    ip_country = pd.read_csv('C:/Users/ibsan/Desktop/TenX/week-8-9/Data/cleaned_data/Preprocessed_IpAddress_to_Country.csv')
-    return fraud_data, credit_data, ip_country
-
-# Data processing functions
-def process_ecommerce_data(fraud_data, ip_country):
-    fraud_data_cleaned = fraud_data.copy()
-    ip_country_cleaned = ip_country.copy()
-
-    fraud_data_cleaned['signup_time'] = pd.to_datetime(fraud_data_cleaned['signup_time'])
-    fraud_data_cleaned['purchase_time'] = pd.to_datetime(fraud_data_cleaned['purchase_time'])
-    fraud_data_cleaned['purchase_day'] = fraud_data_cleaned['purchase_time'].dt.day_name()
-    fraud_data_cleaned['purchase_hour'] = fraud_data_cleaned['purchase_time'].dt.hour
-    fraud_data_cleaned['ip_int'] = fraud_data_cleaned['ip_address'].apply(lambda x: ip_to_int(str(int(x))) if pd.notna(x) else None)
-    
-    ip_country_cleaned['lower_bound_ip_address'] = ip_country_cleaned['lower_bound_ip_address'].astype('int64')
-    ip_country_cleaned['upper_bound_ip_address'] = ip_country_cleaned['upper_bound_ip_address'].astype('int64')
-    fraud_data_cleaned['ip_int'] = fraud_data_cleaned['ip_int'].astype('int64')
-    
-    ip_country_cleaned.sort_values('lower_bound_ip_address', inplace=True)
-    fraud_data_with_country = pd.merge_asof(
-        fraud_data_cleaned.sort_values('ip_int'),
-        ip_country_cleaned[['lower_bound_ip_address', 'upper_bound_ip_address', 'country']],
-        left_on='ip_int',
-        right_on='lower_bound_ip_address',
-        direction='backward'
+# Load the precomputed aggregates; they are rebuilt from the cleaned data only when it changed
+aggregates, query_engine = load_aggregates()
+ecom_stats, credit_stats = aggregates['ecom_stats'], aggregates['credit_stats']
+filter_options = query_engine.options()
+
+# Figures, drawn from the precomputed aggregates or from a filtered query result of the same shape
+def daily_fraud_figure(result):
+    # Long series are downsampled to the point budget and drawn with WebGL
+    daily_fraud = downsample(result['daily_fraud'], 'purchase_time', 'class')
+    return px.line(
+        daily_fraud,
+        x='purchase_time',
+        y='class',
+        render_mode=render_mode(len(daily_fraud)),
+        template='plotly_white'
+    ).update_traces(line_color='#e74c3c')
+
+def country_fraud_figure(result):
+    return px.choropleth(
+        result['country_fraud'],
+        locations='country',
+        locationmode='country names',
+        color='count',
+        color_continuous_scale='Reds',
+        template='plotly_white'
+    )
+
+def class_bar_figure(counts):
+    return px.bar(
+        counts,
+        template='plotly_white',
+        color_discrete_sequence=['#2ecc71', '#e74c3c']
+    )
+
+# Device charts draw only the compact summaries from device_analytics, never one bar per device
+def device_top_figure(devices, rank_by):
+    top = devices['top_rate'] if rank_by == 'rate' else devices['top_fraud']
+    return px.bar(
+        top,
+        x='fraud_rate' if rank_by == 'rate' else 'fraud',
+        y='device_id',
+        orientation='h',
+        hover_data=['transactions', 'fraud', 'fraud_rate'],
+        template='plotly_white',
+        color_discrete_sequence=['#e74c3c']
+    ).update_layout(
+        yaxis={'autorange': 'reversed', 'type': 'category'},
+        xaxis_title='Fraud Rate' if rank_by == 'rate' else 'Fraud Cases',
+        yaxis_title='Device'
+    )
+
+def device_histogram_figure(devices):
+    return px.bar(
+        devices['histogram'],
+        x='transactions_per_device',
+        y='devices',
+        color='fraud_rate',
+        color_continuous_scale='Reds',
+        hover_data=['transactions', 'fraud_rate'],
+        log_y=True,
+        template='plotly_white'
+    ).update_layout(
+        xaxis_title='Transactions per Device',
+        yaxis_title='Number of Devices'
+    )
+
+def device_clusters_table(clusters):
+    summary, top = clusters['summary'], clusters['top']
+    header = [html.Th(column.replace('_', ' ').title()) for column in top.columns]
+    rows = [html.Tr([html.Td(value) for value in row]) for row in top.itertuples(index=False)]
+    return html.Div([
+        html.P(f"{summary['clusters']:,} clusters of users sharing devices, covering {summary['users_in_clusters']:,} users "
+               f"and {summary['transactions_in_clusters']:,} transactions. Fraud rate {summary['fraud_rate_in_clusters']:.1%} "
+               f"inside clusters vs {summary['fraud_rate_elsewhere']:.1%} elsewhere."),
+        html.Table([html.Thead(html.Tr(header)), html.Tbody(rows)], className='clusters-table')
+    ])
+
+def fraud_bar_figure(counts, xaxis_title):
+    return px.bar(
+        counts,
+        template='plotly_white',
+        color_discrete_sequence=['#e74c3c']
+    ).update_layout(
+        xaxis_title=xaxis_title,
+        yaxis_title='Number of Fraud Cases'
     )
-    fraud_data_with_country = fraud_data_with_country[
-        (fraud_data_with_country['ip_int'] >= fraud_data_with_country['lower_bound_ip_address']) &
-        (fraud_data_with_country['ip_int'] <= fraud_data_with_country['upper_bound_ip_address'])
-    ]
-    fraud_data_with_country.drop(['lower_bound_ip_address', 'upper_bound_ip_address'], axis=1, inplace=True)
-    
-    return fraud_data_with_country
-
-def create_summary_stats(fraud_data, credit_data):
-    ecom_stats = {
-        'total_transactions': len(fraud_data),
-        'fraud_cases': fraud_data['class'].sum(),
-        'fraud_percentage': (fraud_data['class'].sum() / len(fraud_data) * 100).round(2)
-    }
-    credit_stats = {
-        'total_transactions': len(credit_data),
-        'fraud_cases': credit_data['Class'].sum(),
-        'fraud_percentage': (credit_data['Class'].sum() / len(credit_data) * 100).round(2)
-    }
-    return ecom_stats, credit_stats
-
-# Load and process data
-fraud_data, credit_data, ip_country = load_data()
-fraud_data_processed = process_ecommerce_data(fraud_data, ip_country)
-ecom_stats, credit_stats = create_summary_stats(fraud_data_processed, credit_data)
 
 
 # Create the dashboard layout
@@ -96,15 +119,15 @@ app.layout = html.Div([
                         html.Div([
                             html.P([
                                 html.Span('Total Transactions: ', className='stat-label'),
-                                html.Span(f"{ecom_stats['total_transactions']:,}", className='stat-value')
+                                html.Span(f"{ecom_stats['total_transactions']:,}", id='ecom-total', className='stat-value')
                             ]),
                             html.P([
                                 html.Span('Fraud Cases: ', className='stat-label'),
-                                html.Span(f"{ecom_stats['fraud_cases']:,}", className='stat-value fraud-value')
+                                html.Span(f"{ecom_stats['fraud_cases']:,}", id='ecom-fraud', className='stat-value fraud-value')
                             ]),
                             html.P([
                                 html.Span('Fraud Percentage: ', className='stat-label'),
-                                html.Span(f"{ecom_stats['fraud_percentage']}%", className='stat-value fraud-value')
+                                html.Span(f"{ecom_stats['fraud_percentage']}%", id='ecom-percentage', className='stat-value fraud-value')
                             ])
                         ], className='stat-details')
                     ])
@@ -135,59 +158,64 @@ app.layout = html.Div([
             ], className='col-md-6')
         ], className='row stats-container'),
 
+        # E-commerce filters; the cards and charts below follow them
+        html.Div([
+            dcc.DatePickerRange(
+                id='date-filter',
+                min_date_allowed=filter_options['start_date'],
+                max_date_allowed=filter_options['end_date'],
+                start_date=filter_options['start_date'],
+                end_date=filter_options['end_date']
+            ),
+            dcc.Dropdown(id='country-filter', options=filter_options['country'], multi=True, placeholder='All countries'),
+            dcc.Dropdown(id='browser-filter', options=filter_options['browser'], multi=True, placeholder='All browsers'),
+            dcc.Dropdown(id='source-filter', options=filter_options['source'], multi=True, placeholder='All sources')
+        ], className='row filters-container'),
+
         # Charts Section
         html.Div([
             html.Div([
                 html.Div([
                     html.H3('Fraud Trends Over Time', className='chart-title'),
-                    dcc.Graph(
-                        figure=px.line(
-                            fraud_data_processed.groupby(fraud_data_processed['purchase_time'].dt.date)['class'].sum().reset_index(),
-                            x='purchase_time',
-                            y='class',
-                            template='plotly_white'
-                        ).update_traces(line_color='#e74c3c')
-                    )
+                    dcc.Graph(id='daily-fraud-graph', figure=daily_fraud_figure(aggregates))
                 ], className='chart-card')
             ], className='mb-4'),
 
 
 html.Div([
                 html.H3('Geographical Distribution of Fraud', className='chart-title'),
-                dcc.Graph(
-                    figure=px.choropleth(
-                        fraud_data_processed[fraud_data_processed['class'] == 1].groupby('country').size().reset_index(name='count'),
-                        locations='country',
-                        locationmode='country names',
-                        color='count',
-                        color_continuous_scale='Reds',
-                        template='plotly_white'
-                    )
-                )
+                dcc.Graph(id='country-fraud-graph', figure=country_fraud_figure(aggregates))
             ], className='chart-card mb-4'),
 
             # Device and Browser Analysis
             html.Div([
                 html.Div([
-                    html.H3('Fraud by Device', className='chart-title'),
-                    dcc.Graph(
-                        figure=px.bar(
-                            fraud_data_processed.groupby(['device_id', 'class']).size().unstack().fillna(0),
-                            template='plotly_white',
-                            color_discrete_sequence=['#2ecc71', '#e74c3c']
-                        )
-                    )
+                    html.H3('Riskiest Devices', className='chart-title'),
+                    dcc.RadioItems(
+                        id='device-rank',
+                        options=[{'label': 'By fraud cases', 'value': 'fraud'}, {'label': 'By fraud rate', 'value': 'rate'}],
+                        value='fraud',
+                        inline=True
+                    ),
+                    dcc.Graph(id='device-top-graph', figure=device_top_figure(aggregates['devices'], 'fraud'))
                 ], className='chart-card col-md-6'),
 
                 html.Div([
                     html.H3('Fraud by Browser', className='chart-title'),
-                    dcc.Graph(
-                        figure=px.bar(
-                            fraud_data_processed.groupby(['browser', 'class']).size().unstack().fillna(0),
-                            template='plotly_white',
-                            color_discrete_sequence=['#2ecc71', '#e74c3c']
-                        )
-                    )
+                    dcc.Graph(id='browser-class-graph', figure=class_bar_figure(aggregates['browser_class']))
+                ], className='chart-card col-md-6')
+            ], className='row mb-4'),
+
+            # Device Risk
+            html.Div([
+                html.Div([
+                    html.H3('Transactions per Device', className='chart-title'),
+                    dcc.Graph(id='device-histogram-graph', figure=device_histogram_figure(aggregates['devices']))
+                ], className='chart-card col-md-6'),
+
+                html.Div([
+                    html.H3('Shared-Device Clusters', className='chart-title'),
+                    device_clusters_table(aggregates['device_clusters'])
                 ], className='chart-card col-md-6')
             ], className='row mb-4'),
 
@@ -195,30 +223,12 @@ html.Div([
             html.Div([
                 html.Div([
                     html.H3('Fraud by Hour of Day', className='chart-title'),
-                    dcc.Graph(
-                        figure=px.bar(
-                            fraud_data_processed[fraud_data_processed['class'] == 1].groupby('purchase_hour').size(),
-                            template='plotly_white',
-                            color_discrete_sequence=['#e74c3c']
-                        ).update_layout(
-                            xaxis_title='Hour of Day',
-                            yaxis_title='Number of Fraud Cases'
-                        )
-                    )
+                    dcc.Graph(id='hour-fraud-graph', figure=fraud_bar_figure(aggregates['hour_fraud'], 'Hour of Day'))
                 ], className='chart-card col-md-6'),
 
                 html.Div([
                     html.H3('Fraud by Day of Week', className='chart-title'),
-                    dcc.Graph(
-                        figure=px.bar(
-                            fraud_data_processed[fraud_data_processed['class'] == 1].groupby('purchase_day').size(),
-                            template='plotly_white',
-                            color_discrete_sequence=['#e74c3c']
-                        ).update_layout(
-                            xaxis_title='Day of Week',
-                            yaxis_title='Number of Fraud Cases'
-                        )
-                    )
+                    dcc.Graph(id='day-fraud-graph', figure=fraud_bar_figure(aggregates['day_fraud'], 'Day of Week'))
                 ], className='chart-card col-md-6')
             ], className='row mb-4')
         ], className='charts-container')
@@ -226,6 +236,34 @@ html.Div([
 ])
 
 
+@app.callback(
+    [Output('ecom-total', 'children'), Output('ecom-fraud', 'children'), Output('ecom-percentage', 'children'),
+     Output('daily-fraud-graph', 'figure'), Output('country-fraud-graph', 'figure'),
+     Output('device-top-graph', 'figure'), Output('device-histogram-graph', 'figure'),
+     Output('browser-class-graph', 'figure'), Output('hour-fraud-graph', 'figure'), Output('day-fraud-graph', 'figure')],
+    [Input('date-filter', 'start_date'), Input('date-filter', 'end_date'), Input('country-filter', 'value'),
+     Input('browser-filter', 'value'), Input('source-filter', 'value'), Input('device-rank', 'value')],
+    prevent_initial_call=True
+)
+def update_filtered_views(start_date, end_date, countries, browsers, sources, device_rank):
+    return render_filtered_views(start_date, end_date, tuple(sorted(countries or ())),
+                                 tuple(sorted(browsers or ())), tuple(sorted(sources or ())), device_rank)
+
+# Building the plotly figures costs more than the aggregation, so rendered views are cached too
+@functools.lru_cache(maxsize=64)
+def render_filtered_views(start_date, end_date, countries, browsers, sources, device_rank):
+    # Aggregated server-side by the query engine, which caches results per filter combination
+    result = query_engine.query(start_date, end_date, countries, browsers, sources)
+    stats = result['ecom_stats']
+    return (
+        f"{stats['total_transactions']:,}", f"{stats['fraud_cases']:,}", f"{stats['fraud_percentage']}%",
+        daily_fraud_figure(result), country_fraud_figure(result),
+        device_top_figure(result['devices'], device_rank), device_histogram_figure(result['devices']),
+        class_bar_figure(result['browser_class']),
+        fraud_bar_figure(result['hour_fraud'], 'Hour of Day'), fraud_bar_figure(result['day_fraud'], 'Day of Week')
+    )
+
+
 
 
 app.index_string= '''
@@ -398,6 +436,27 @@ app.index_string= '''
             margin-bottom: 2rem;
         }
 
+        .clusters-table {
+            width: 100%;
+            font-size: 0.85rem;
+            border-collapse: collapse;
+        }
+
+        .clusters-table th, .clusters-table td {
+            padding: 0.3rem 0.5rem;
+            border-bottom: 1px solid #eee;
+            text-align: right;
+        }
+
+        .filters-container {
+            margin-top: 2rem;
+            align-items: center;
+        }
+
+        .filters-container .dash-dropdown {
+            min-width: 220px;
+        }
+
         /* Custom Colors */
         .plotly_white .main-svg {
             background-color: #faf9f9;
@@ -0,0 +1,162 @@
+"""
+Device-level risk summaries for the dashboard.
+
+There are about as many devices as transactions, so the device chart can't draw one bar per device.
+Only compact summaries are sent to the browser instead:
+
+- the top-K devices by fraud count and by fraud rate (among devices with a minimum number of
+  transactions),
+- a histogram of transactions per device, with the fraud rate of each bucket,
+- shared-device clusters: groups of users connected through devices they have in common.
+
+All of them are computed from per-device count arrays, in time linear in the number of devices.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _top_k(candidates, primary, secondary, k):
+    """
+    The k candidates with the largest (primary, secondary), ties going to the lower index,
+    found by linear-time selection instead of sorting every candidate.
+    """
+    if len(candidates) > k:
+        values = primary[candidates]
+        kth = np.partition(values, len(values) - k)[len(values) - k]
+        above = candidates[values > kth]
+        ties = candidates[values == kth]
+        needed = k - len(above)
+        if len(ties) > needed:
+            tie_key = secondary[ties].astype(np.int64) * len(primary) + (len(primary) - 1 - ties)
+            ties = ties[np.argpartition(-tie_key, needed - 1)[:needed]]
+        candidates = np.concatenate([above, ties])
+    order = np.lexsort((candidates, -secondary[candidates], -primary[candidates]))
+    return candidates[order][:k]
+
+
+def top_devices(device_ids, transactions, fraud, k=20, by='fraud', min_transactions=1):
+    """
+    The k devices with the most fraud transactions (by='fraud') or the highest fraud rate
+    (by='rate', among devices with at least min_transactions). Ties are broken by fraud count,
+    then device_id.
+    """
+    transactions = np.asarray(transactions)
+    fraud = np.asarray(fraud)
+    if by == 'rate':
+        candidates = np.flatnonzero(transactions >= max(min_transactions, 1))
+        primary = np.zeros(len(fraud))
+        primary[candidates] = fraud[candidates] / transactions[candidates]
+    else:
+        candidates = np.flatnonzero(fraud > 0)
+        primary = fraud
+    top = _top_k(candidates, primary, fraud, k) if k > 0 else candidates[:0]
+    return pd.DataFrame({
+        'device_id': np.asarray(device_ids)[top],
+        'transactions': transactions[top],
+        'fraud': fraud[top],
+        'fraud_rate': np.round(fraud[top] / np.maximum(transactions[top], 1), 4),
+    })
+
+
+def transactions_histogram(transactions, fraud, max_bucket=10):
+    """
+    Number of devices, transactions and fraud transactions by transactions per device, with
+    every device above max_bucket in the last bucket.
+    """
+    transactions = np.asarray(transactions)
+    buckets = np.minimum(transactions, max_bucket)
+    devices = np.bincount(buckets, minlength=max_bucket + 1)
+    # Every bucket but the last holds devices with exactly `bucket` transactions
+    rows = devices * np.arange(max_bucket + 1)
+    last = buckets == max_bucket
+    rows[max_bucket] = transactions[last].sum()
+    # Below the last bucket fraud <= transactions < max_bucket, so (bucket, fraud) pairs fit a
+    # small integer bincount, which is much faster than a weighted one
+    fraud = np.asarray(fraud)
+    with_fraud = (fraud > 0) & ~last
+    pairs = np.bincount(buckets[with_fraud] * max_bucket + fraud[with_fraud], minlength=max_bucket * max_bucket)
+    fraud_rows = np.zeros(max_bucket + 1, dtype=np.int64)
+    fraud_rows[:max_bucket] = pairs[:max_bucket * max_bucket].reshape(max_bucket, max_bucket) @ np.arange(max_bucket)
+    fraud_rows[max_bucket] = fraud[last].sum()
+    labels = [str(count) for count in range(1, max_bucket)] + [f'{max_bucket}+']
+    return pd.DataFrame({
+        'transactions_per_device': labels,
+        'devices': devices[1:],
+        'transactions': rows[1:],
+        'fraud_rate': np.round(fraud_rows[1:] / np.maximum(rows[1:], 1), 4),
+    })
+
+
+def device_summary(device_ids, transactions, fraud, k=20, min_transactions=3, max_bucket=10):
+    """
+    Everything the device charts draw, from per-device transaction and fraud counts.
+    """
+    return {
+        'top_fraud': top_devices(device_ids, transactions, fraud, k, 'fraud'),
+        'top_rate': top_devices(device_ids, transactions, fraud, k, 'rate', min_transactions),
+        'histogram': transactions_histogram(transactions, fraud, max_bucket),
+    }
+
+
+def connected_components(user_codes, device_codes, n_users, n_devices):
+    """
+    Component label of every user in the bipartite user-device graph, by label propagation:
+    each round gives every device the smallest label of its users and every user the smallest
+    label of its devices, until nothing changes.
+    """
+    labels = np.arange(n_users)
+    while True:
+        device_labels = np.full(n_devices, n_users)
+        np.minimum.at(device_labels, device_codes, labels[user_codes])
+        updated = labels.copy()
+        np.minimum.at(updated, user_codes, device_labels[device_codes])
+        # Jump to the label's own label, which roughly halves the remaining rounds
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def shared_device_clusters(fraud_data, top=20):
+    """
+    Flag groups of two or more users linked by shared devices. Returns (summary, table of the
+    top clusters by number of users).
+    """
+    users = pd.Categorical(fraud_data['user_id'])
+    devices = pd.Categorical(fraud_data['device_id'].astype(str))
+    user_codes = users.codes.astype(np.intp)
+    device_codes = devices.codes.astype(np.intp)
+    fraud = fraud_data['class'].to_numpy() == 1
+    n_users, n_devices = len(users.categories), len(devices.categories)
+
+    labels = connected_components(user_codes, device_codes, n_users, n_devices)
+    cluster_users = np.bincount(labels, minlength=n_users)
+    row_clusters = labels[user_codes]
+    cluster_rows = np.bincount(row_clusters, minlength=n_users)
+    cluster_fraud = np.bincount(row_clusters, weights=fraud, minlength=n_users).astype(np.int64)
+    # Distinct devices per cluster: each device belongs to exactly one cluster
+    device_cluster = np.zeros(n_devices, dtype=np.intp)
+    device_cluster[device_codes] = row_clusters
+    cluster_devices = np.bincount(device_cluster, minlength=n_users)
+
+    shared = np.flatnonzero(cluster_users >= 2)
+    in_clusters = np.isin(row_clusters, shared)
+    summary = {
+        'clusters': int(len(shared)),
+        'users_in_clusters': int(cluster_users[shared].sum()),
+        'transactions_in_clusters': int(in_clusters.sum()),
+        'fraud_rate_in_clusters': round(float(fraud[in_clusters].mean()), 4) if in_clusters.any() else 0.0,
+        'fraud_rate_elsewhere': round(float(fraud[~in_clusters].mean()), 4) if (~in_clusters).any() else 0.0,
+    }
+    order = shared[np.lexsort((shared, -cluster_fraud[shared], -cluster_users[shared]))][:top]
+    first_device = np.full(n_users, -1)
+    first_device[device_cluster[::-1]] = np.arange(n_devices)[::-1]
+    table = pd.DataFrame({
+        'users': cluster_users[order],
+        'devices': cluster_devices[order],
+        'transactions': cluster_rows[order],
+        'fraud': cluster_fraud[order],
+        'fraud_rate': np.round(cluster_fraud[order] / cluster_rows[order], 4),
+        'example_device': np.asarray(devices.categories)[first_device[order]],
+    })
+    return summary, table
@@ -0,0 +1,105 @@
+"""
+Point budgets for the dashboard's line charts.
+
+A line chart sends every point to the browser, so payload size and render time grow with the
+data. Series longer than `max_points` (DASHBOARD_MAX_POINTS) are downsampled before plotting:
+
+- 'lttb' (Largest-Triangle-Three-Buckets) keeps, in each bucket, the point forming the largest
+  triangle with its neighbours, which preserves the visual shape of the line;
+- 'minmax' keeps the minimum and the maximum of each bucket, so no spike is ever dropped.
+
+Traces with more than `webgl_points` (DASHBOARD_WEBGL_POINTS) points are drawn with WebGL instead of SVG.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+max_points = int(os.environ.get('DASHBOARD_MAX_POINTS', 2000))
+webgl_points = int(os.environ.get('DASHBOARD_WEBGL_POINTS', 1000))
+downsample_method = os.environ.get('DASHBOARD_DOWNSAMPLE', 'lttb')
+
+
+def _numeric(values):
+    # LTTB measures areas, so dates and timestamps are compared as nanoseconds
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=float)
+    return pd.to_datetime(values).to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(float)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Indices of the n_out points kept by Largest-Triangle-Three-Buckets. The first and last points
+    are always kept; x must be sorted.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.intp) + 1
+    edges[-1] = n - 1
+    # Bucket averages from cumulative sums; the bucket after the last one is the last point
+    x_sums = np.concatenate([[0.0], np.cumsum(x)])
+    y_sums = np.concatenate([[0.0], np.cumsum(y)])
+    next_edges = np.append(edges[1:], n)
+    counts = next_edges - edges
+    x_means = (x_sums[next_edges] - x_sums[edges]) / counts
+    y_means = (y_sums[next_edges] - y_sums[edges]) / counts
+
+    indices = np.empty(n_out, dtype=np.intp)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        area = np.abs((x[a] - x_means[bucket + 1]) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (y_means[bucket + 1] - y[a]))
+        a = start + int(np.argmax(area))
+        indices[bucket + 1] = a
+    return indices
+
+
+def min_max_indices(y, n_out):
+    """
+    Indices of the minimum and maximum of each of n_out // 2 equal buckets, in order.
+    """
+    n = len(y)
+    n_buckets = n_out // 2
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    starts = (np.arange(n_buckets) * n) // n_buckets
+    buckets = np.repeat(np.arange(n_buckets), np.diff(np.append(starts, n)))
+    # First position in each bucket where the bucket's extreme is reached
+    lows = np.minimum.reduceat(y, starts)
+    highs = np.maximum.reduceat(y, starts)
+    low_at = np.flatnonzero(y == lows[buckets])
+    high_at = np.flatnonzero(y == highs[buckets])
+    low_at = low_at[np.unique(buckets[low_at], return_index=True)[1]]
+    high_at = high_at[np.unique(buckets[high_at], return_index=True)[1]]
+    return np.unique(np.concatenate([low_at, high_at]))
+
+
+def downsample(frame, x, y, budget=None, method=None):
+    """
+    The rows of frame (sorted by x) to plot within a budget of points, chosen by method
+    ('lttb' or 'minmax'). Frames within budget are returned unchanged.
+    """
+    budget = max_points if budget is None else budget
+    method = method or downsample_method
+    if budget <= 0 or len(frame) <= budget:
+        return frame
+    if method == 'lttb':
+        indices = lttb_indices(_numeric(frame[x]), frame[y].to_numpy(), budget)
+    elif method == 'minmax':
+        indices = min_max_indices(frame[y].to_numpy(), budget)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}; use 'lttb' or 'minmax'")
+    return frame.iloc[indices]
+
+
+def render_mode(n_points):
+    """
+    The plotly express render_mode for a trace of n_points.
+    """
+    return 'webgl' if n_points > webgl_points else 'svg'
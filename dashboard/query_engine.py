@@ -0,0 +1,258 @@
+"""
+Filtered aggregations for the dashboard callbacks.
+
+The processed e-commerce rows are kept as compact column arrays sorted by purchase_time, so a date
+range is a contiguous row range found with two binary searches. Each browser, source and class value
+has a bitmap (one bit per row, packed into uint64 words); category filters are ANDs/ORs of word
+ranges and per-category counts are popcounts. Countries, with too many values for a bitmap each,
+have a sorted row-id list per country instead. Only the rows left after filtering are gathered for
+the per-hour, per-country and per-device counts; devices are then reduced to compact summaries
+(device_analytics.py).
+
+Results are memoized per filter combination in a bounded LRU, so revisiting a view costs a dict
+lookup.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from device_analytics import device_summary
+
+NS_PER_HOUR = 3600 * 10**9
+NS_PER_DAY = 24 * NS_PER_HOUR
+DAY_NAMES = np.array(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
+
+
+def pack_bitmap(mask):
+    """
+    Pack a boolean row mask into uint64 words, bit i of word w standing for row 64 * w + i.
+    """
+    packed = np.packbits(mask, bitorder='little')
+    padded = np.zeros((len(packed) + 7) // 8 * 8, dtype=np.uint8)
+    padded[:len(packed)] = packed
+    return padded.view(np.uint64)
+
+
+if hasattr(np, 'bitwise_count'):  # NumPy 2.0+
+    def popcount(words):
+        return int(np.bitwise_count(words).sum())
+else:
+    def popcount(words):
+        return int(np.unpackbits(np.ascontiguousarray(words).view(np.uint8)).sum(dtype=np.int64))
+
+
+class FraudQueryEngine:
+    """
+    Date range / country / browser / source filtered aggregates over the processed fraud rows.
+    """
+
+    def __init__(self, columns, max_entries=256, top_devices=20, min_device_transactions=3):
+        self.columns = columns
+        self.max_entries = max_entries
+        self.top_devices = top_devices
+        self.min_device_transactions = min_device_transactions
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_frame(cls, fraud_data_processed, max_entries=256, top_devices=20, min_device_transactions=3):
+        """
+        Build the sorted columns, bitmaps and row-id lists from process_ecommerce_data's output.
+        """
+        frame = fraud_data_processed.sort_values('purchase_time', kind='stable')
+        times = frame['purchase_time'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        start_day = pd.Timestamp(times[0] if len(times) else 0).floor('D')
+        fraud = frame['class'].to_numpy() == 1
+
+        # Hours since start_day, doubled, plus the class bit: one bincount gives hourly totals and fraud
+        hour_class = (((times - start_day.value) // NS_PER_HOUR) * 2 + fraud).astype(np.int32)
+        n_days = int(hour_class.max()) // 48 + 1 if len(times) else 0
+        columns = {
+            'times': times,
+            'start_day': np.int64(start_day.value),
+            'hour_class': hour_class,
+            'n_rows': np.int64(len(frame)),
+            # First row of each day, and per-day (hour x class) counts for queries without category filters
+            'day_offsets': np.searchsorted(times, start_day.value + np.arange(n_days + 1) * NS_PER_DAY).astype(np.int64),
+            'day_hour_class': np.bincount(hour_class, minlength=n_days * 48).reshape(n_days, 24, 2),
+            'fraud_rows': np.flatnonzero(fraud),
+        }
+        for column in ('country', 'browser', 'source', 'device_id'):
+            categorical = pd.Categorical(frame[column].astype(str))
+            columns[f'{column}_values'] = categorical.categories.to_numpy(dtype=str)
+            columns[f'{column}_codes'] = categorical.codes.astype(np.int32)
+        # Kept as intp, the index type np.bincount would otherwise convert the per-query slice to
+        columns['device_id_codes'] = columns['device_id_codes'].astype(np.intp)
+        n_devices = len(columns['device_id_values'])
+        columns['device_total'] = np.bincount(columns['device_id_codes'], minlength=n_devices)
+        columns['fraud_device_codes'] = columns['device_id_codes'][fraud]
+        columns['device_fraud'] = np.bincount(columns['fraud_device_codes'], minlength=n_devices)
+        for column in ('browser', 'source'):
+            codes = columns[f'{column}_codes']
+            columns[f'{column}_bitmaps'] = np.stack(
+                [pack_bitmap(codes == code) for code in range(len(columns[f'{column}_values']))]) \
+                if len(columns[f'{column}_values']) else np.zeros((0, 0), dtype=np.uint64)
+        columns['class_bitmaps'] = np.stack([pack_bitmap(~fraud), pack_bitmap(fraud)])
+        n_countries = len(columns['country_values'])
+        fraud_days = hour_class[fraud].astype(np.int64) // 48
+        columns['day_country_fraud'] = np.bincount(fraud_days * n_countries + columns['country_codes'][fraud],
+                                                   minlength=n_days * n_countries).reshape(n_days, n_countries)
+        # Row ids are increasing within each country because rows are sorted by time
+        order = np.argsort(columns['country_codes'], kind='stable')
+        columns['country_rows'] = order.astype(np.int64)
+        columns['country_offsets'] = np.searchsorted(
+            columns['country_codes'][order], np.arange(len(columns['country_values']) + 1)).astype(np.int64)
+        return cls(columns, max_entries, top_devices, min_device_transactions)
+
+    def options(self):
+        """
+        Filter choices for the dashboard controls.
+        """
+        c = self.columns
+        first = pd.Timestamp(int(c['times'][0])) if c['n_rows'] else None
+        last = pd.Timestamp(int(c['times'][-1])) if c['n_rows'] else None
+        return {
+            'start_date': first.date() if first is not None else None,
+            'end_date': last.date() if last is not None else None,
+            'country': c['country_values'].tolist(),
+            'browser': c['browser_values'].tolist(),
+            'source': c['source_values'].tolist(),
+        }
+
+    def _codes(self, column, values):
+        lookup = {value: code for code, value in enumerate(self.columns[f'{column}_values'])}
+        return [lookup[value] for value in values if value in lookup]
+
+    def _day_range(self, start_date, end_date):
+        # Day indices [d0, d1) relative to start_day, clipped to the data
+        c = self.columns
+        n_days = len(c['day_offsets']) - 1
+        d0 = 0 if start_date is None else (pd.Timestamp(start_date).value - int(c['start_day'])) // NS_PER_DAY
+        d1 = n_days if end_date is None else (pd.Timestamp(end_date).value - int(c['start_day'])) // NS_PER_DAY + 1
+        d0 = min(max(d0, 0), n_days)
+        return d0, min(max(d1, d0), n_days)
+
+    def _mask(self, lo, hi, countries, browsers, sources):
+        """
+        Packed selection mask over words [lo // 64, ceil(hi / 64)), and whether any category
+        filter applied (otherwise every row in [lo, hi) is selected).
+        """
+        c = self.columns
+        w0, w1 = lo // 64, (hi + 63) // 64
+        mask = np.full(w1 - w0, 0xFFFFFFFFFFFFFFFF, dtype=np.uint64)
+        if w1 > w0:
+            # Clear the bits of rows outside [lo, hi) in the edge words
+            mask[0] &= np.uint64((0xFFFFFFFFFFFFFFFF << (lo - w0 * 64)) & 0xFFFFFFFFFFFFFFFF)
+            if hi % 64:
+                mask[-1] &= np.uint64((1 << (hi % 64)) - 1)
+        filtered = False
+        for column, values in (('browser', browsers), ('source', sources)):
+            if values:
+                codes = self._codes(column, values)
+                mask &= np.bitwise_or.reduce(c[f'{column}_bitmaps'][codes, w0:w1], axis=0) if codes else 0
+                filtered = True
+        if countries:
+            selected = np.zeros((w1 - w0) * 64, dtype=bool)
+            for code in self._codes('country', countries):
+                rows = c['country_rows'][c['country_offsets'][code]:c['country_offsets'][code + 1]]
+                rows = rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+                selected[rows - w0 * 64] = True
+            mask &= pack_bitmap(selected)
+            filtered = True
+        return mask, filtered
+
+    def _range_counts(self, codes, total, lo, hi):
+        # Per-code counts of codes[lo:hi], counting whichever of the range or its complement is smaller
+        minlength = len(total)
+        if 2 * (hi - lo) <= len(codes):
+            return np.bincount(codes[lo:hi], minlength=minlength)
+        return total - np.bincount(codes[:lo], minlength=minlength) - np.bincount(codes[hi:], minlength=minlength)
+
+    def _aggregate(self, d0, d1, countries, browsers, sources):
+        c = self.columns
+        lo, hi = int(c['day_offsets'][d0]), int(c['day_offsets'][d1])
+        w0, w1 = lo // 64, (hi + 63) // 64
+        mask, filtered = self._mask(lo, hi, countries, browsers, sources)
+
+        if not filtered:
+            # Plain date range: per-day counts are precomputed and the rows are one slice
+            hourly = c['day_hour_class'][d0:d1]
+            country_fraud = c['day_country_fraud'][d0:d1].sum(axis=0)
+            device_total = self._range_counts(c['device_id_codes'], c['device_total'], lo, hi)
+            device_fraud = self._range_counts(c['fraud_device_codes'], c['device_fraud'], np.searchsorted(c['fraud_rows'], lo),
+                                              np.searchsorted(c['fraud_rows'], hi))
+        else:
+            bits = np.unpackbits(mask.view(np.uint8), bitorder='little').view(bool)
+            rows = w0 * 64 + np.flatnonzero(bits)
+            hour_class = c['hour_class'][rows]
+            fraud_rows = rows[(hour_class & 1).astype(bool)]
+            hourly = np.bincount(hour_class - d0 * 48, minlength=(d1 - d0) * 48).reshape(-1, 24, 2)
+            country_fraud = np.bincount(c['country_codes'][fraud_rows], minlength=len(c['country_values']))
+            device_total = np.bincount(c['device_id_codes'][rows], minlength=len(c['device_id_values']))
+            device_fraud = np.bincount(c['device_id_codes'][fraud_rows], minlength=len(c['device_id_values']))
+
+        per_day = hourly.sum(axis=1)  # day x class
+        days = np.flatnonzero(per_day.sum(axis=1))
+        dates = pd.to_datetime(int(c['start_day']) + (d0 + days) * NS_PER_DAY)
+        fraud_by_hour = hourly[:, :, 1].sum(axis=0)
+        fraud_by_weekday = np.bincount(dates.dayofweek, weights=per_day[days, 1], minlength=7)
+
+        browser_class = {}
+        for code, browser in enumerate(c['browser_values']):
+            selected = c['browser_bitmaps'][code, w0:w1] & mask
+            counts = [popcount(selected & c['class_bitmaps'][value, w0:w1]) for value in (0, 1)]
+            if sum(counts):
+                browser_class[browser] = counts
+
+        total = int(per_day.sum())
+        fraud_cases = int(per_day[:, 1].sum())
+        hours = np.flatnonzero(fraud_by_hour)
+        weekdays = np.flatnonzero(fraud_by_weekday)
+        countries_present = np.flatnonzero(country_fraud)
+        # Same shapes as the groupby aggregates in aggregates.build_aggregates
+        return {
+            'ecom_stats': {
+                'total_transactions': total,
+                'fraud_cases': fraud_cases,
+                'fraud_percentage': round(fraud_cases / total * 100, 2) if total else 0.0,
+            },
+            'daily_fraud': pd.DataFrame({'purchase_time': dates.date, 'class': per_day[days, 1]}),
+            'country_fraud': pd.DataFrame({'country': c['country_values'][countries_present],
+                                           'count': country_fraud[countries_present]}),
+            'devices': device_summary(c['device_id_values'], device_total, device_fraud, self.top_devices,
+                                      self.min_device_transactions),
+            'browser_class': pd.DataFrame.from_dict(browser_class, orient='index', columns=[0, 1])
+                                         .rename_axis('browser').sort_index(),
+            'hour_fraud': pd.Series(fraud_by_hour[hours], index=pd.Index(hours, name='purchase_hour')),
+            'day_fraud': pd.Series(fraud_by_weekday[weekdays].astype(np.int64),
+                                   index=pd.Index(DAY_NAMES[weekdays], name='purchase_day')).sort_index(),
+        }
+
+    def query(self, start_date=None, end_date=None, countries=None, browsers=None, sources=None):
+        """
+        Aggregates for purchases from start_date to end_date (inclusive dates) in the given
+        countries, browsers and sources; None or an empty list means no filter on that column.
+        """
+        # Keyed on the clipped day range, so equivalent date selections share an entry
+        key = self._day_range(start_date, end_date) + (
+            tuple(sorted(countries or ())), tuple(sorted(browsers or ())), tuple(sorted(sources or ())))
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        begin = time.perf_counter()
+        result = self._aggregate(key[0], key[1], list(key[2]), list(key[3]), list(key[4]))
+        logging.info(f"Dashboard query {key} computed in {(time.perf_counter() - begin) * 1000:.1f} ms.")
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return result
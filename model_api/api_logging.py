@@ -0,0 +1,93 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+
+# Fraction of prediction requests whose payload and result are logged
+payload_sample_rate = float(os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', 0.01))
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line. Structured data passed as extra={'fields': {...}} is merged into
+    the record; serialization happens here, i.e. in the background writer thread.
+    """
+
+    def format(self, record):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'logger': record.name,
+            'process': record.process,
+            'message': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues the record untouched. The stock prepare() formats the message
+    in the calling thread; here %-style args and extra fields are only rendered by the listener.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+_listener = None
+
+
+def _start_listener(handlers, level):
+    global _listener
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(level)
+
+
+def _restart_in_child():
+    # The writer thread doesn't survive fork (e.g. gunicorn preload), so each child starts its own
+    if _listener is not None:
+        _start_listener(_listener.handlers, logging.getLogger().level)
+
+
+def setup_logging(filename='app.log', level=logging.INFO):
+    """
+    Route all logging through an in-memory queue to a background thread that writes JSON lines
+    to `filename`, so request handlers never block on disk I/O.
+    """
+    if _listener is not None:
+        return _listener
+
+    file_handler = logging.FileHandler(filename)
+    file_handler.setFormatter(JsonFormatter())
+    _start_listener([file_handler], level)
+    atexit.register(lambda: _listener.stop())
+    os.register_at_fork(after_in_child=_restart_in_child)
+    return _listener
+
+
+def log_prediction(logger, model, payload, result):
+    """
+    Log a prediction request with its payload and result for a sampled fraction of requests.
+    Nothing is built unless INFO is enabled and the request is sampled.
+    """
+    if payload_sample_rate <= 0 or not logger.isEnabledFor(logging.INFO):
+        return
+    if payload_sample_rate < 1 and random.random() >= payload_sample_rate:
+        return
+    logger.info("Prediction", extra={'fields': {'model': model, 'payload': payload, 'result': result}})
@@ -0,0 +1,351 @@
+import asyncio
+import io
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import numpy as np
+import torch
+import torch.nn.functional as F
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from starlette.requests import ClientDisconnect
+from batching import MicroBatcher
+from bulk_scoring import score_stream, QueueReader, NDJSON, FLOAT32_FRAMES
+from api_logging import setup_logging, log_prediction
+from metrics import registry, CONTENT_TYPE, stage_timers, lap, track_requests, timed_predictor
+from model_registry import create_registry
+from prediction_cache import create_cache
+from inference import (
+    input_size, transformer_path, batch_max_size, batch_max_wait_ms, bulk_chunk_rows, model_reload_interval,
+    prediction_cache_size, prediction_cache_ttl, prediction_cache_socket,
+    load_feature_transformer, load_user_state, configure_torch_threads
+)
+
+# Configure logging: JSON lines written by a background thread
+setup_logging('app.log')
+logger = logging.getLogger('asgi_app')
+
+# Versioned models are loaded lazily in each worker on first use. Weights are memory-mapped,
+# so all workers share the same page-cache copy of each artifact.
+models = create_registry()
+prediction_cache = create_cache(models, prediction_cache_size, prediction_cache_ttl, prediction_cache_socket)
+fraud_transformer = load_feature_transformer()
+
+# Per-user activity snapshot: fills in transaction_frequency / transaction_velocity for raw transactions
+user_state = load_user_state()
+
+# Bulk scoring bypasses the batchers: the request body is already a batch
+bulk_models = {
+    'fraud': (timed_predictor(models.predictor('fraud_model'), 'fraud_model'), 'fraud_probability'),
+    'creditcard': (timed_predictor(models.predictor('creditcard_model'), 'creditcard_model'), 'prediction'),
+}
+
+# Per-stage latency histograms
+creditcard_stages = stage_timers('creditcard_model')
+fraud_stages = stage_timers('fraud_model')
+
+executor_threads = int(os.environ.get('ASGI_EXECUTOR_THREADS', 32))
+# Bulk uploads score on their own threads, so long uploads never hold up single predictions
+bulk_threads = int(os.environ.get('ASGI_BULK_THREADS', 8))
+drain_timeout = float(os.environ.get('ASGI_DRAIN_TIMEOUT', 30))
+
+
+class WorkerState:
+    """
+    Per-worker runtime state. Threads don't survive fork, so the batchers and the executor
+    are created in each worker's lifespan instead of at import time.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.bulk_executor = None
+        self.fraud_batcher = None
+        self.creditcard_batcher = None
+        self.in_flight = 0
+
+
+state = WorkerState()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Thread settings are per process, so apply them in each worker
+    configure_torch_threads()
+    state.executor = ThreadPoolExecutor(max_workers=executor_threads, thread_name_prefix='inference')
+    state.bulk_executor = ThreadPoolExecutor(max_workers=bulk_threads, thread_name_prefix='bulk')
+    state.fraud_batcher = MicroBatcher(timed_predictor(models.predictor('fraud_model'), 'fraud_model'),
+                                       batch_max_size, batch_max_wait_ms, name='fraud_model',
+                                       n_features=input_size, dtype=np.float32)
+    state.creditcard_batcher = MicroBatcher(timed_predictor(models.predictor('creditcard_model'), 'creditcard_model'),
+                                            batch_max_size, batch_max_wait_ms, name='creditcard_model')
+    models.start_watcher(model_reload_interval)
+    logger.info("ASGI worker %d started.", os.getpid())
+    yield
+
+    # Drain in-flight requests before tearing down the batchers
+    deadline = time.monotonic() + drain_timeout
+    while state.in_flight and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    if state.in_flight:
+        logger.warning("Shutting down with %d requests still in flight.", state.in_flight)
+    models.stop_watcher()
+    state.fraud_batcher.close()
+    state.creditcard_batcher.close()
+    state.executor.shutdown(wait=True)
+    state.bulk_executor.shutdown(wait=True)
+    logger.info("ASGI worker %d stopped.", os.getpid())
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware('http')
+async def track_in_flight(request, call_next):
+    state.in_flight += 1
+    try:
+        return await call_next(request)
+    finally:
+        state.in_flight -= 1
+
+
+async def run_in_executor(model, batcher, features):
+    # The cache lookup and the batcher may block, so keep them off the event loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(state.executor, prediction_cache.get_or_compute, model, features, batcher.submit)
+
+
+@app.get('/', response_class=PlainTextResponse)
+async def home():
+    return "Model API for Fraud and Credit Card Detection is running!"
+
+
+@app.post('/predict/creditcard')
+@track_requests('creditcard_model')
+async def predict_creditcard(request: Request):
+    try:
+        start = time.perf_counter()
+        data = await request.json()
+        start = lap(creditcard_stages['parse'], start)
+        features = np.array(data['features']).reshape(1, -1)
+        start = lap(creditcard_stages['convert'], start)
+        prediction = await run_in_executor('creditcard_model', state.creditcard_batcher, features)
+        start = lap(creditcard_stages['batch_wait'], start)
+        log_prediction(logger, 'creditcard_model', data, prediction[0].item())
+        response = JSONResponse({'prediction': prediction[0].item()})
+        lap(creditcard_stages['serialize'], start)
+        return response
+    except Exception as e:
+        logger.error("Error in credit prediction: %s", e)
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@app.post('/predict/fraud')
+@track_requests('fraud_model')
+async def predict_fraud(request: Request):
+    try:
+        start = time.perf_counter()
+        data = (await request.json())['data']
+        start = lap(fraud_stages['parse'], start)
+        features = np.asarray(data, dtype=np.float32)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)  # Add batch dimension if missing
+        start = lap(fraud_stages['convert'], start)
+
+        output = torch.from_numpy(await run_in_executor('fraud_model', state.fraud_batcher, features))
+        start = lap(fraud_stages['batch_wait'], start)
+        probabilities = F.softmax(output, dim=1).numpy().tolist()
+        log_prediction(logger, 'fraud_model', data, probabilities)
+        response = JSONResponse({'fraud_predictions': probabilities})
+        lap(fraud_stages['serialize'], start)
+        return response
+    except Exception as e:
+        logger.error("Error in fraud prediction: %s", e)
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@app.post('/predict/fraud/transaction')
+@track_requests('fraud_model')
+async def predict_fraud_transaction(request: Request):
+    try:
+        if fraud_transformer is None:
+            return JSONResponse({'error': f"No feature transformer found at {transformer_path}"}, status_code=503)
+
+        start = time.perf_counter()
+        transactions = (await request.json())['transactions']
+        if isinstance(transactions, dict):
+            transactions = [transactions]  # Single raw transaction
+        start = lap(fraud_stages['parse'], start)
+
+        if user_state is not None:
+            transactions = user_state.enrich(transactions)
+        features = fraud_transformer.transform_records(transactions)
+        start = lap(fraud_stages['convert'], start)
+        output = await run_in_executor('fraud_model', state.fraud_batcher, features)
+        start = lap(fraud_stages['batch_wait'], start)
+        probabilities = output.squeeze(1).tolist()
+        log_prediction(logger, 'fraud_model', transactions, probabilities)
+        response = JSONResponse({'fraud_probabilities': probabilities})
+        lap(fraud_stages['serialize'], start)
+        return response
+    except Exception as e:
+        logger.error("Error in fraud transaction prediction: %s", e)
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+class LoopQueueBridge:
+    """
+    Blocking get() for a scoring thread over an asyncio.Queue filled on the event loop, so
+    feeding the body never needs a thread of its own.
+    """
+
+    def __init__(self, chunks, loop):
+        self.chunks = chunks
+        self.loop = loop
+
+    def get(self):
+        return asyncio.run_coroutine_threadsafe(self.chunks.get(), self.loop).result()
+
+
+class BulkScoringEndpoint:
+    """
+    Raw ASGI handler for POST /predict/batch.
+
+    The request body is read and the response written incrementally at the same time, which
+    a regular StreamingResponse can't do (it consumes `receive` to watch for disconnects).
+    Body chunks flow to a scoring thread and encoded results flow back, both through bounded
+    queues, so memory stays flat however large the upload is. The end-of-body marker is always
+    sent, and the results are always drained, so a disconnect never strands the scoring thread.
+    """
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        model = request.query_params.get('model', 'fraud')
+        if model not in bulk_models:
+            response = JSONResponse({'error': f"Unknown model '{model}', expected one of {list(bulk_models)}"},
+                                    status_code=400)
+            await response(scope, receive, send)
+            return
+        predict_fn, output_key = bulk_models[model]
+        accept = FLOAT32_FRAMES if FLOAT32_FRAMES in request.headers.get('accept', '') else NDJSON
+        content_type = request.headers.get('content-type')
+        loop = asyncio.get_running_loop()
+
+        body_chunks = asyncio.Queue(maxsize=8)
+        results = asyncio.Queue(maxsize=8)
+        abandoned = threading.Event()
+
+        def put_result(chunk):
+            asyncio.run_coroutine_threadsafe(results.put(chunk), loop).result()
+
+        def score():
+            reader = QueueReader(LoopQueueBridge(body_chunks, loop))
+            try:
+                stream = io.BufferedReader(reader)
+                for chunk in score_stream(stream, content_type, predict_fn, output_key,
+                                          accept=accept, chunk_rows=bulk_chunk_rows):
+                    if abandoned.is_set():
+                        break
+                    put_result(chunk)
+            except Exception as e:
+                # An abandoned upload ends mid-body, so its parse error is expected
+                if not abandoned.is_set():
+                    logger.error("Error in batch prediction: %s", e)
+                    if accept == NDJSON:
+                        put_result((json.dumps({'error': str(e)}) + '\n').encode())
+            finally:
+                # Consume whatever is left of the body so the feeder never blocks on a full queue
+                while not reader.finished:
+                    reader.finished = reader.chunks.get() is None
+                put_result(None)
+
+        async def feed_body():
+            ended = False
+            try:
+                async for chunk in request.stream():
+                    if chunk:
+                        await body_chunks.put(chunk)
+                await body_chunks.put(None)
+                ended = True
+            except ClientDisconnect:
+                logger.warning("Client disconnected during a batch prediction upload.")
+            finally:
+                if not ended:
+                    # The body is incomplete: drop what the scorer hasn't read and end it right away
+                    abandoned.set()
+                    while not body_chunks.empty():
+                        body_chunks.get_nowait()
+                    body_chunks.put_nowait(None)
+
+        feeder = asyncio.ensure_future(feed_body())
+        scorer = loop.run_in_executor(state.bulk_executor, score)
+        finished = False
+        try:
+            await send({'type': 'http.response.start', 'status': 200,
+                        'headers': [(b'content-type', accept.encode())]})
+            while True:
+                chunk = await results.get()
+                if chunk is None:
+                    finished = True
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if not finished:
+                abandoned.set()
+            if not feeder.done():
+                feeder.cancel()
+            await asyncio.gather(feeder, return_exceptions=True)
+            while not finished:
+                finished = await results.get() is None
+            await scorer
+
+
+app.router.add_route('/predict/batch', BulkScoringEndpoint(), methods=['POST'])
+
+
+@app.get('/metrics')
+async def metrics():
+    # Metrics are per worker process; Prometheus should scrape each worker or aggregate by pid
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.get('/models')
+async def model_versions():
+    # Versions are per worker; each worker's watcher picks up new artifacts independently
+    return models.describe()
+
+
+@app.post('/models/reload')
+async def reload_models(force: bool = False):
+    try:
+        loop = asyncio.get_running_loop()
+        swapped = await loop.run_in_executor(state.executor, lambda: models.reload(force=force))
+        return {'swapped': swapped, 'models': models.describe()}
+    except Exception as e:
+        logger.error("Error reloading models: %s", e)
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@app.get('/stats/cache')
+async def cache_stats():
+    return prediction_cache.stats()
+
+
+@app.get('/stats/batching')
+async def batching_stats():
+    return {
+        'fraud_model': state.fraud_batcher.stats(),
+        'creditcard_model': state.creditcard_batcher.stats(),
+        'in_flight': state.in_flight,
+    }
+
+
+if __name__ == '__main__':
+    # Single-process development server; use gunicorn_conf.py for multi-worker serving
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)),
+                timeout_graceful_shutdown=int(drain_timeout))
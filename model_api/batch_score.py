@@ -0,0 +1,273 @@
+"""
+Offline batch scoring for preprocessed fraud / credit card data.
+
+Reads the input (CSV or Parquet) in fixed-size chunks, scores them in a process pool and writes one
+Parquet part file per chunk, recording progress in a checkpoint so an interrupted run can resume.
+
+Model inputs are built the way the models were trained: fraud rows go through the fitted
+FraudFeatureTransformer (including its final StandardScaler), credit card rows through the saved
+credit card StandardScaler. Inputs that don't have the model's width are rejected.
+
+Run from the repository root, e.g.:
+    python model_api/batch_score.py --model fraud --input merged_data.csv --output scores/fraud
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import torch
+from inference import (
+    input_size, transformer_path, creditcard_scaler_path, CREDITCARD_FEATURES,
+    load_creditcard_model, load_fraud_model, load_feature_transformer, load_creditcard_scaler
+)
+from scripts.feature_transformer import NUMERIC_COLUMNS, CATEGORICAL_COLUMNS
+
+# Raw transaction columns the transformer encodes when the input isn't feature-engineered yet
+RAW_FRAUD_COLUMNS = [column for column in NUMERIC_COLUMNS if column not in ('hour_of_day', 'day_of_week')] \
+    + ['purchase_time'] + CATEGORICAL_COLUMNS
+
+SECONDS_PER_DAY = 60 * 60 * 24
+
+# Per-process state set up by init_worker
+_worker = {}
+
+
+def load_preprocessor(model_name):
+    """
+    The fitted input transform of a model: the FraudFeatureTransformer for 'fraud', the credit
+    card StandardScaler for 'creditcard'. The models were trained on scaled inputs, so a missing
+    artifact is an error.
+    """
+    if model_name == 'fraud':
+        transformer = load_feature_transformer()
+        if transformer is None:
+            raise FileNotFoundError(f"No feature transformer found at {transformer_path}; export it with "
+                                    f"FE.feature_engineering(..., transformer_path=...).")
+        return transformer
+    scaler = load_creditcard_scaler()
+    if scaler is None:
+        raise FileNotFoundError(f"No credit card scaler found at {creditcard_scaler_path}; save the "
+                                f"StandardScaler fitted on the training split there with joblib.dump.")
+    return scaler
+
+
+def creditcard_features(frame, scaler):
+    """
+    The credit card columns the scaler was fitted on, in its order, as a float64 frame.
+    time_in_days and Amount_scaled are derived from Time and Amount when the input lacks them.
+    """
+    columns = list(getattr(scaler, 'feature_names_in_', CREDITCARD_FEATURES[:scaler.n_features_in_]))
+    derivable = {'time_in_days': 'Time', 'Amount_scaled': 'Amount'}
+    missing = [column for column in columns if column not in frame and derivable.get(column) not in frame]
+    if missing:
+        raise ValueError(f"Credit card input is missing columns {missing}")
+
+    features = frame.reindex(columns=columns).astype(np.float64)
+    if 'time_in_days' not in frame and 'time_in_days' in columns:
+        features['time_in_days'] = frame['Time'] / SECONDS_PER_DAY
+    if 'Amount_scaled' not in frame and 'Amount_scaled' in columns:
+        # The notebook standardized Amount over the full table with a scaler that wasn't saved. The
+        # training scaler standardized Amount and Amount_scaled again, so the affine map between
+        # the two follows from its statistics: (Amount - mean) / std of the full table.
+        amount, scaled = columns.index('Amount'), columns.index('Amount_scaled')
+        slope = scaler.scale_[scaled] / scaler.scale_[amount]
+        features['Amount_scaled'] = (frame['Amount'] - scaler.mean_[amount]) * slope + scaler.mean_[scaled]
+    return features
+
+
+def feature_matrix(model_name, frame, preprocessor, n_features):
+    """
+    The float32 model input matrix for a chunk, with the columns in training order.
+
+    Fraud input is either feature-engineered (FE.feature_engineering output: every column in the
+    transformer's feature_names_) or raw transactions with transaction_frequency and
+    transaction_velocity already computed over the full history.
+    """
+    if model_name == 'fraud':
+        feature_names = preprocessor.feature_names_
+        if all(column in frame for column in feature_names):
+            features = frame[feature_names].to_numpy(dtype=np.float64)
+            if preprocessor.feature_scaler_ is not None:
+                features = preprocessor.feature_scaler_.transform(features)
+        else:
+            missing = [column for column in RAW_FRAUD_COLUMNS if column not in frame]
+            if missing:
+                raise ValueError(f"Fraud input has neither the transformer's {len(feature_names)} feature "
+                                 f"columns nor the raw columns; missing {missing}")
+            features = preprocessor.transform(frame)
+    else:
+        features = creditcard_features(frame, preprocessor)
+        if not hasattr(preprocessor, 'feature_names_in_'):
+            features = features.to_numpy()
+        features = preprocessor.transform(features)
+
+    if features.shape[1] != n_features:
+        raise ValueError(f"{model_name} input has {features.shape[1]} features, the model expects {n_features}.")
+    return np.ascontiguousarray(features, dtype=np.float32)
+
+
+def init_worker(model_name, threads):
+    """
+    Load the model and its input transform once per worker process and pin torch to `threads`
+    intra-op threads so workers don't oversubscribe the CPU.
+    """
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    if model_name == 'fraud':
+        _worker['model'] = load_fraud_model()
+        _worker['n_features'] = input_size
+    else:
+        _worker['model'] = load_creditcard_model()
+        _worker['n_features'] = _worker['model'].n_features_in_
+    _worker['preprocessor'] = load_preprocessor(model_name)
+    _worker['name'] = model_name
+
+
+def score_features(model_name, model, features):
+    """
+    Return (prediction, fraud_probability) arrays for a feature matrix.
+    """
+    if model_name == 'fraud':
+        with torch.no_grad():
+            probability = model(torch.from_numpy(features)).numpy()[:, 0]
+        return (probability > 0.5).astype(np.int8), probability
+    probabilities = model.predict_proba(features)
+    prediction = model.classes_[probabilities.argmax(axis=1)]
+    return prediction, probabilities[:, 1].astype(np.float32)
+
+
+def score_chunk(chunk_index, row_offset, frame, id_column, output_dir):
+    """
+    Score one chunk in a worker and write it atomically as part-XXXXXX.parquet.
+    """
+    features = feature_matrix(_worker['name'], frame, _worker['preprocessor'], _worker['n_features'])
+    prediction, probability = score_features(_worker['name'], _worker['model'], features)
+
+    columns = {'row': np.arange(row_offset, row_offset + len(frame), dtype=np.int64)}
+    if id_column:
+        columns[id_column] = frame[id_column].to_numpy()
+    columns['prediction'] = prediction
+    columns['fraud_probability'] = probability
+
+    path = os.path.join(output_dir, f"part-{chunk_index:06d}.parquet")
+    tmp_path = path + '.tmp'
+    pq.write_table(pa.table(columns), tmp_path)
+    os.replace(tmp_path, path)
+    return chunk_index, len(frame)
+
+
+def iter_chunks(input_path, chunk_rows):
+    """
+    Yield DataFrame chunks of chunk_rows rows from a CSV or Parquet file.
+    """
+    if input_path.endswith('.parquet'):
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunk_rows)
+
+
+def load_checkpoint(path, run_config):
+    """
+    Return the set of completed chunk indices, checking the checkpoint belongs to this run.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint['config'] != run_config:
+        raise ValueError(f"Checkpoint {path} was written for a different run: {checkpoint['config']}")
+    return set(checkpoint['completed'])
+
+
+def save_checkpoint(path, run_config, completed):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'config': run_config, 'completed': sorted(completed)}, f)
+    os.replace(tmp_path, path)
+
+
+def record_done(done, completed, checkpoint_path, run_config):
+    rows = 0
+    for future in done:
+        chunk_index, n_rows = future.result()
+        completed.add(chunk_index)
+        rows += n_rows
+    save_checkpoint(checkpoint_path, run_config, completed)
+    return rows
+
+
+def batch_score(model_name, input_path, output_dir, chunk_rows=100_000, workers=None,
+                threads_per_worker=None, id_column=None):
+    """
+    Score input_path with the chosen model into Parquet part files under output_dir.
+    """
+    workers = workers or os.cpu_count()
+    load_preprocessor(model_name)  # Fail before starting the pool if the input transform is missing
+    threads_per_worker = threads_per_worker or max(1, os.cpu_count() // workers)
+    os.makedirs(output_dir, exist_ok=True)
+
+    run_config = {'model': model_name, 'input': os.path.abspath(input_path), 'chunk_rows': chunk_rows}
+    checkpoint_path = os.path.join(output_dir, '_checkpoint.json')
+    completed = load_checkpoint(checkpoint_path, run_config)
+    if completed:
+        print(f"Resuming: {len(completed)} chunks already scored.")
+        logging.info(f"Resuming batch scoring with {len(completed)} completed chunks.")
+
+    print(f"Scoring {input_path} with {model_name} model ({workers} workers x {threads_per_worker} threads)...")
+    start = time.perf_counter()
+    scored_rows = 0
+    pending = set()
+    row_offset = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(model_name, threads_per_worker)) as pool:
+        for chunk_index, frame in enumerate(iter_chunks(input_path, chunk_rows)):
+            offset, row_offset = row_offset, row_offset + len(frame)
+            if chunk_index in completed:
+                continue
+            pending.add(pool.submit(score_chunk, chunk_index, offset, frame, id_column, output_dir))
+
+            # Keep at most two chunks per worker in memory
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                scored_rows += record_done(done, completed, checkpoint_path, run_config)
+
+        done, pending = wait(pending)
+        scored_rows += record_done(done, completed, checkpoint_path, run_config)
+
+    elapsed = time.perf_counter() - start
+    print(f"Scored {scored_rows:,} rows in {elapsed:.1f}s ({scored_rows / max(elapsed, 1e-9):,.0f} rows/s).")
+    logging.info(f"Batch scoring finished: {scored_rows} rows in {elapsed:.1f}s.")
+    return scored_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline batch scoring for the fraud and credit card models.")
+    parser.add_argument('--model', choices=['fraud', 'creditcard'], required=True)
+    parser.add_argument('--input', required=True, help="Preprocessed CSV or Parquet file")
+    parser.add_argument('--output', required=True, help="Output directory for Parquet part files")
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--threads-per-worker', type=int, default=None,
+                        help="torch intra-op threads per worker (default: CPU count / workers)")
+    parser.add_argument('--id-column', default=None, help="Input column copied to the output")
+    args = parser.parse_args()
+
+    os.makedirs("logs", exist_ok=True)
+    logging.basicConfig(
+        filename='logs/batch_scoring.log',
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    batch_score(args.model, args.input, args.output, args.chunk_rows, args.workers,
+                args.threads_per_worker, args.id_column)
+
+
+if __name__ == '__main__':
+    main()
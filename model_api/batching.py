@@ -0,0 +1,175 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+
+class _BatchItem:
+    __slots__ = ('features', 'future')
+
+    def __init__(self, features):
+        self.features = features
+        self.future = Future()
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching scheduler for one model.
+
+    Request threads call submit() with a 2D feature array. A background worker gathers
+    queued requests until it has max_batch_size rows or max_wait_ms has passed since the
+    first one arrived, stacks them into one array, runs predict_fn once and hands each
+    caller back its own slice of the output.
+
+    Requests are checked before they are queued (2D, numeric, n_features columns when given), and
+    a batch that still fails is retried request by request, so one bad request never fails the
+    others batched with it.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0, name='model', n_features=None, dtype=None):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self.n_features = n_features
+        self.dtype = dtype
+
+        self._queue = queue.Queue()
+        self._carry = None
+        self._closed = False
+
+        # Only the worker thread writes these, so plain ints are enough
+        self.batches = 0
+        self.rows = 0
+        self.requests = 0
+        self.last_batch_size = 0
+
+        self._worker = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._worker.start()
+        logging.info(f"Micro-batcher '{name}' started (max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms}).")
+
+    def submit(self, features, timeout=None):
+        """
+        Queue a (n_rows, n_features) array and block until its predictions are ready.
+        """
+        if self._closed:
+            raise RuntimeError(f"Micro-batcher '{self.name}' is closed.")
+        features = np.asarray(features)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        if features.ndim != 2:
+            raise ValueError(f"Expected a 2D feature array, got {features.ndim} dimensions.")
+        if not (np.issubdtype(features.dtype, np.number) or features.dtype == np.bool_):
+            raise ValueError(f"Expected numeric features, got dtype {features.dtype}.")
+        if self.n_features is not None and features.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {features.shape[1]}.")
+        if self.dtype is not None:
+            features = features.astype(self.dtype, copy=False)
+        item = _BatchItem(features)
+        self._queue.put(item)
+        return item.future.result(timeout=timeout)
+
+    def _next_item(self, timeout):
+        if self._carry is not None:
+            item, self._carry = self._carry, None
+            return item
+        return self._queue.get(timeout=timeout)
+
+    def _run(self):
+        while True:
+            item = self._next_item(timeout=None)
+            if item is None:
+                break
+
+            batch = [item]
+            n_rows = len(item.features)
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while n_rows < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._next_item(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                if n_rows + len(item.features) > self.max_batch_size:
+                    # Doesn't fit; it starts the next batch instead
+                    self._carry = item
+                    break
+                batch.append(item)
+                n_rows += len(item.features)
+
+            self._process(batch, n_rows)
+            if stop:
+                break
+
+    def _process(self, batch, n_rows):
+        try:
+            if len(batch) == 1:
+                stacked = batch[0].features
+            else:
+                stacked = np.concatenate([item.features for item in batch])
+            outputs = self.predict_fn(stacked)
+
+            offset = 0
+            for item in batch:
+                size = len(item.features)
+                item.future.set_result(outputs[offset:offset + size])
+                offset += size
+        except Exception as e:
+            if len(batch) == 1:
+                logging.error(f"Micro-batcher '{self.name}' failed on a request of {n_rows} rows: {e}")
+                batch[0].future.set_exception(e)
+            else:
+                # Find the failing request(s): run each one alone so only they get the error
+                logging.warning(f"Micro-batcher '{self.name}' failed on a batch of {n_rows} rows ({e}); "
+                                f"retrying its {len(batch)} requests one by one.")
+                for item in batch:
+                    if not item.future.done():
+                        self._process_one(item)
+
+        self.batches += 1
+        self.rows += n_rows
+        self.requests += len(batch)
+        self.last_batch_size = n_rows
+
+    def _process_one(self, item):
+        try:
+            item.future.set_result(self.predict_fn(item.features))
+        except Exception as e:
+            logging.error(f"Micro-batcher '{self.name}' failed on a request of {len(item.features)} rows: {e}")
+            item.future.set_exception(e)
+
+    def stats(self):
+        """
+        Queue depth and batch fill metrics for monitoring.
+        """
+        return {
+            'name': self.name,
+            'queue_depth': self._queue.qsize(),
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'batches': self.batches,
+            'requests': self.requests,
+            'rows': self.rows,
+            'last_batch_size': self.last_batch_size,
+            'avg_batch_size': self.rows / self.batches if self.batches else 0.0,
+            'batch_fill_ratio': self.rows / (self.batches * self.max_batch_size) if self.batches else 0.0,
+        }
+
+    def close(self, timeout=None):
+        """
+        Stop accepting work, let the worker finish queued batches and join it.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join(timeout)
+        logging.info(f"Micro-batcher '{self.name}' stopped.")
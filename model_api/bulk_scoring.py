@@ -0,0 +1,185 @@
+import io
+import json
+import logging
+import struct
+import numpy as np
+
+# Content types accepted by /predict/batch
+NDJSON = 'application/x-ndjson'
+FLOAT32_FRAMES = 'application/x-float32-frames'
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+
+# Raw float32 frames: little-endian uint32 n_rows, uint32 n_cols, then row-major float32 values
+FRAME_HEADER = struct.Struct('<II')
+
+read_block_size = 64 * 1024
+
+
+def read_exact(stream, size):
+    """
+    Read exactly `size` bytes (fewer only at end of stream).
+    """
+    parts = []
+    while size > 0:
+        part = stream.read(size)
+        if not part:
+            break
+        parts.append(part)
+        size -= len(part)
+    return parts[0] if len(parts) == 1 else b''.join(parts)
+
+
+def iter_lines(stream):
+    """
+    Yield non-empty lines from a byte stream without reading it all into memory.
+    """
+    pending = b''
+    while True:
+        block = stream.read(read_block_size)
+        if not block:
+            break
+        lines = (pending + block).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+
+def iter_ndjson_chunks(stream, chunk_rows):
+    """
+    Parse NDJSON records ({"features": [...]} or {"data": [...]}, optional "id") into
+    (ids, float32 array) chunks of up to chunk_rows rows.
+    """
+    ids, rows = [], []
+    for line in iter_lines(stream):
+        record = json.loads(line)
+        rows.append(record['features'] if 'features' in record else record['data'])
+        ids.append(record.get('id'))
+        if len(rows) == chunk_rows:
+            yield ids, np.asarray(rows, dtype=np.float32)
+            ids, rows = [], []
+    if rows:
+        yield ids, np.asarray(rows, dtype=np.float32)
+
+
+def iter_float32_chunks(stream, chunk_rows):
+    """
+    Decode raw float32 frames into arrays of up to chunk_rows rows. Each array is a
+    zero-copy view over the bytes read from the stream.
+    """
+    while True:
+        header = read_exact(stream, FRAME_HEADER.size)
+        if not header:
+            break
+        if len(header) < FRAME_HEADER.size:
+            raise ValueError("Truncated float32 frame header.")
+        n_rows, n_cols = FRAME_HEADER.unpack(header)
+        while n_rows > 0:
+            rows = min(n_rows, chunk_rows)
+            payload = read_exact(stream, rows * n_cols * 4)
+            if len(payload) < rows * n_cols * 4:
+                raise ValueError("Truncated float32 frame body.")
+            yield None, np.frombuffer(payload, dtype='<f4').reshape(rows, n_cols)
+            n_rows -= rows
+
+
+def arrow_batch_to_array(batch):
+    """
+    Convert an Arrow record batch to a 2D float32 array. A fixed-size-list 'features' column
+    is mapped zero-copy; otherwise the numeric columns are stacked in order.
+    """
+    import pyarrow as pa
+
+    if 'features' in batch.schema.names:
+        column = batch.column('features')
+        if pa.types.is_fixed_size_list(column.type):
+            values = column.flatten()
+            if values.type != pa.float32():
+                values = values.cast(pa.float32())
+            return values.to_numpy(zero_copy_only=False).reshape(len(column), column.type.list_size)
+    return np.column_stack([
+        batch.column(i).to_numpy(zero_copy_only=False) for i in range(batch.num_columns)
+    ]).astype(np.float32, copy=False)
+
+
+def iter_arrow_chunks(stream, chunk_rows):
+    """
+    Decode an Arrow IPC stream batch by batch, re-slicing batches larger than chunk_rows.
+    """
+    import pyarrow as pa
+
+    reader = pa.ipc.open_stream(pa.PythonFile(stream, mode='r'))
+    for batch in reader:
+        for offset in range(0, batch.num_rows, chunk_rows):
+            yield None, arrow_batch_to_array(batch.slice(offset, chunk_rows))
+
+
+def iter_input_chunks(stream, content_type, chunk_rows):
+    content_type = (content_type or NDJSON).split(';')[0].strip()
+    if content_type == FLOAT32_FRAMES:
+        return iter_float32_chunks(stream, chunk_rows)
+    if content_type == ARROW_STREAM:
+        return iter_arrow_chunks(stream, chunk_rows)
+    if content_type in (NDJSON, 'application/json', 'application/jsonl'):
+        return iter_ndjson_chunks(stream, chunk_rows)
+    raise ValueError(f"Unsupported content type: {content_type}")
+
+
+def score_stream(stream, content_type, predict_fn, output_key, accept=NDJSON, chunk_rows=4096):
+    """
+    Score a request body chunk by chunk and yield the encoded response chunks.
+
+    Memory stays bounded by chunk_rows regardless of the body size. With accept set to
+    FLOAT32_FRAMES each chunk of outputs is returned as one (n_rows, 1) float32 frame,
+    otherwise as NDJSON lines of {output_key: value} (plus the input "id" when given).
+    """
+    binary = (accept or '').split(';')[0].strip() == FLOAT32_FRAMES
+    total = 0
+    for ids, features in iter_input_chunks(stream, content_type, chunk_rows):
+        outputs = np.asarray(predict_fn(features)).reshape(len(features), -1)[:, 0]
+        total += len(features)
+        if binary:
+            values = outputs.astype('<f4')
+            yield FRAME_HEADER.pack(len(values), 1) + values.tobytes()
+            continue
+        out = io.StringIO()
+        values = outputs.tolist()
+        if ids is None or not any(i is not None for i in ids):
+            for value in values:
+                out.write(json.dumps({output_key: value}))
+                out.write('\n')
+        else:
+            for record_id, value in zip(ids, values):
+                out.write(json.dumps({'id': record_id, output_key: value}))
+                out.write('\n')
+        yield out.getvalue().encode()
+    logging.info(f"Bulk scoring finished: {total} rows.")
+
+
+class QueueReader(io.RawIOBase):
+    """
+    Blocking file-like view over a queue of byte chunks (None marks the end), used to feed
+    an async request body to score_stream running in a worker thread.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.pending = b''
+        self.finished = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending and not self.finished:
+            chunk = self.chunks.get()
+            if chunk is None:
+                self.finished = True
+            else:
+                self.pending = memoryview(chunk)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
@@ -0,0 +1,74 @@
+"""
+Export the RNN fraud model to a frozen, inference-optimized TorchScript artifact.
+
+Run from the repository root:
+    python model_api/compile_model.py
+
+The export is checked against the eager model before it is written, and serving picks it up with
+FRAUD_MODEL_BACKEND=torchscript.
+"""
+import argparse
+import logging
+import time
+import torch
+from inference import input_size, fraud_model_path, compiled_fraud_model_path, load_fraud_model
+
+
+def compile_fraud_model(model):
+    """
+    Script, freeze and optimize the eager model for CPU inference.
+    """
+    scripted = torch.jit.script(model.eval())
+    frozen = torch.jit.freeze(scripted)
+    return torch.jit.optimize_for_inference(frozen)
+
+
+def check_parity(eager_model, compiled_model, n_rows=4096, batch_sizes=(1, 7, 64, 4096), atol=1e-6, seed=0):
+    """
+    Compare compiled and eager outputs on random inputs of several batch sizes.
+    Returns the max absolute difference and raises AssertionError above `atol`.
+    """
+    generator = torch.Generator().manual_seed(seed)
+    features = torch.randn(n_rows, input_size, generator=generator)
+    max_diff = 0.0
+    with torch.no_grad():
+        for batch_size in batch_sizes:
+            batch = features[:batch_size]
+            diff = (compiled_model(batch) - eager_model(batch)).abs().max().item()
+            max_diff = max(max_diff, diff)
+    if max_diff > atol:
+        raise AssertionError(f"Compiled fraud model differs from eager model by {max_diff:.3g} (atol={atol}).")
+    return max_diff
+
+
+def warm_up(model, batch_sizes=(1, 8, 64), iterations=3):
+    """
+    Run a few inferences per batch size so the first real request doesn't pay for graph
+    specialization and allocator warm-up.
+    """
+    start = time.perf_counter()
+    with torch.no_grad():
+        for batch_size in batch_sizes:
+            features = torch.zeros(batch_size, input_size)
+            for _ in range(iterations):
+                model(features)
+    logging.info(f"Fraud model warm-up took {time.perf_counter() - start:.3f}s.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export RNN_Fraud.pt to TorchScript.")
+    parser.add_argument('--input', default=fraud_model_path)
+    parser.add_argument('--output', default=compiled_fraud_model_path)
+    args = parser.parse_args()
+
+    eager_model = load_fraud_model(args.input, backend='eager')
+    compiled_model = compile_fraud_model(eager_model)
+    max_diff = check_parity(eager_model, compiled_model)
+    print(f"Parity check passed (max abs diff {max_diff:.3g}).")
+
+    compiled_model.save(args.output)
+    print(f"Compiled fraud model saved to {args.output}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+# Multi-worker ASGI serving for the model API.
+# Run from the repository root: gunicorn -c model_api/gunicorn_conf.py
+import multiprocessing
+import os
+
+wsgi_app = 'asgi_app:app'
+pythonpath = 'model_api'
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# Import the app once in the master. Models load lazily in each worker from memory-mapped
+# artifacts, so workers still share one page-cache copy of the weights.
+preload_app = True
+
+# Give in-flight requests time to finish on SIGTERM before workers are killed
+graceful_timeout = int(os.environ.get('ASGI_DRAIN_TIMEOUT', 30))
+timeout = 60
+keepalive = 5
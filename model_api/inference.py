@@ -0,0 +1,192 @@
+import logging
+import os
+import sys
+import joblib
+import torch
+from model_definitions import RNNModel, SingleStepRNNModel
+
+# Make the shared scripts package importable when run from model_api/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.feature_transformer import FraudFeatureTransformer
+from scripts.user_state import UserFeatureStore
+
+input_size = 194  # Input size of the RNN fraud model
+
+# Credit card model inputs in training order: the creditcard.csv columns, then the two features the
+# data analysis notebook adds (time_in_days = Time in days, Amount_scaled = standardized Amount)
+CREDITCARD_RAW_FEATURES = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+CREDITCARD_FEATURES = CREDITCARD_RAW_FEATURES + ['time_in_days', 'Amount_scaled']
+
+creditcard_model_path = 'model_api/models/Decision_Tree.joblib'
+fraud_model_path = 'model_api/models/RNN_Fraud.pt'
+compiled_fraud_model_path = 'model_api/models/RNN_Fraud.torchscript.pt'
+transformer_path = 'model_api/models/fraud_feature_transformer.joblib'
+creditcard_scaler_path = 'model_api/models/creditcard_scaler.joblib'
+user_state_path = 'model_api/models/user_state.npz'
+
+# Directory the serving model registry scans for versioned artifacts, and how often (seconds,
+# 0 disables) each worker checks it for new versions
+model_dir = os.environ.get('MODEL_DIR', 'model_api/models')
+model_reload_interval = float(os.environ.get('MODEL_RELOAD_INTERVAL', 30))
+
+# 'eager' runs RNNModel directly, 'torchscript' loads the artifact written by compile_model.py,
+# 'quantized' serves a dynamic int8 copy of the eager model (see quantization_report.py)
+fraud_model_backend = os.environ.get('FRAUD_MODEL_BACKEND', 'eager')
+
+# 'sklearn' calls the Decision Tree directly, 'compiled' scores it with tree_scorer.CompiledTree
+creditcard_model_backend = os.environ.get('CREDITCARD_MODEL_BACKEND', 'sklearn')
+
+# Prediction cache for /predict/* routes: max entries per worker (0 disables), entry TTL in
+# seconds, and an optional Unix socket of a shared cache server (prediction_cache.py)
+prediction_cache_size = int(os.environ.get('PREDICTION_CACHE_SIZE', 10_000))
+prediction_cache_ttl = float(os.environ.get('PREDICTION_CACHE_TTL', 60))
+prediction_cache_socket = os.environ.get('PREDICTION_CACHE_SOCKET')
+
+# torch CPU threads per serving process; unset keeps torch's defaults. With several workers on one
+# host, intra-op threads x workers should not exceed the number of cores.
+torch_intra_op_threads = os.environ.get('TORCH_INTRA_OP_THREADS')
+torch_inter_op_threads = os.environ.get('TORCH_INTER_OP_THREADS')
+
+# Micro-batching settings shared by the Flask and ASGI servers
+batch_max_size = int(os.environ.get('BATCH_MAX_SIZE', 64))
+batch_max_wait_ms = float(os.environ.get('BATCH_MAX_WAIT_MS', 2.0))
+
+# Rows scored per chunk by the streaming /predict/batch endpoint
+bulk_chunk_rows = int(os.environ.get('BULK_CHUNK_ROWS', 4096))
+
+
+def configure_torch_threads(intra_op=None, inter_op=None):
+    """
+    Apply the torch thread settings for this process. Call once per worker, before serving.
+    """
+    intra_op = intra_op or torch_intra_op_threads
+    inter_op = inter_op or torch_inter_op_threads
+    if intra_op:
+        torch.set_num_threads(int(intra_op))
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(int(inter_op))
+        except RuntimeError as e:
+            # Only allowed before the inter-op pool has started, e.g. not in a forked worker that inherited it
+            logging.warning(f"Could not set torch inter-op threads: {e}")
+    logging.info(f"torch threads: intra-op={torch.get_num_threads()}, inter-op={torch.get_num_interop_threads()}.")
+
+
+def quantize_fraud_model(model):
+    """
+    Dynamic int8 copy of an eager RNNModel: weights are stored as int8 (per output channel) and
+    activations are quantized on the fly. nn.RNN isn't supported by quantize_dynamic, so the
+    single-step equivalent made of Linear layers is quantized instead.
+    """
+    single_step = SingleStepRNNModel.from_rnn_model(model)
+    return torch.ao.quantization.quantize_dynamic(
+        single_step, {torch.nn.Linear: torch.ao.quantization.per_channel_dynamic_qconfig})
+
+
+def load_creditcard_model(path=creditcard_model_path, backend=None, mmap=False):
+    """
+    Load the Decision Tree credit card model. With the 'compiled' backend its node arrays are
+    extracted into an array-based scorer with identical outputs. With mmap, arrays stored
+    uncompressed in the file are memory-mapped read-only instead of copied.
+    """
+    backend = backend or creditcard_model_backend
+    if backend not in ('sklearn', 'compiled'):
+        raise ValueError(f"Unknown credit card model backend: {backend}")
+    model = joblib.load(path, mmap_mode='r' if mmap else None)
+    if backend == 'compiled':
+        from tree_scorer import CompiledTree
+        model = CompiledTree.from_sklearn(model)
+        logging.info(f"Credit card model loaded from {path} and compiled to node arrays.")
+        return model
+    logging.info(f"Credit card model loaded from {path}.")
+    return model
+
+
+def load_fraud_model(path=None, backend=None, mmap=False):
+    """
+    Load the RNN fraud model in inference mode. With the 'torchscript' backend the compiled
+    artifact is loaded instead of the eager module and warmed up before serving; with the
+    'quantized' backend the eager weights are quantized to int8 at load time. With mmap, the
+    eager weights are used straight from the memory-mapped file, so processes share the pages.
+    """
+    backend = backend or fraud_model_backend
+    if backend == 'torchscript':
+        from compile_model import warm_up
+        path = path or compiled_fraud_model_path
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Compiled fraud model {path} not found; "
+                                    f"generate it with `python model_api/compile_model.py`.")
+        model = torch.jit.load(path)
+        warm_up(model)
+        logging.info(f"Compiled fraud model loaded from {path}.")
+        return model
+    if backend not in ('eager', 'quantized'):
+        raise ValueError(f"Unknown fraud model backend: {backend}")
+
+    path = path or fraud_model_path
+    model = RNNModel(input_size)
+    model.load_state_dict(torch.load(path, mmap=mmap), assign=mmap)
+    model.eval()
+    if backend == 'quantized':
+        from compile_model import warm_up
+        model = quantize_fraud_model(model)
+        warm_up(model)
+        logging.info(f"Fraud model loaded from {path} and quantized to int8.")
+        return model
+    logging.info(f"Fraud model loaded from {path}.")
+    return model
+
+
+def load_feature_transformer(path=transformer_path):
+    """
+    Load the fitted feature transformer, or return None if it hasn't been exported.
+    """
+    if not os.path.exists(path):
+        return None
+    transformer = FraudFeatureTransformer.load(path)
+    if transformer.n_features_ != input_size:
+        logging.warning(f"Feature transformer produces {transformer.n_features_} features, "
+                        f"fraud model expects {input_size}.")
+    return transformer
+
+
+def load_creditcard_scaler(path=creditcard_scaler_path):
+    """
+    Load the StandardScaler fitted on the credit card training split (the notebook's `scaler`,
+    saved with joblib.dump), or return None if it hasn't been exported.
+    """
+    if not os.path.exists(path):
+        return None
+    scaler = joblib.load(path)
+    logging.info(f"Credit card feature scaler loaded from {path}.")
+    return scaler
+
+
+def fraud_predictor(fraud_model):
+    """
+    Batch predict function for the RNN fraud model: float32 array in, sigmoid outputs out.
+    """
+    def run_fraud_model(features):
+        with torch.no_grad():
+            return fraud_model(torch.from_numpy(features)).numpy()
+    return run_fraud_model
+
+
+def creditcard_predictor(creditcard_model):
+    """
+    Batch predict function for the credit card model.
+    """
+    def run_creditcard_model(features):
+        # One predict_proba call per batch; argmax over classes_ is what predict() does
+        probabilities = creditcard_model.predict_proba(features)
+        return creditcard_model.classes_[probabilities.argmax(axis=1)]
+    return run_creditcard_model
+
+
+def load_user_state(path=user_state_path):
+    """
+    Load the per-user feature state snapshot, or return None if it hasn't been built.
+    """
+    if not os.path.exists(path):
+        return None
+    return UserFeatureStore.load(path)
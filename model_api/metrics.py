@@ -0,0 +1,222 @@
+"""
+Minimal Prometheus-style metrics for the model API.
+
+All label combinations are created up front, so recording a value on the request path is a bisect
+plus a couple of in-place increments on preallocated children: no locks and no per-request objects
+beyond the float being recorded. Increments rely on the GIL; under heavy thread contention a count
+can very occasionally be lost, which is acceptable for monitoring.
+"""
+from bisect import bisect_left
+import asyncio
+import functools
+import time
+
+# Latency buckets in seconds, from 50us to 5s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+MODELS = ('creditcard_model', 'fraud_model')
+# 'batch_wait' is the time a request spends in the micro-batcher, including the shared forward pass
+STAGES = ('parse', 'convert', 'batch_wait', 'forward', 'serialize')
+
+
+def _format_labels(label_names, label_values, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Value:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Metric:
+    def __init__(self, name, help_text, label_names=(), label_values=((),)):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.children = {tuple(values): self._new_child() for values in label_values}
+
+    def labels(self, *values):
+        return self.children[values]
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def render(self):
+        for values, child in self.children.items():
+            yield f"{self.name}{_format_labels(self.label_names, values)} {child.value}"
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), label_values=((),), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help_text, label_names, label_values)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def render(self):
+        for values, child in self.children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, values, le)} {cumulative}"
+            labels = _format_labels(self.label_names, values)
+            yield f"{self.name}_sum{labels} {child.sum}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+registry = Registry()
+stage_seconds = registry.register(Histogram(
+    'model_api_stage_seconds', "Time spent in each request stage.",
+    ('model', 'stage'), [(model, stage) for model in MODELS for stage in STAGES]))
+requests_total = registry.register(Counter(
+    'model_api_requests_total', "Prediction requests received.", ('model',), [(m,) for m in MODELS]))
+errors_total = registry.register(Counter(
+    'model_api_errors_total', "Prediction requests that failed.", ('model',), [(m,) for m in MODELS]))
+in_flight = registry.register(Gauge(
+    'model_api_in_flight_requests', "Prediction requests currently being served."))
+model_load_seconds = registry.register(Gauge(
+    'model_api_model_load_seconds', "Time taken to load each model's active version.", ('model',), [(m,) for m in MODELS]))
+prediction_cache_hits = registry.register(Counter(
+    'model_api_prediction_cache_hits_total', "Predictions served from the cache.", ('model',), [(m,) for m in MODELS]))
+prediction_cache_misses = registry.register(Counter(
+    'model_api_prediction_cache_misses_total', "Predictions not found in the cache.", ('model',), [(m,) for m in MODELS]))
+model_version = registry.register(Gauge(
+    'model_api_model_version', "Active version of each model.", ('model',), [(m,) for m in MODELS]))
+
+
+def stage_timers(model):
+    """
+    Preallocated histogram children for each request stage of one model.
+    """
+    return {stage: stage_seconds.labels(model, stage) for stage in STAGES}
+
+
+def lap(stage, start):
+    """
+    Record the time since `start` on a stage histogram and return the current time, so
+    consecutive stages can be chained: start = lap(stages['parse'], start).
+    """
+    now = time.perf_counter()
+    stage.observe(now - start)
+    return now
+
+
+def track_requests(model):
+    """
+    Decorator counting requests, 5xx responses and in-flight requests for a route handler.
+    Works for both Flask (sync) and FastAPI (async) handlers.
+    """
+    requests = requests_total.labels(model)
+    errors = errors_total.labels(model)
+    active = in_flight.labels()
+
+    def status_of(response):
+        if isinstance(response, tuple):
+            return response[1]
+        return getattr(response, 'status_code', 200)
+
+    def decorator(handler):
+        if asyncio.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def wrapper(*args, **kwargs):
+                requests.inc()
+                active.inc()
+                try:
+                    response = await handler(*args, **kwargs)
+                finally:
+                    active.dec()
+                if status_of(response) >= 500:
+                    errors.inc()
+                return response
+        else:
+            @functools.wraps(handler)
+            def wrapper(*args, **kwargs):
+                requests.inc()
+                active.inc()
+                try:
+                    response = handler(*args, **kwargs)
+                finally:
+                    active.dec()
+                if status_of(response) >= 500:
+                    errors.inc()
+                return response
+        return wrapper
+    return decorator
+
+
+def timed_predictor(predict_fn, model):
+    """
+    Wrap a batch predict function so each call is recorded as the model's 'forward' stage.
+    """
+    forward = stage_seconds.labels(model, 'forward')
+
+    def run(features):
+        start = time.perf_counter()
+        try:
+            return predict_fn(features)
+        finally:
+            forward.observe(time.perf_counter() - start)
+    return run
+
@@ -10,7 +10,30 @@ class RNNModel(nn.Module):
 
     def forward(self, x):
         x = x.unsqueeze(1)  # Add sequence dimension
-        h0 = torch.zeros(1, x.size(0), 32)  # Initial hidden state
-        out, _ = self.rnn(x, h0)
+        out, _ = self.rnn(x)  # Initial hidden state defaults to zeros
         out = torch.sigmoid(self.fc(out[:, -1, :]))
         return out
+
+
+# Single-step equivalent of RNNModel. With a sequence of length one and a zero initial state the
+# RNN reduces to tanh(W_ih x + b_ih + b_hh), so it can be expressed with Linear layers, which
+# dynamic int8 quantization supports (nn.RNN is not covered by quantize_dynamic).
+class SingleStepRNNModel(nn.Module):
+    def __init__(self, input_size, hidden_size=32):
+        super(SingleStepRNNModel, self).__init__()
+        self.input = nn.Linear(input_size, hidden_size)
+        self.fc = nn.Linear(hidden_size, 1)
+
+    @classmethod
+    def from_rnn_model(cls, model):
+        single_step = cls(model.rnn.input_size, model.rnn.hidden_size)
+        with torch.no_grad():
+            single_step.input.weight.copy_(model.rnn.weight_ih_l0)
+            single_step.input.bias.copy_(model.rnn.bias_ih_l0 + model.rnn.bias_hh_l0)
+            single_step.fc.load_state_dict(model.fc.state_dict())
+        return single_step.eval()
+
+    def forward(self, x):
+        out = torch.tanh(self.input(x))
+        out = torch.sigmoid(self.fc(out))
+        return out
@@ -0,0 +1,243 @@
+"""
+Versioned model registry for the serving processes.
+
+Artifacts are discovered in a models directory by file name: `Decision_Tree.joblib` is version 0 and
+`Decision_Tree-v3.joblib` is version 3 (likewise `RNN_Fraud-v3.pt`). Models are loaded lazily on first
+use with their weights memory-mapped, so worker processes share the file's pages instead of each
+holding a private copy.
+
+A new version is loaded and warmed up next to the active one and then swapped in with a single
+reference assignment: batches already running finish on the old model, the next batch uses the new
+one, and no request is dropped.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from metrics import model_load_seconds, model_version
+from inference import (
+    model_dir, fraud_model_backend, load_creditcard_model, load_fraud_model,
+    fraud_predictor, creditcard_predictor
+)
+
+
+class ModelSpec:
+    """
+    How to find, load and score one model: artifacts named `<stem>[-v<N>]<suffix>`.
+    """
+
+    def __init__(self, name, stem, suffix, loader, predictor):
+        self.name = name
+        self.stem = stem
+        self.suffix = suffix
+        self.loader = loader
+        self.predictor = predictor
+        self.pattern = re.compile(rf"^{re.escape(stem)}(?:-v(\d+))?{re.escape(suffix)}$")
+
+
+class ModelVersion:
+    """
+    A loaded model version and its batch predict function.
+    """
+
+    def __init__(self, name, version, path, model, predict, load_seconds):
+        self.name = name
+        self.version = version
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        self.model = model
+        self.predict = predict
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'path': self.path,
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.loaded_at)),
+            'load_seconds': round(self.load_seconds, 4),
+        }
+
+
+class ModelRegistry:
+    """
+    Discovers versioned artifacts under model_dir and serves the active version of each model.
+    """
+
+    def __init__(self, directory, specs):
+        self.directory = directory
+        self.specs = {spec.name: spec for spec in specs}
+        self._active = {}
+        self._seen = {}
+        self._locks = {name: threading.Lock() for name in self.specs}
+        self._listeners = []
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def discover(self, name):
+        """
+        Map each available version of a model to its artifact path.
+        """
+        spec = self.specs[name]
+        versions = {}
+        for file_name in os.listdir(self.directory):
+            match = spec.pattern.match(file_name)
+            if match:
+                versions[int(match.group(1) or 0)] = os.path.join(self.directory, file_name)
+        return versions
+
+    def _snapshot(self, name):
+        snapshot = {}
+        for version, path in self.discover(name).items():
+            try:
+                snapshot[version] = os.path.getmtime(path)
+            except OSError:
+                pass  # Removed between listing and stat
+        return snapshot
+
+    def _load(self, name, version, path):
+        spec = self.specs[name]
+        start = time.perf_counter()
+        model = spec.loader(path)
+        load_seconds = time.perf_counter() - start
+        model_load_seconds.labels(name).set(load_seconds)
+        logging.info(f"Loaded {name} version {version} from {path} in {load_seconds:.3f}s.")
+        return ModelVersion(name, version, path, model, spec.predictor(model), load_seconds)
+
+    def _swap(self, loaded):
+        previous = self._active.get(loaded.name)
+        self._active[loaded.name] = loaded  # Atomic: readers see either the old or the new version
+        model_version.labels(loaded.name).set(loaded.version)
+        if previous is not None:
+            logging.info(f"Swapped {loaded.name} from version {previous.version} to {loaded.version}.")
+            for listener in self._listeners:
+                listener(loaded.name)
+        return loaded
+
+    def get(self, name):
+        """
+        Return the active ModelVersion, loading the latest version on first use.
+        """
+        active = self._active.get(name)
+        if active is not None:
+            return active
+        with self._locks[name]:
+            active = self._active.get(name)
+            if active is None:
+                self._seen[name] = self._snapshot(name)
+                versions = self.discover(name)
+                if not versions:
+                    raise FileNotFoundError(f"No artifacts for {name} in {self.directory}")
+                latest = max(versions)
+                active = self._swap(self._load(name, latest, versions[latest]))
+            return active
+
+    def add_listener(self, listener):
+        """
+        Call listener(name) whenever a loaded model is swapped for another version.
+        """
+        self._listeners.append(listener)
+
+    def predictor(self, name):
+        """
+        Batch predict function that always scores with the model's active version.
+        """
+        def run(features):
+            return self.get(name).predict(features)
+        return run
+
+    def activate(self, name, version):
+        """
+        Load a specific version and make it active, e.g. to roll back.
+        """
+        versions = self.discover(name)
+        if version not in versions:
+            raise KeyError(f"{name} has no version {version}; available: {sorted(versions)}")
+        with self._locks[name]:
+            return self._swap(self._load(name, version, versions[version]))
+
+    def reload(self, name=None, force=False):
+        """
+        Switch to the latest version of each loaded model if its artifacts changed since the
+        last check. Models that haven't been used yet stay unloaded. Returns {name: version}
+        for the models that were swapped.
+        """
+        swapped = {}
+        for model_name in ([name] if name else list(self.specs)):
+            if model_name not in self._active:
+                continue
+            snapshot = self._snapshot(model_name)
+            if not snapshot or (snapshot == self._seen.get(model_name) and not force):
+                continue
+            with self._locks[model_name]:
+                versions = self.discover(model_name)
+                latest = max(versions)
+                active = self._active[model_name]
+                if not force and latest == active.version and snapshot.get(latest) == active.mtime:
+                    self._seen[model_name] = snapshot  # Only older versions changed
+                    continue
+                try:
+                    self._swap(self._load(model_name, latest, versions[latest]))
+                    swapped[model_name] = latest
+                except Exception as e:
+                    # Keep serving the active version if the new artifact is broken or half-written
+                    logging.error(f"Failed to load {model_name} version {latest}: {e}")
+                    continue
+                self._seen[model_name] = snapshot
+        return swapped
+
+    def load_all(self):
+        for name in self.specs:
+            self.get(name)
+
+    def describe(self):
+        """
+        Active and available versions of every model.
+        """
+        return {
+            name: {
+                'active': self._active[name].describe() if name in self._active else None,
+                'available': sorted(self.discover(name)),
+            }
+            for name in self.specs
+        }
+
+    def start_watcher(self, interval):
+        """
+        Poll the models directory every `interval` seconds and hot-swap new versions.
+        Threads don't survive fork, so call this in each worker process.
+        """
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(interval):
+                try:
+                    self.reload()
+                except Exception as e:
+                    logging.error(f"Model reload check failed: {e}")
+
+        self._watcher = threading.Thread(target=watch, name='model-watcher', daemon=True)
+        self._watcher.start()
+        logging.info(f"Watching {self.directory} for new model versions every {interval}s.")
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+
+def create_registry(directory=model_dir):
+    """
+    Registry for the credit card and fraud models served by the API.
+    """
+    fraud_suffix = '.torchscript.pt' if fraud_model_backend == 'torchscript' else '.pt'
+    return ModelRegistry(directory, [
+        ModelSpec('creditcard_model', 'Decision_Tree', '.joblib',
+                  lambda path: load_creditcard_model(path, mmap=True), creditcard_predictor),
+        ModelSpec('fraud_model', 'RNN_Fraud', fraud_suffix,
+                  lambda path: load_fraud_model(path, mmap=True), fraud_predictor),
+    ])
@@ -0,0 +1,266 @@
+"""
+Prediction result cache for the /predict/* routes.
+
+Retries and duplicate scoring calls send identical feature vectors, so results are cached under a
+hash of the float32 feature bytes plus the active model version. Entries expire after a TTL and the
+least recently used are evicted beyond a fixed number of entries. When a model is hot-swapped its
+entries are dropped.
+
+The default backend lives in the worker process. For a cache shared by all workers, run the socket
+server and point the API at it with PREDICTION_CACHE_SOCKET:
+    python model_api/prediction_cache.py --socket /tmp/model_api_cache.sock
+"""
+import argparse
+import hashlib
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from metrics import prediction_cache_hits, prediction_cache_misses
+
+
+def encode_array(array):
+    """
+    Serialize a small array as dtype, shape and raw bytes.
+    """
+    array = np.ascontiguousarray(array)
+    header = struct.pack('<8sB', array.dtype.str.encode(), array.ndim)
+    return header + struct.pack(f'<{array.ndim}I', *array.shape) + array.tobytes()
+
+
+def decode_array(data):
+    dtype, ndim = struct.unpack_from('<8sB', data)
+    shape = struct.unpack_from(f'<{ndim}I', data, 9)
+    return np.frombuffer(data, dtype=np.dtype(dtype.rstrip(b'\0').decode()),
+                         offset=9 + 4 * ndim).reshape(shape).copy()
+
+
+class LocalBackend:
+    """
+    In-process LRU with per-entry expiry. Keys are b'<model>\\0<digest>'.
+    """
+
+    def __init__(self, max_entries=10_000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, model):
+        prefix = model.encode() + b'\0'
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Socket protocol: request  = op (1 byte), key length (uint16), key, ttl (float64), value length (uint32), value
+#                  response = value length (uint32, 0xFFFFFFFF for a miss), value
+_GET, _PUT, _INVALIDATE = b'G', b'P', b'I'
+_REQUEST = struct.Struct('<cHdI')
+_RESPONSE = struct.Struct('<I')
+_MISS = 0xFFFFFFFF
+
+
+def _recv_exact(sock, size):
+    buffer = bytearray()
+    while len(buffer) < size:
+        part = sock.recv(size - len(buffer))
+        if not part:
+            raise ConnectionError("Cache connection closed")
+        buffer += part
+    return bytes(buffer)
+
+
+class SocketBackend:
+    """
+    Client for a cache server on a local Unix socket, shared by all worker processes.
+    Each thread keeps its own connection. Failures count as misses, so a cache outage
+    only costs the model calls it would have saved.
+    """
+
+    def __init__(self, path, timeout=0.05):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            self._local.sock = sock
+        return sock
+
+    def _request(self, op, key, ttl=0.0, value=b''):
+        try:
+            sock = self._connection()
+            sock.sendall(_REQUEST.pack(op, len(key), ttl, len(value)) + key + value)
+            (size,) = _RESPONSE.unpack(_recv_exact(sock, _RESPONSE.size))
+            return None if size == _MISS else _recv_exact(sock, size)
+        except (OSError, ConnectionError) as e:
+            logging.warning(f"Prediction cache at {self.path} unavailable: {e}")
+            sock = getattr(self._local, 'sock', None)
+            if sock is not None:
+                sock.close()
+                self._local.sock = None
+            return None
+
+    def get(self, key):
+        data = self._request(_GET, key)
+        return None if data is None else decode_array(data)
+
+    def put(self, key, value, ttl):
+        self._request(_PUT, key, ttl, encode_array(value))
+
+    def invalidate(self, model):
+        self._request(_INVALIDATE, model.encode())
+
+
+class _CacheRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        store = self.server.store
+        sock = self.request
+        try:
+            while True:
+                op, key_size, ttl, value_size = _REQUEST.unpack(_recv_exact(sock, _REQUEST.size))
+                key = _recv_exact(sock, key_size)
+                value = _recv_exact(sock, value_size) if value_size else b''
+                if op == _GET:
+                    data = store.get(key)
+                    if data is None:
+                        sock.sendall(_RESPONSE.pack(_MISS))
+                    else:
+                        sock.sendall(_RESPONSE.pack(len(data)) + data)
+                else:
+                    if op == _PUT:
+                        store.put(key, value, ttl)
+                    elif op == _INVALIDATE:
+                        store.invalidate(key.decode())
+                    sock.sendall(_RESPONSE.pack(0))
+        except ConnectionError:
+            pass
+
+
+class CacheServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, max_entries):
+        if os.path.exists(path):
+            os.unlink(path)
+        self.store = LocalBackend(max_entries)
+        super().__init__(path, _CacheRequestHandler)
+
+
+class PredictionCache:
+    """
+    Caches batch predict outputs per (model, active version, feature bytes). With no backend
+    every call goes straight to the model.
+    """
+
+    def __init__(self, models, backend, ttl=60.0):
+        self.models = models
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = {name: prediction_cache_hits.labels(name) for name in models.specs}
+        self.misses = {name: prediction_cache_misses.labels(name) for name in models.specs}
+        if backend is not None:
+            models.add_listener(self.invalidate)
+
+    def key(self, model, features):
+        active = self.models.get(model)
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        digest = hashlib.blake2b(f"{active.version}:{active.mtime}:{features.shape}".encode(), digest_size=16)
+        digest.update(features)
+        return model.encode() + b'\0' + digest.digest()
+
+    def get_or_compute(self, model, features, compute):
+        """
+        Return the cached output for `features`, or call compute(features) and cache it.
+        """
+        if self.backend is None:
+            return compute(features)
+        key = self.key(model, features)
+        output = self.backend.get(key)
+        if output is not None:
+            self.hits[model].inc()
+            return output
+        self.misses[model].inc()
+        output = compute(features)
+        self.backend.put(key, np.array(output), self.ttl)
+        return output
+
+    def invalidate(self, model):
+        self.backend.invalidate(model)
+        logging.info(f"Prediction cache cleared for {model}.")
+
+    def stats(self):
+        if self.backend is None:
+            return {'enabled': False}
+        stats = {
+            'enabled': True,
+            'backend': 'local' if isinstance(self.backend, LocalBackend) else 'socket',
+            'ttl': self.ttl,
+            'models': {name: {'hits': int(self.hits[name].value), 'misses': int(self.misses[name].value)}
+                       for name in self.models.specs},
+        }
+        if isinstance(self.backend, LocalBackend):
+            stats['entries'] = len(self.backend)
+        return stats
+
+
+def create_cache(models, max_entries, ttl, socket_path=None):
+    """
+    Prediction cache for the registry's models; a pass-through when max_entries is 0.
+    """
+    if socket_path:
+        return PredictionCache(models, SocketBackend(socket_path), ttl)
+    if max_entries <= 0:
+        return PredictionCache(models, None, ttl)
+    return PredictionCache(models, LocalBackend(max_entries), ttl)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared prediction cache server for the model API workers.")
+    parser.add_argument('--socket', required=True, help="Unix socket path")
+    parser.add_argument('--max-entries', type=int, default=100_000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = CacheServer(args.socket, args.max_entries)
+    print(f"Prediction cache listening on {args.socket} (max {args.max_entries:,} entries).")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(args.socket)
+
+
+if __name__ == '__main__':
+    main()
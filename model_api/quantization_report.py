@@ -0,0 +1,136 @@
+"""
+Accuracy vs latency report for the float and dynamic int8 fraud models.
+
+Run from the repository root:
+    python model_api/quantization_report.py --input merged_data.csv --threads 1 2 4
+
+With --input, labeled fraud data (feature-engineered, or raw transactions with transaction_frequency
+and transaction_velocity, plus 'class') is scaled by the fitted feature transformer as in batch
+scoring, and both models are scored on a seeded, stratified hold-out split (--test-size, --seed;
+the notebook's split is test_size=0.2, random_state=42). Without it, random features are used and
+the float model's decisions serve as labels, so the accuracy figures become agreement with the float model.
+"""
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+import torch
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+from sklearn.model_selection import train_test_split
+from inference import input_size, load_fraud_model, quantize_fraud_model
+from batch_score import feature_matrix, load_preprocessor
+
+
+def load_labeled_features(path, max_rows=None, test_size=0.2, seed=42):
+    """
+    Return the scaled (features, labels) of a stratified hold-out split of a labeled fraud CSV or
+    Parquet file.
+    """
+    frame = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path, nrows=max_rows)
+    if max_rows:
+        frame = frame.head(max_rows)
+    _, test = train_test_split(frame, test_size=test_size, random_state=seed, stratify=frame['class'])
+    features = feature_matrix('fraud', test, load_preprocessor('fraud'), input_size)
+    return features, test['class'].to_numpy()
+
+
+def predict_probability(model, features, batch_size=4096):
+    with torch.no_grad():
+        return np.concatenate([model(torch.from_numpy(features[i:i + batch_size])).numpy()[:, 0]
+                               for i in range(0, len(features), batch_size)])
+
+
+def classification_metrics(labels, probability):
+    predicted = (probability > 0.5).astype(int)
+    return {
+        'accuracy': accuracy_score(labels, predicted),
+        'precision': precision_score(labels, predicted, zero_division=0),
+        'recall': recall_score(labels, predicted, zero_division=0),
+        'f1': f1_score(labels, predicted, zero_division=0),
+    }
+
+
+def measure_latency(model, features, batch_size, iterations=200):
+    """
+    Median and p99 latency in microseconds of one forward pass at `batch_size`.
+    """
+    batch = torch.from_numpy(features[:batch_size])
+    timings = np.empty(iterations)
+    with torch.no_grad():
+        for _ in range(10):
+            model(batch)
+        for i in range(iterations):
+            start = time.perf_counter()
+            model(batch)
+            timings[i] = time.perf_counter() - start
+    return {'p50_us': float(np.percentile(timings, 50) * 1e6), 'p99_us': float(np.percentile(timings, 99) * 1e6)}
+
+
+def build_report(features, labels, thread_counts, batch_sizes):
+    float_model = load_fraud_model(backend='eager')
+    quantized_model = quantize_fraud_model(float_model)
+
+    float_probability = predict_probability(float_model, features)
+    quantized_probability = predict_probability(quantized_model, features)
+    if labels is None:
+        labels = (float_probability > 0.5).astype(int)
+
+    report = {
+        'rows': len(features),
+        'max_abs_diff': float(np.abs(float_probability - quantized_probability).max()),
+        'decision_agreement': float(((float_probability > 0.5) == (quantized_probability > 0.5)).mean()),
+        'accuracy': {'float': classification_metrics(labels, float_probability),
+                     'int8': classification_metrics(labels, quantized_probability)},
+        'latency': [],
+    }
+    for threads in thread_counts:
+        torch.set_num_threads(threads)
+        for batch_size in batch_sizes:
+            for name, model in (('float', float_model), ('int8', quantized_model)):
+                report['latency'].append({'model': name, 'threads': threads, 'batch_size': batch_size,
+                                          **measure_latency(model, features, batch_size)})
+    return report
+
+
+def print_report(report):
+    print(f"Rows: {report['rows']:,}  max |float - int8|: {report['max_abs_diff']:.4f}  "
+          f"decision agreement: {report['decision_agreement']:.4%}")
+    print(f"\n{'model':<6} {'accuracy':>9} {'precision':>10} {'recall':>8} {'f1':>8}")
+    for name, scores in report['accuracy'].items():
+        print(f"{name:<6} {scores['accuracy']:>9.4f} {scores['precision']:>10.4f} "
+              f"{scores['recall']:>8.4f} {scores['f1']:>8.4f}")
+    print(f"\n{'model':<6} {'threads':>7} {'batch':>6} {'p50 us':>9} {'p99 us':>9}")
+    for row in report['latency']:
+        print(f"{row['model']:<6} {row['threads']:>7} {row['batch_size']:>6} "
+              f"{row['p50_us']:>9.1f} {row['p99_us']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the float and int8 fraud models.")
+    parser.add_argument('--input', default=None, help="Labeled preprocessed CSV or Parquet file")
+    parser.add_argument('--max-rows', type=int, default=None)
+    parser.add_argument('--test-size', type=float, default=0.2, help="Fraction of --input held out for evaluation")
+    parser.add_argument('--seed', type=int, default=42, help="Seed of the hold-out split")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, torch.get_num_threads()])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 64, 1024])
+    parser.add_argument('--output', default=None, help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    if args.input:
+        features, labels = load_labeled_features(args.input, args.max_rows, args.test_size, args.seed)
+    else:
+        rng = np.random.default_rng(0)
+        features = rng.standard_normal((args.max_rows or 20_000, input_size), dtype=np.float32)
+        labels = None
+
+    report = build_report(features, labels, sorted(set(args.threads)), args.batch_sizes)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,30 +1,61 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 import torch
-import joblib
 import torch.nn.functional as F
 import numpy as np
-from model_definitions import RNNModel
+import json
+import time
+from batching import MicroBatcher
+from bulk_scoring import score_stream, NDJSON, FLOAT32_FRAMES
+from api_logging import setup_logging, log_prediction
+from metrics import registry, CONTENT_TYPE, stage_timers, lap, track_requests, timed_predictor
+from model_registry import create_registry
+from prediction_cache import create_cache
+from inference import (
+    input_size, transformer_path, batch_max_size, batch_max_wait_ms, bulk_chunk_rows, model_reload_interval,
+    prediction_cache_size, prediction_cache_ttl, prediction_cache_socket,
+    load_feature_transformer, load_user_state, configure_torch_threads
+)
 import logging
 
 # Initializing Flask app for model serving
 app = Flask(__name__)
 
-# Configure logging
-logging.basicConfig(
-    filename='app.log', 
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Configure logging: JSON lines written by a background thread
+setup_logging('app.log')
+
+# Apply TORCH_INTRA_OP_THREADS / TORCH_INTER_OP_THREADS before the models run
+configure_torch_threads()
+
+# Versioned models, loaded lazily on first use and hot-swapped when a new version appears.
+# CREDITCARD_MODEL_BACKEND=compiled selects the array-based Decision Tree scorer.
+models = create_registry()
+models.start_watcher(model_reload_interval)
+
+# Repeated feature vectors are answered from the cache; cleared when a model is swapped
+prediction_cache = create_cache(models, prediction_cache_size, prediction_cache_ttl, prediction_cache_socket)
+
+# Load the fitted feature transformer so raw transactions can be scored
+fraud_transformer = load_feature_transformer()
+
+# Per-user activity snapshot: fills in transaction_frequency / transaction_velocity for raw transactions
+user_state = load_user_state()
 
-input_size = 194  # Define input size for the CNN model
+# Dynamic micro-batching: concurrent requests share a single forward pass
+fraud_batcher = MicroBatcher(timed_predictor(models.predictor('fraud_model'), 'fraud_model'),
+                             batch_max_size, batch_max_wait_ms, name='fraud_model',
+                             n_features=input_size, dtype=np.float32)
+creditcard_batcher = MicroBatcher(timed_predictor(models.predictor('creditcard_model'), 'creditcard_model'),
+                                  batch_max_size, batch_max_wait_ms, name='creditcard_model')
 
-# Load the credit card fraud detection model
-creditcard_model = joblib.load('model_api/models/Decision_Tree.joblib')
+# Per-stage latency histograms
+creditcard_stages = stage_timers('creditcard_model')
+fraud_stages = stage_timers('fraud_model')
 
-# Initialize and load the CNN model for fraud detection
-fraud_model = RNNModel(input_size)
-fraud_model.load_state_dict(torch.load('model_api/models/RNN_Fraud.pt'))
-fraud_model.eval()
+# Bulk scoring bypasses the batchers: the request body is already a batch
+bulk_models = {
+    'fraud': (timed_predictor(models.predictor('fraud_model'), 'fraud_model'), 'fraud_probability'),
+    'creditcard': (timed_predictor(models.predictor('creditcard_model'), 'creditcard_model'), 'prediction'),
+}
 
 
 @app.route('/')
@@ -33,41 +64,123 @@ def home():
     return "Model API for Fraud and Credit Card Detection is running!"
 
 @app.route('/predict/creditcard', methods=['POST'])
+@track_requests('creditcard_model')
 def predict_creditcard():
     try:
+        start = time.perf_counter()
         data = request.get_json()
+        start = lap(creditcard_stages['parse'], start)
         features = np.array(data['features']).reshape(1, -1)
-        prediction = creditcard_model.predict(features)
+        start = lap(creditcard_stages['convert'], start)
+        prediction = prediction_cache.get_or_compute('creditcard_model', features, creditcard_batcher.submit)
+        start = lap(creditcard_stages['batch_wait'], start)
+        log_prediction(app.logger, 'creditcard_model', data, prediction[0].item())
         
-        app.logger.info(f"Credit prediction request received with data: {data}")
-        app.logger.info(f"Credit prediction result: {prediction[0]}")
-        
-        return jsonify({'prediction': prediction[0]})
+        response = jsonify({'prediction': prediction[0].item()})
+        lap(creditcard_stages['serialize'], start)
+        return response
     except Exception as e:
-        app.logger.error(f"Error in credit prediction: {e}")
+        app.logger.error("Error in credit prediction: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/predict/fraud', methods=['POST'])
+@track_requests('fraud_model')
 def predict_fraud():
     try:
+        start = time.perf_counter()
         data = request.json['data']
-        input_tensor = torch.tensor(data, dtype=torch.float32)
+        start = lap(fraud_stages['parse'], start)
+        features = np.asarray(data, dtype=np.float32)
         
         # Reshape input if needed to match model's input expectations
-        if input_tensor.ndim == 1:
-            input_tensor = input_tensor.unsqueeze(0)  # Add batch dimension if missing
-        
-        with torch.no_grad():
-            output = fraud_model(input_tensor)
-            probabilities = F.softmax(output, dim=1).numpy().tolist()
+        if features.ndim == 1:
+            features = features.reshape(1, -1)  # Add batch dimension if missing
+        start = lap(fraud_stages['convert'], start)
         
-        app.logger.info(f"Fraud prediction request received with data: {data}")
-        app.logger.info(f"Fraud prediction probabilities: {probabilities}")
+        output = torch.from_numpy(prediction_cache.get_or_compute('fraud_model', features, fraud_batcher.submit))
+        start = lap(fraud_stages['batch_wait'], start)
+        probabilities = F.softmax(output, dim=1).numpy().tolist()
+        log_prediction(app.logger, 'fraud_model', data, probabilities)
         
-        return jsonify({'fraud_predictions': probabilities})
+        response = jsonify({'fraud_predictions': probabilities})
+        lap(fraud_stages['serialize'], start)
+        return response
+    except Exception as e:
+        app.logger.error("Error in fraud prediction: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/predict/fraud/transaction', methods=['POST'])
+@track_requests('fraud_model')
+def predict_fraud_transaction():
+    try:
+        if fraud_transformer is None:
+            return jsonify({'error': f"No feature transformer found at {transformer_path}"}), 503
+
+        start = time.perf_counter()
+        transactions = request.json['transactions']
+        if isinstance(transactions, dict):
+            transactions = [transactions]  # Single raw transaction
+        start = lap(fraud_stages['parse'], start)
+
+        if user_state is not None:
+            transactions = user_state.enrich(transactions)
+        features = fraud_transformer.transform_records(transactions)
+        start = lap(fraud_stages['convert'], start)
+        probabilities = prediction_cache.get_or_compute('fraud_model', features, fraud_batcher.submit).squeeze(1).tolist()
+        start = lap(fraud_stages['batch_wait'], start)
+
+        log_prediction(app.logger, 'fraud_model', transactions, probabilities)
+
+        response = jsonify({'fraud_probabilities': probabilities})
+        lap(fraud_stages['serialize'], start)
+        return response
+    except Exception as e:
+        app.logger.error("Error in fraud transaction prediction: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    model = request.args.get('model', 'fraud')
+    if model not in bulk_models:
+        return jsonify({'error': f"Unknown model '{model}', expected one of {list(bulk_models)}"}), 400
+    predict_fn, output_key = bulk_models[model]
+    accept = FLOAT32_FRAMES if request.accept_mimetypes.best == FLOAT32_FRAMES else NDJSON
+
+    def generate():
+        try:
+            yield from score_stream(request.stream, request.content_type, predict_fn, output_key,
+                                    accept=accept, chunk_rows=bulk_chunk_rows)
+        except Exception as e:
+            app.logger.error("Error in batch prediction: %s", e)
+            if accept == NDJSON:
+                yield (json.dumps({'error': str(e)}) + '\n').encode()
+
+    return Response(stream_with_context(generate()), mimetype=accept)
+
+@app.route('/metrics')
+def metrics():
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+@app.route('/models')
+def model_versions():
+    return jsonify(models.describe())
+
+@app.route('/models/reload', methods=['POST'])
+def reload_models():
+    try:
+        return jsonify({'swapped': models.reload(force=request.args.get('force') == '1'),
+                        'models': models.describe()})
     except Exception as e:
-        app.logger.error(f"Error in fraud prediction: {e}")
+        app.logger.error("Error reloading models: %s", e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/stats/cache')
+def cache_stats():
+    return jsonify(prediction_cache.stats())
+
+@app.route('/stats/batching')
+def batching_stats():
+    return jsonify({'fraud_model': fraud_batcher.stats(), 'creditcard_model': creditcard_batcher.stats()})
+
 if __name__ == '__main__':
     app.run(debug=True)  # Corrected comment syntax
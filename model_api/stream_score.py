@@ -0,0 +1,515 @@
+"""
+Streaming fraud scoring for a live transaction feed.
+
+Raw transactions (one JSON object per line, with the fields /predict/fraud/transaction accepts:
+user_id, device_id, purchase_time, purchase_value, source, browser, sex, age, ip_address) are read
+from a source, enriched and scored in micro-batches, and alerts are written to an NDJSON sink:
+
+- the country comes from the IP range index when the record has none,
+- transaction_frequency / transaction_velocity come from the per-user feature state,
+- per-user and per-device counts over a sliding window flag bursts that a single row can't show,
+- the fraud model scores each micro-batch in one forward pass.
+
+Sources:
+    file:PATH     read an NDJSON file; with --follow, keep tailing lines appended to it
+    unix:PATH     listen on a Unix socket; every connection sends NDJSON lines
+    queue         an in-process queue.Queue, for embedding the scorer and replay benchmarks
+
+Window counters and the user state are snapshotted every --snapshot-interval seconds and on exit,
+and reloaded at startup. Run from the repository root, e.g.:
+    python model_api/stream_score.py --source file:transactions.ndjson --follow --alerts alerts.ndjson
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import Counter, deque
+import numpy as np
+import pandas as pd
+from inference import (
+    transformer_path, user_state_path, load_fraud_model, fraud_predictor, load_feature_transformer, load_user_state
+)
+
+# Make the shared scripts package importable when run from model_api/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.ip_index import IpRangeIndex, normalize_ips
+from scripts.user_state import UserFeatureStore, to_ns
+
+window_state_path = 'model_api/models/stream_windows.npz'
+
+# Fields every record needs to be scored; records without them are counted as errors and skipped
+REQUIRED_FIELDS = ('purchase_time', 'purchase_value', 'sex', 'age')
+
+NS_PER_SECOND = 1_000_000_000
+
+
+class SlidingWindowCounter:
+    """
+    Number of events per key over the last window_seconds. Each key keeps the times of its events
+    inside the window in a deque, so adding an event is O(1) amortized. Keys are kept as strings,
+    so an id counts the same before and after a snapshot is reloaded.
+    """
+
+    def __init__(self, window_seconds):
+        self.window_ns = int(window_seconds * NS_PER_SECOND)
+        self.events = {}
+
+    def __len__(self):
+        return len(self.events)
+
+    def add(self, key, time_ns):
+        """
+        Record an event and return the key's event count in the window ending at time_ns.
+        """
+        key = str(key)
+        events = self.events.get(key)
+        if events is None:
+            events = self.events[key] = deque()
+        events.append(time_ns)
+        cutoff = time_ns - self.window_ns
+        while events[0] <= cutoff:
+            events.popleft()
+        return len(events)
+
+    def latest(self):
+        """
+        The time of the most recent event, or 0 for an empty counter.
+        """
+        return max((events[-1] for events in self.events.values()), default=0)
+
+    def evict(self, now_ns):
+        """
+        Drop keys with no event in the window ending at now_ns. Returns the number dropped.
+        """
+        cutoff = now_ns - self.window_ns
+        idle = [key for key, events in self.events.items() if events[-1] <= cutoff]
+        for key in idle:
+            del self.events[key]
+        return len(idle)
+
+    def state(self, prefix):
+        """
+        Arrays describing the counter, for np.savez: keys, event counts and concatenated times.
+        """
+        keys = list(self.events)
+        return {
+            f'{prefix}_keys': np.array(keys, dtype=str),
+            f'{prefix}_counts': np.fromiter((len(self.events[key]) for key in keys), dtype=np.int64, count=len(keys)),
+            f'{prefix}_times': np.fromiter((t for key in keys for t in self.events[key]), dtype=np.int64),
+            f'{prefix}_window_ns': np.int64(self.window_ns),
+        }
+
+    @classmethod
+    def from_state(cls, snapshot, prefix):
+        counter = cls(0)
+        counter.window_ns = int(snapshot[f'{prefix}_window_ns'])
+        times = snapshot[f'{prefix}_times'].tolist()
+        offset = 0
+        for key, count in zip(snapshot[f'{prefix}_keys'].tolist(), snapshot[f'{prefix}_counts'].tolist()):
+            counter.events[str(key)] = deque(times[offset:offset + count])
+            offset += count
+        return counter
+
+
+def save_windows(path, user_windows, device_windows):
+    """
+    Write an atomic .npz snapshot of the user and device window counters.
+    """
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, **user_windows.state('user'), **device_windows.state('device'))
+    os.replace(tmp_path, path)
+    logging.info(f"Window counters for {len(user_windows)} users and {len(device_windows)} devices saved to {path}.")
+
+
+def load_windows(path, window_seconds):
+    """
+    (user, device) window counters from a snapshot written by save_windows, or empty counters.
+    A snapshot taken with a different window length is ignored.
+    """
+    if os.path.exists(path):
+        with np.load(path, allow_pickle=False) as snapshot:
+            if int(snapshot['user_window_ns']) == int(window_seconds * NS_PER_SECOND):
+                user_windows = SlidingWindowCounter.from_state(snapshot, 'user')
+                device_windows = SlidingWindowCounter.from_state(snapshot, 'device')
+                logging.info(f"Window counters loaded from {path}.")
+                return user_windows, device_windows
+        logging.warning(f"Ignoring window snapshot {path}: it was taken with a different window length.")
+    return SlidingWindowCounter(window_seconds), SlidingWindowCounter(window_seconds)
+
+
+# Sources put raw lines (or dicts) on the scorer's input queue and None at the end of the stream
+
+class FileSource:
+    """
+    Lines of an NDJSON file. With follow, waits for lines appended to it like `tail -f`, and
+    starts over if the file is truncated.
+    """
+
+    def __init__(self, path, follow=False, poll_interval=0.2):
+        self.path = path
+        self.follow = follow
+        self.poll_interval = poll_interval
+
+    def run(self, out, stop):
+        with open(self.path, 'rb') as f:
+            pending = b''
+            while not stop.is_set():
+                line = f.readline()
+                if line.endswith(b'\n'):
+                    out.put(pending + line)
+                    pending = b''
+                    continue
+                pending += line  # A partial line is completed by the next write
+                if not self.follow:
+                    break
+                if os.path.getsize(self.path) < f.tell():
+                    f.seek(0)
+                    pending = b''
+                time.sleep(self.poll_interval)
+            if pending.strip():
+                out.put(pending)
+        out.put(None)
+
+
+class UnixSocketSource:
+    """
+    NDJSON lines from clients connected to a Unix socket, until the scorer stops.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _serve(self, connection, out, stop):
+        with connection, connection.makefile('rb') as lines:
+            for line in lines:
+                out.put(line)
+                if stop.is_set():
+                    break
+
+    def run(self, out, stop):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        server.listen()
+        server.settimeout(0.5)  # Wake up regularly to check for stop
+        logging.info(f"Stream scorer listening on {self.path}.")
+        try:
+            while not stop.is_set():
+                try:
+                    connection, _ = server.accept()
+                except socket.timeout:
+                    continue
+                threading.Thread(target=self._serve, args=(connection, out, stop), daemon=True).start()
+        finally:
+            server.close()
+            os.remove(self.path)
+            out.put(None)
+
+
+class QueueSource:
+    """
+    Lines or dicts put on a queue.Queue by the caller; None ends the stream.
+    """
+
+    def __init__(self, source_queue):
+        self.queue = source_queue
+
+
+def create_source(spec, follow=False):
+    """
+    Source for a 'file:PATH', 'unix:PATH' or 'queue' spec.
+    """
+    kind, _, path = spec.partition(':')
+    if kind == 'file':
+        return FileSource(path, follow)
+    if kind == 'unix':
+        return UnixSocketSource(path)
+    if kind == 'queue':
+        return QueueSource(queue.Queue(maxsize=100_000))
+    raise ValueError(f"Unknown source '{spec}', expected file:PATH, unix:PATH or queue")
+
+
+class NdjsonSink:
+    """
+    Alerts as JSON lines in a file, or on stdout for '-'.
+    """
+
+    def __init__(self, path='-'):
+        self.file = sys.stdout if path == '-' else open(path, 'a')
+
+    def write(self, alerts):
+        for alert in alerts:
+            self.file.write(json.dumps(alert, default=str) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class StreamScorer:
+    """
+    Reads a source, scores micro-batches of up to batch_size transactions (or whatever arrived
+    within max_wait_ms) and writes an alert for every transaction whose fraud probability reaches
+    threshold, or whose user or device exceeds burst_limit transactions in the window.
+    """
+
+    def __init__(self, source, sink, transformer, predict_fn, ip_index=None, user_state=None,
+                 window_seconds=3600, burst_limit=5, threshold=0.5, batch_size=256, max_wait_ms=50,
+                 snapshot_interval=60, user_state_path=None, window_state_path=None):
+        self.source = source
+        self.sink = sink
+        self.transformer = transformer
+        self.predict_fn = predict_fn
+        self.ip_index = ip_index
+        self.user_state = user_state if user_state is not None else UserFeatureStore()
+        self.window_seconds = window_seconds
+        self.user_windows, self.device_windows = load_windows(window_state_path, window_seconds) \
+            if window_state_path else (SlidingWindowCounter(window_seconds), SlidingWindowCounter(window_seconds))
+        self.burst_limit = burst_limit
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.snapshot_interval = snapshot_interval
+        self.user_state_path = user_state_path
+        self.window_state_path = window_state_path
+        self.features = np.empty((batch_size, transformer.n_features_), dtype=np.float32)
+        self.stop_event = threading.Event()
+        self.queue = source.queue if isinstance(source, QueueSource) else queue.Queue(maxsize=100_000)
+        self.processed = 0
+        self.alerts = 0
+        self.alert_reasons = Counter()
+        self.errors = 0
+        self.batch_seconds = deque(maxlen=10_000)  # Latency of recent micro-batches
+
+    def stop(self):
+        self.stop_event.set()
+
+    def next_batch(self):
+        """
+        Up to batch_size items from the input queue, and whether the stream has ended.
+        """
+        try:
+            item = self.queue.get(timeout=0.5)
+        except queue.Empty:
+            return [], False
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            try:
+                item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def validate(self, record):
+        """
+        The record's purchase time in nanoseconds; raises ValueError if the record lacks a field
+        the scorer needs or has one it can't use.
+        """
+        if not isinstance(record, dict):
+            raise ValueError(f"expected a JSON object, got {type(record).__name__}")
+        missing = [field for field in REQUIRED_FIELDS if record.get(field) is None]
+        if missing:
+            raise ValueError(f"missing {', '.join(missing)}")
+        try:
+            time_ns = to_ns(record['purchase_time'])
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"unparsable purchase_time {record['purchase_time']!r}") from e
+        if time_ns == pd.NaT.value:
+            raise ValueError(f"unparsable purchase_time {record['purchase_time']!r}")
+        for field in ('purchase_value', 'age'):
+            if isinstance(record[field], bool) or not isinstance(record[field], (int, float)) \
+                    or not np.isfinite(record[field]):
+                raise ValueError(f"{field} is not a number: {record[field]!r}")
+        if record['sex'] not in self.transformer.sex_codes_:
+            raise ValueError(f"unseen value for sex: {record['sex']!r}")
+        for field in ('user_id', 'device_id'):
+            if isinstance(record.get(field), (dict, list)):
+                raise ValueError(f"{field} must be a scalar")
+        return time_ns
+
+    def parse(self, batch):
+        """
+        The valid records of a batch and their purchase times in nanoseconds. Malformed or
+        incomplete records are logged, counted in self.errors and skipped.
+        """
+        records, times = [], []
+        for item in batch:
+            if not isinstance(item, dict) and not item.strip():
+                continue
+            try:
+                record = item if isinstance(item, dict) else json.loads(item)
+                times.append(self.validate(record))
+                records.append(record)
+            except ValueError as e:
+                self.errors += 1
+                logging.warning(f"Skipping malformed stream record: {e}")
+        return records, times
+
+    def add_countries(self, records):
+        missing = [record for record in records if record.get('country') is None]
+        if self.ip_index is None or not missing:
+            return
+        ips = np.array([record.get('ip_address') for record in missing], dtype=object)
+        countries = self.ip_index.lookup(normalize_ips(ips))
+        for record, country in zip(missing, countries):
+            record['country'] = country
+
+    def score_batch(self, records, times):
+        """
+        Enrich, update the state and score one micro-batch of validated records. Returns its alerts.
+        """
+        self.add_countries(records)
+        windows = []
+        for record, time_ns in zip(records, times):
+            user_id, device_id = record.get('user_id'), record.get('device_id')
+            if user_id is not None and 'transaction_frequency' not in record:
+                self.user_state.update(user_id, time_ns, record.get('purchase_value', 0.0))
+                frequency, velocity = self.user_state.features(user_id)
+                record['transaction_frequency'] = frequency
+                record['transaction_velocity'] = velocity
+            windows.append((self.user_windows.add(user_id, time_ns) if user_id is not None else 0,
+                            self.device_windows.add(device_id, time_ns) if device_id is not None else 0))
+
+        features = self.transformer.transform_records(records, out=self.features)
+        probabilities = np.asarray(self.predict_fn(features))[:, 0]
+
+        alerts = []
+        for record, probability, (user_count, device_count) in zip(records, probabilities.tolist(), windows):
+            reasons = []
+            if probability >= self.threshold:
+                reasons.append('model')
+            if user_count > self.burst_limit:
+                reasons.append('user_burst')
+            if device_count > self.burst_limit:
+                reasons.append('device_burst')
+            if reasons:
+                self.alert_reasons.update(reasons)
+                alerts.append({
+                    'user_id': record.get('user_id'),
+                    'device_id': record.get('device_id'),
+                    'purchase_time': record['purchase_time'],
+                    'country': record.get('country'),
+                    'fraud_probability': round(probability, 6),
+                    'user_window_count': user_count,
+                    'device_window_count': device_count,
+                    'reasons': reasons,
+                })
+        return alerts
+
+    def snapshot(self):
+        """
+        Evict idle window keys and save the user state and window counters.
+        """
+        now_ns = max(self.user_windows.latest(), self.device_windows.latest())
+        evicted = self.user_windows.evict(now_ns) + self.device_windows.evict(now_ns)
+        if self.user_state_path:
+            self.user_state.save(self.user_state_path)
+        if self.window_state_path:
+            save_windows(self.window_state_path, self.user_windows, self.device_windows)
+        logging.info(f"Stream snapshot: {self.processed} scored, {self.alerts} alerts, {evicted} idle keys evicted.")
+
+    def run(self):
+        """
+        Score until the source ends or stop() is called. Returns the number of transactions scored.
+        """
+        if not isinstance(self.source, QueueSource):
+            threading.Thread(target=self.source.run, args=(self.queue, self.stop_event), daemon=True).start()
+        last_snapshot = time.monotonic()
+        done = False
+        try:
+            while not done and not self.stop_event.is_set():
+                batch, done = self.next_batch()
+                records, times = self.parse(batch)
+                if records:
+                    start = time.perf_counter()
+                    try:
+                        alerts = self.score_batch(records, times)
+                    except Exception as e:
+                        # Keep the service and its state alive; the batch is lost, not the stream
+                        self.errors += len(records)
+                        logging.error(f"Failed to score a batch of {len(records)} stream records: {e}")
+                        continue
+                    if alerts:
+                        self.sink.write(alerts)
+                        self.alerts += len(alerts)
+                    self.processed += len(records)
+                    self.batch_seconds.append(time.perf_counter() - start)
+                if self.snapshot_interval and time.monotonic() - last_snapshot >= self.snapshot_interval:
+                    self.snapshot()
+                    last_snapshot = time.monotonic()
+        finally:
+            # Whatever stopped the loop, keep the state gathered since the last snapshot
+            self.stop_event.set()
+            self.snapshot()
+        return self.processed
+
+    def stats(self):
+        batch_ms = np.asarray(self.batch_seconds) * 1000
+        return {
+            'processed': self.processed,
+            'alerts': self.alerts,
+            'alert_reasons': dict(self.alert_reasons),
+            'errors': self.errors,
+            'batches': len(batch_ms),
+            'batch_p50_ms': round(float(np.percentile(batch_ms, 50)), 3) if len(batch_ms) else 0.0,
+            'batch_p99_ms': round(float(np.percentile(batch_ms, 99)), 3) if len(batch_ms) else 0.0,
+            'tracked_users': len(self.user_windows),
+            'tracked_devices': len(self.device_windows),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a live transaction stream and write fraud alerts.")
+    parser.add_argument('--source', required=True, help="file:PATH or unix:PATH")
+    parser.add_argument('--follow', action='store_true', help="Keep tailing a file source")
+    parser.add_argument('--alerts', default='-', help="NDJSON alert file (default stdout)")
+    parser.add_argument('--ip-to-country', default=None, help="IpAddress_to_Country CSV for records without a country")
+    parser.add_argument('--window-seconds', type=float, default=3600)
+    parser.add_argument('--burst-limit', type=int, default=5, help="Alert above this many transactions per window")
+    parser.add_argument('--threshold', type=float, default=0.5, help="Alert at this fraud probability")
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=50)
+    parser.add_argument('--snapshot-interval', type=float, default=60, help="Seconds between state snapshots")
+    args = parser.parse_args()
+
+    os.makedirs("logs", exist_ok=True)
+    logging.basicConfig(
+        filename='logs/stream_scoring.log',
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    transformer = load_feature_transformer()
+    if transformer is None:
+        raise SystemExit(f"No feature transformer found at {transformer_path}")
+    ip_index = IpRangeIndex.from_csv(args.ip_to_country) if args.ip_to_country else None
+    sink = NdjsonSink(args.alerts)
+    scorer = StreamScorer(create_source(args.source, args.follow), sink, transformer,
+                          fraud_predictor(load_fraud_model()), ip_index, load_user_state(),
+                          args.window_seconds, args.burst_limit, args.threshold, args.batch_size,
+                          args.max_wait_ms, args.snapshot_interval, user_state_path, window_state_path)
+    signal.signal(signal.SIGTERM, lambda *_: scorer.stop())
+    try:
+        scorer.run()
+    except KeyboardInterrupt:
+        pass  # run() has already saved a final snapshot
+    finally:
+        sink.close()
+    print(json.dumps(scorer.stats()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
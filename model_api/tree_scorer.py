@@ -0,0 +1,145 @@
+"""
+Array-based scorer for a fitted scikit-learn DecisionTreeClassifier.
+
+The tree's node arrays are copied into compact contiguous NumPy arrays once. Batches are scored by
+a fixed number of vectorized steps (one per tree level) with leaves pointing at themselves, so every
+row takes the same path through the code; single rows walk the tree in plain Python, avoiding
+sklearn's per-call input validation. Inputs are cast to float32 exactly as sklearn does, so
+predictions and probabilities are bit-identical to predict / predict_proba.
+"""
+import numpy as np
+import sklearn
+
+_LEAF = -1  # sklearn's TREE_LEAF marker in children_left / children_right
+_SKLEARN_VERSION = tuple(int(part) for part in sklearn.__version__.split('.')[:2])
+
+
+class CompiledTree:
+    """
+    Drop-in replacement for DecisionTreeClassifier.predict / predict_proba at inference time.
+    """
+
+    def __init__(self, feature, threshold, children, missing_go_left, proba, classes, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.missing_go_left = missing_go_left
+        self.proba = proba
+        self.classes_ = classes
+        self.max_depth = max_depth
+        self.n_features_in_ = None
+
+        # Python lists for the single-row walk: indexing them is much cheaper than indexing arrays
+        self._feature = feature.tolist()
+        self._threshold = threshold.tolist()
+        self._left = children[:, 0].tolist()
+        self._right = children[:, 1].tolist()
+        self._missing_go_left = missing_go_left.tolist()
+        self._is_leaf = (children[:, 0] == np.arange(len(children))).tolist()
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Build the scorer from a fitted single-output DecisionTreeClassifier.
+        """
+        tree = model.tree_
+        if tree.n_outputs != 1:
+            raise ValueError("Only single-output trees are supported.")
+
+        nodes = np.arange(tree.node_count)
+        left = tree.children_left.astype(np.int32)
+        right = tree.children_right.astype(np.int32)
+        is_leaf = left == _LEAF
+        # Leaves point at themselves, so extra traversal steps keep rows on their leaf
+        children = np.ascontiguousarray(np.stack([np.where(is_leaf, nodes, left),
+                                                  np.where(is_leaf, nodes, right)], axis=1).astype(np.int32))
+        feature = np.where(is_leaf, 0, tree.feature).astype(np.int32)
+        threshold = np.ascontiguousarray(tree.threshold, dtype=np.float64)
+        missing_go_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=np.uint8))
+        missing_go_left = np.asarray(missing_go_left, dtype=bool)
+
+        n_classes = len(model.classes_)
+        proba = np.array(tree.value[:, 0, :n_classes], dtype=np.float64)
+        if _SKLEARN_VERSION < (1, 4):
+            # Older scikit-learn stores class counts and predict_proba normalizes them per call;
+            # do the same once per leaf. From 1.4 the values are the fractions predict_proba returns.
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+
+        compiled = cls(feature, threshold, children, missing_go_left, np.ascontiguousarray(proba),
+                       np.asarray(model.classes_), tree.max_depth)
+        compiled.n_features_in_ = model.n_features_in_
+        return compiled
+
+    def _check_features(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.n_features_in_ is not None and X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the model expects {self.n_features_in_}.")
+        return X
+
+    def apply(self, X, chunk_rows=4096):
+        """
+        Leaf index of each row of a 2D float32 array.
+        """
+        X = np.ascontiguousarray(X)
+        leaves = np.empty(X.shape[0], dtype=np.int32)
+        # Chunks keep the per-level temporaries in cache
+        for start in range(0, X.shape[0], chunk_rows):
+            leaves[start:start + chunk_rows] = self._apply_chunk(X[start:start + chunk_rows])
+        return leaves
+
+    def _apply_chunk(self, X):
+        flat_X = X.ravel()
+        flat_children = self.children.ravel()
+        row_offsets = np.arange(0, X.size, X.shape[1], dtype=np.intp)
+        nodes = np.zeros(X.shape[0], dtype=np.intp)
+        has_missing = np.isnan(X).any()
+        for _ in range(self.max_depth):
+            values = flat_X.take(row_offsets + self.feature.take(nodes))
+            go_right = ~(values <= self.threshold.take(nodes))
+            if has_missing:
+                go_right &= ~(np.isnan(values) & self.missing_go_left.take(nodes))
+            nodes = flat_children.take(2 * nodes + go_right)
+        return nodes
+
+    def apply_one(self, row):
+        """
+        Leaf index for a single row given as a sequence of float32-representable values.
+        """
+        node = 0
+        is_leaf, feature, threshold = self._is_leaf, self._feature, self._threshold
+        while not is_leaf[node]:
+            value = row[feature[node]]
+            if value <= threshold[node] or (value != value and self._missing_go_left[node]):
+                node = self._left[node]
+            else:
+                node = self._right[node]
+        return node
+
+    def predict_proba(self, X):
+        X = self._check_features(X)
+        if X.shape[0] == 1:
+            return self.proba[self.apply_one(X[0].tolist())][np.newaxis, :]
+        return self.proba.take(self.apply(X), axis=0)
+
+    def predict(self, X):
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1), axis=0)
+
+
+def check_parity(model, compiled, X):
+    """
+    Assert the compiled scorer matches model.predict / predict_proba exactly on X,
+    including the single-row path.
+    """
+    expected = model.predict_proba(X)
+    actual = compiled.predict_proba(X)
+    if not np.array_equal(expected, actual):
+        raise AssertionError("Compiled tree predict_proba differs from sklearn.")
+    if not np.array_equal(model.predict(X), compiled.predict(X)):
+        raise AssertionError("Compiled tree predict differs from sklearn.")
+    for row in X[:100]:
+        if not np.array_equal(model.predict_proba(row.reshape(1, -1)), compiled.predict_proba(row)):
+            raise AssertionError("Compiled tree single-row path differs from sklearn.")
@@ -1,8 +1,12 @@
 import os
 import logging
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from scripts.ip_index import IpRangeIndex
+from scripts.profiling import profiled, run_report
+from scripts.storage import save_table
 
 os.makedirs("logs", exist_ok=True)
 
@@ -14,6 +18,26 @@ logging.basicConfig(
     filemode="w"  # Overwrites the log file each run; use "a" to append
 )
 
+# Scatter plots with more points than this are drawn as hexbin plots of the fraud rate instead
+scatter_point_budget = 50_000
+hexbin_gridsize = 60
+
+def scatter_by_class(data, x, y, ax, palette, alpha):
+    """
+    Scatter plot of y against x colored by class, or, above scatter_point_budget points, a hexbin
+    plot colored by the fraud rate of each bin, so drawing time no longer grows with the data.
+    """
+    if len(data) <= scatter_point_budget:
+        sns.scatterplot(x=data[x], y=data[y], hue=data['class'], palette=palette, alpha=alpha, ax=ax)
+        return
+    bins = ax.hexbin(data[x], data[y], C=data['class'], reduce_C_function=np.mean,
+                     gridsize=hexbin_gridsize, mincnt=1, cmap=palette)
+    ax.figure.colorbar(bins, ax=ax, label='Fraud rate')
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    logging.info(f"Binned {len(data)} points of {y} vs {x} into a hexbin plot.")
+
+@profiled
 def plot_fraud_data_distributions(fraud_data):
     """
     Plot distributions for 'purchase_value', 'age', 'source', and 'browser' in fraud_data.
@@ -62,6 +86,7 @@ def plot_fraud_data_distributions(fraud_data):
         print(f"Error plotting fraud_data distributions: {e}")
         logging.error(f"Error plotting fraud_data distributions: {e}")
 
+@profiled
 def plot_creditcard_data_distributions(creditcard_data):
     """
     Plot distributions for 'Time', 'Amount', and 'Class' in creditcard_data.
@@ -115,6 +140,7 @@ def plot_creditcard_data_distributions(creditcard_data):
         print(f"Error plotting creditcard_data distributions: {e}")
         logging.error(f"Error plotting creditcard_data distributions: {e}")
 
+@profiled
 def plot_fraud_data_relationships(fraud_data):
     """
     Plot relationships between features in fraud_data.
@@ -130,7 +156,7 @@ def plot_fraud_data_relationships(fraud_data):
 
         # 1. Purchase Value vs Age (Fraud & Non-Fraud)
         print("Plotting Purchase Value vs Age...")
-        sns.scatterplot(x='age', y='purchase_value', hue='class', data=fraud_data, alpha=0.5, palette='coolwarm', ax=axes[0, 0])
+        scatter_by_class(fraud_data, 'age', 'purchase_value', axes[0, 0], 'coolwarm', 0.5)
         axes[0, 0].set_title('Purchase Value vs Age (Fraud & Non-Fraud)')
         axes[0, 0].set_xlabel('Age')
         axes[0, 0].set_ylabel('Purchase Value ($)')
@@ -182,6 +208,7 @@ def plot_fraud_data_relationships(fraud_data):
         print(f"Error plotting fraud_data relationships: {e}")
         logging.error(f"Error plotting fraud_data relationships: {e}")
 
+@profiled
 def plot_correlation_analysis(fraud_data, creditcard_data):
     """
     Perform correlation analysis and plot heatmaps for fraud_data and creditcard_data.
@@ -203,7 +230,7 @@ def plot_correlation_analysis(fraud_data, creditcard_data):
         axs1[0].set_title("Fraud Data Correlation Heatmap")
 
         # Scatter Plot for Fraud Data (Colorful)
-        sns.scatterplot(x=numeric_fraud_data['purchase_value'], y=numeric_fraud_data['age'], hue=numeric_fraud_data['class'], palette="viridis", alpha=0.7, ax=axs1[1])
+        scatter_by_class(numeric_fraud_data, 'purchase_value', 'age', axs1[1], 'viridis', 0.7)
         axs1[1].set_title("Fraud Data: Purchase Value vs Age (Color by Class)")
 
         plt.tight_layout()
@@ -226,9 +253,13 @@ def plot_correlation_analysis(fraud_data, creditcard_data):
         print(f"Error performing correlation analysis: {e}")
         logging.error(f"Error performing correlation analysis: {e}")
 
+@profiled
 def map_ip_to_country(fraud_data, ip_to_country):
     """
     Map IP addresses in fraud_data to countries using ip_to_country.
+
+    ip_to_country can be the raw range DataFrame or a prebuilt IpRangeIndex,
+    so callers mapping several frames only build the index once.
     """
     print("\nMapping IP addresses to countries...")
     logging.info("Mapping IP addresses to countries.")
@@ -236,18 +267,14 @@ def map_ip_to_country(fraud_data, ip_to_country):
         # Convert fraud_data IP address to integer format
         fraud_data['ip_address'] = fraud_data['ip_address'].astype(int)
 
-        # Create a function to check if IP address falls within the range
-        def find_country_by_ip(ip):
-            # Find the row where IP falls within the range
-            matched_row = ip_to_country[(ip >= ip_to_country['lower_bound_ip_address']) & 
-                                       (ip <= ip_to_country['upper_bound_ip_address'])]
-            if not matched_row.empty:
-                return matched_row['country'].values[0]
-            else:
-                return 'Unknown'  # Handle cases where no match is found
-
-        # Apply the function to fraud_data
-        fraud_data['country'] = fraud_data['ip_address'].apply(find_country_by_ip)
+        # Build the sorted range index unless one was passed in
+        if isinstance(ip_to_country, IpRangeIndex):
+            ip_index = ip_to_country
+        else:
+            ip_index = IpRangeIndex.from_frame(ip_to_country)
+
+        # Resolve all IPs in one batch; unmatched IPs map to 'Unknown'
+        fraud_data['country'] = ip_index.lookup(fraud_data['ip_address'].to_numpy())
         print("Successfully mapped IP addresses to countries.")
         logging.info("Successfully mapped IP addresses to countries.")
         return fraud_data
@@ -256,14 +283,15 @@ def map_ip_to_country(fraud_data, ip_to_country):
         logging.error(f"Error mapping IP addresses to countries: {e}")
         return fraud_data
 
+@profiled
 def save_data(fraud_data, output_path):
     """
-    Save the processed fraud_data to a CSV file.
+    Save the processed fraud_data as CSV, Feather or Parquet, chosen by the output_path extension.
     """
     print(f"\nSaving processed data to {output_path}...")
     logging.info(f"Saving processed data to {output_path}.")
     try:
-        fraud_data.to_csv(output_path, index=False)
+        save_table(fraud_data, output_path)
         print(f"Data successfully saved to {output_path}.")
         logging.info(f"Data successfully saved to {output_path}.")
     except Exception as e:
@@ -276,11 +304,12 @@ def perform_eda(fraud_data, creditcard_data, ip_to_country, output_path):
     """
     print("\nStarting exploratory data analysis (EDA)...")
     logging.info("Starting exploratory data analysis (EDA).")
-    plot_fraud_data_distributions(fraud_data)
-    plot_creditcard_data_distributions(creditcard_data)
-    plot_fraud_data_relationships(fraud_data)
-    plot_correlation_analysis(fraud_data, creditcard_data)
-    fraud_data = map_ip_to_country(fraud_data, ip_to_country)
-    save_data(fraud_data, output_path)
+    with run_report('perform_eda'):
+        plot_fraud_data_distributions(fraud_data)
+        plot_creditcard_data_distributions(creditcard_data)
+        plot_fraud_data_relationships(fraud_data)
+        plot_correlation_analysis(fraud_data, creditcard_data)
+        fraud_data = map_ip_to_country(fraud_data, ip_to_country)
+        save_data(fraud_data, output_path)
     print("\nExploratory data analysis (EDA) completed.")
     logging.info("Exploratory data analysis (EDA) completed.")
\ No newline at end of file
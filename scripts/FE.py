@@ -2,6 +2,10 @@ import os
 import logging
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler, StandardScaler, LabelEncoder
+from scripts.feature_transformer import FraudFeatureTransformer
+from scripts.user_state import UserFeatureStore
+from scripts.storage import save_table
+from scripts.profiling import profiled
 
 # Setup logging
 os.makedirs("logs", exist_ok=True)
@@ -14,11 +18,22 @@ logging.basicConfig(
     filemode="w"  # Overwrites the log file each run; use "a" to append
 )
 
-def feature_engineering(fraud_data, output_future_engineered):
+@profiled
+def feature_engineering(fraud_data, output_future_engineered, transformer_path=None, user_state_path=None):
     try:
         print("Starting feature engineering...")
         logging.info("Starting feature engineering...")
         
+        # Fit and persist the serving transformer on the same input, if requested
+        if transformer_path is not None:
+            print(f"Fitting feature transformer and saving it to {transformer_path}...")
+            FraudFeatureTransformer().fit(fraud_data).save(transformer_path)
+        
+        # Snapshot the per-user activity state used to compute these features at serving time
+        if user_state_path is not None:
+            print(f"Saving per-user feature state to {user_state_path}...")
+            UserFeatureStore.from_frame(fraud_data).save(user_state_path)
+        
         # Calculate transaction frequency per user
         print("Calculating transaction frequency per user...")
         transaction_frequency = fraud_data.groupby('user_id').size().reset_index(name='transaction_frequency')
@@ -61,8 +76,9 @@ def feature_engineering(fraud_data, output_future_engineered):
         
         # Convert datetime columns to timestamps
         print("Converting datetime columns to timestamps...")
-        fraud_data['signup_time'] = pd.to_datetime(fraud_data['signup_time']).astype('int64') // 10**9
-        fraud_data['purchase_time'] = pd.to_datetime(fraud_data['purchase_time']).astype('int64') // 10**9
+        # Cast to nanoseconds first: newer pandas may parse to a coarser unit
+        fraud_data['signup_time'] = pd.to_datetime(fraud_data['signup_time']).astype('datetime64[ns]').astype('int64') // 10**9
+        fraud_data['purchase_time'] = pd.to_datetime(fraud_data['purchase_time']).astype('datetime64[ns]').astype('int64') // 10**9
         logging.info("Datetime columns converted to timestamps.")
         
         # One-hot encode categorical columns
@@ -84,7 +100,7 @@ def feature_engineering(fraud_data, output_future_engineered):
         
         # Save processed data final
         print(f"Saving processed data to {output_future_engineered}...")
-        fraud_data.to_csv(output_future_engineered, index=False)
+        save_table(fraud_data, output_future_engineered)
         logging.info(f"Data successfully saved to {output_future_engineered}.")
         print("Feature engineering complete!")
     
@@ -3,8 +3,10 @@ import matplotlib.pyplot as plt
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import io
 import os
 import logging
+from scripts.profiling import profiled, run_report
 # Create logs directory if it doesn't exist
 os.makedirs("logs", exist_ok=True)
 
@@ -16,6 +18,7 @@ logging.basicConfig(
     filemode="w"  # Overwrites the log file each run; use "a" to append
 )
 
+@profiled
 def display_data_shapes(fraud_data, creditcard_data, ip_to_country):
     """
     Display the shapes of the datasets and log the details.
@@ -29,25 +32,27 @@ def display_data_shapes(fraud_data, creditcard_data, ip_to_country):
     logging.info(f"Credit Card Data Shape: {creditcard_data.shape}")
     logging.info(f"IP to Country Data Shape: {ip_to_country.shape}")
 
+@profiled
 def display_data_info(fraud_data, creditcard_data, ip_to_country):
     """
     Display information about the datasets (column types, non-null counts, etc.) and log the details.
     """
     logging.info("Displaying dataset info...")
-    print("\nFraud Data Info:")
-    print(fraud_data.info())
-    print("\nCredit Card Data Info:")
-    print(creditcard_data.info())
-    print("\nIP to Country Data Info:")
-    print(ip_to_country.info())
-
-    logging.info("Fraud Data Info:")
-    logging.info(fraud_data.info())
-    logging.info("Credit Card Data Info:")
-    logging.info(creditcard_data.info())
-    logging.info("IP to Country Data Info:")
-    logging.info(ip_to_country.info())
+    datasets = {
+        "Fraud Data": fraud_data,
+        "Credit Card Data": creditcard_data,
+        "IP to Country Data": ip_to_country
+    }
 
+    for name, data in datasets.items():
+        # DataFrame.info() prints and returns None, so capture its output to log it
+        buffer = io.StringIO()
+        data.info(buf=buffer)
+        print(f"\n{name} Info:")
+        print(buffer.getvalue())
+        logging.info(f"{name} Info:\n{buffer.getvalue()}")
+
+@profiled
 def check_missing_values(fraud_data, creditcard_data, ip_to_country):
     """
     Check for missing values in each dataset and log the missing value counts.
@@ -70,6 +75,7 @@ def check_missing_values(fraud_data, creditcard_data, ip_to_country):
 
     return fraud_data_missing, creditcard_data_missing, ip_to_country_missing
 
+@profiled
 def check_duplicates(fraud_data, creditcard_data, ip_to_country):
     """
     Check for duplicate rows in each dataset and remove them, logging the changes.
@@ -100,6 +106,7 @@ import plotly.graph_objects as go
 
 
 
+@profiled
 def plot_target_class_distribution(fraud_data, creditcard_data):
     """
     Plot the distribution of the target variable ('class' or 'Class') for Fraud and Credit Card datasets
@@ -166,9 +173,10 @@ def process_data(fraud_data, creditcard_data, ip_to_country):
     Main function to process and analyze the datasets, with logging.
     """
     logging.info("Starting data processing...")
-    display_data_shapes(fraud_data, creditcard_data, ip_to_country)
-    display_data_info(fraud_data, creditcard_data, ip_to_country)
-    check_missing_values(fraud_data, creditcard_data, ip_to_country)
-    check_duplicates(fraud_data, creditcard_data, ip_to_country)
-    plot_target_class_distribution(fraud_data, creditcard_data)
+    with run_report('process_data'):
+        display_data_shapes(fraud_data, creditcard_data, ip_to_country)
+        display_data_info(fraud_data, creditcard_data, ip_to_country)
+        check_missing_values(fraud_data, creditcard_data, ip_to_country)
+        check_duplicates(fraud_data, creditcard_data, ip_to_country)
+        plot_target_class_distribution(fraud_data, creditcard_data)
     logging.info("Data processing completed.")
\ No newline at end of file
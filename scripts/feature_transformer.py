@@ -0,0 +1,179 @@
+import logging
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler, StandardScaler, LabelEncoder
+
+# Columns scaled to [0, 1] and standardized, as in FE.feature_engineering
+MINMAX_COLUMNS = ['purchase_value', 'transaction_frequency', 'transaction_velocity']
+STANDARD_COLUMNS = ['age']
+NUMERIC_COLUMNS = ['purchase_value', 'sex', 'age', 'transaction_frequency', 'transaction_velocity',
+                   'hour_of_day', 'day_of_week']
+CATEGORICAL_COLUMNS = ['source', 'browser', 'country']
+
+
+def add_user_activity_features(fraud_data):
+    """
+    Add per-user 'transaction_frequency' and 'transaction_velocity' computed over the frame,
+    matching the groupby logic in FE.feature_engineering.
+    """
+    purchase_time = pd.to_datetime(fraud_data['purchase_time'])
+    grouped = purchase_time.groupby(fraud_data['user_id'])
+    frequency = grouped.transform('size')
+    span = (grouped.transform('max') - grouped.transform('min')).dt.total_seconds()
+    fraud_data = fraud_data.assign(transaction_frequency=frequency, transaction_velocity=span / frequency)
+    return fraud_data
+
+
+class FraudFeatureTransformer:
+    """
+    Fitted version of FE.feature_engineering for train/serve parity.
+
+    fit() learns the MinMax/Standard scalers, the 'sex' label encoding, the one-hot vocabularies
+    for source/browser/country (with the first category dropped, as pd.get_dummies(drop_first=True)
+    does) and the final feature column order. transform() and transform_records() then reproduce
+    the model input matrix without refitting anything.
+    """
+
+    def __init__(self, standardize=True):
+        self.standardize = standardize
+
+    def fit(self, fraud_data):
+        """
+        Fit the transformer on a cleaned fraud_data frame that already has a 'country' column.
+        """
+        logging.info(f"Fitting feature transformer on {len(fraud_data)} rows.")
+        if 'transaction_frequency' not in fraud_data or 'transaction_velocity' not in fraud_data:
+            fraud_data = add_user_activity_features(fraud_data)
+
+        self.minmax_scaler_ = MinMaxScaler().fit(fraud_data[MINMAX_COLUMNS])
+        self.standard_scaler_ = StandardScaler().fit(fraud_data[STANDARD_COLUMNS])
+        self.sex_encoder_ = LabelEncoder().fit(fraud_data['sex'])
+
+        # Sorted category order is what pd.get_dummies uses; the first one is dropped
+        self.vocabularies_ = {
+            column: sorted(fraud_data[column].dropna().unique().tolist())
+            for column in CATEGORICAL_COLUMNS
+        }
+        self.feature_names_ = list(NUMERIC_COLUMNS)
+        self.category_offsets_ = {}
+        for column in CATEGORICAL_COLUMNS:
+            # Offset of category code 1; code 0 is the dropped reference category
+            self.category_offsets_[column] = len(self.feature_names_) - 1
+            self.feature_names_ += [f"{column}_{value}" for value in self.vocabularies_[column][1:]]
+        self.category_codes_ = {
+            column: {value: code for code, value in enumerate(vocabulary)}
+            for column, vocabulary in self.vocabularies_.items()
+        }
+        self.sex_codes_ = {value: code for code, value in enumerate(self.sex_encoder_.classes_)}
+
+        self.minmax_scale_ = self.minmax_scaler_.scale_.astype(np.float64)
+        self.minmax_min_ = self.minmax_scaler_.min_.astype(np.float64)
+        self.age_mean_ = float(self.standard_scaler_.mean_[0])
+        self.age_scale_ = float(self.standard_scaler_.scale_[0])
+
+        self.feature_scaler_ = None
+        if self.standardize:
+            self.feature_scaler_ = StandardScaler().fit(self._encode_frame(fraud_data))
+        logging.info(f"Feature transformer fitted with {self.n_features_} features.")
+        return self
+
+    @property
+    def n_features_(self):
+        return len(self.feature_names_)
+
+    def _encode_frame(self, fraud_data):
+        n_rows = len(fraud_data)
+        out = np.zeros((n_rows, self.n_features_), dtype=np.float64)
+
+        minmax = fraud_data[MINMAX_COLUMNS].to_numpy(dtype=np.float64) * self.minmax_scale_ + self.minmax_min_
+        purchase_time = pd.to_datetime(fraud_data['purchase_time'])
+        out[:, 0] = minmax[:, 0]
+        out[:, 1] = self.sex_encoder_.transform(fraud_data['sex'])
+        out[:, 2] = (fraud_data['age'].to_numpy(dtype=np.float64) - self.age_mean_) / self.age_scale_
+        out[:, 3] = minmax[:, 1]
+        out[:, 4] = minmax[:, 2]
+        out[:, 5] = purchase_time.dt.hour.to_numpy()
+        out[:, 6] = purchase_time.dt.dayofweek.to_numpy()
+
+        rows = np.arange(n_rows)
+        for column in CATEGORICAL_COLUMNS:
+            codes = pd.Categorical(fraud_data[column], categories=self.vocabularies_[column]).codes
+            # Unseen categories and the dropped reference category leave the row all zeros
+            hit = codes > 0
+            out[rows[hit], self.category_offsets_[column] + codes[hit]] = 1.0
+        return out
+
+    def transform(self, fraud_data):
+        """
+        Transform a batch DataFrame of raw transactions into the float32 model input matrix.
+
+        If the frame has no 'transaction_frequency'/'transaction_velocity' columns they are
+        computed over the batch itself.
+        """
+        if 'transaction_frequency' not in fraud_data or 'transaction_velocity' not in fraud_data:
+            fraud_data = add_user_activity_features(fraud_data)
+        out = self._encode_frame(fraud_data)
+        if self.feature_scaler_ is not None:
+            out = self.feature_scaler_.transform(out)
+        return out.astype(np.float32)
+
+    def transform_records(self, records, out=None):
+        """
+        Fast path for single transactions and micro-batches given as a list of dicts.
+
+        Writes straight into a preallocated float32 array (pass `out` to reuse a buffer) without
+        building a DataFrame. Records without 'transaction_frequency'/'transaction_velocity' are
+        treated as a user's first transaction (frequency 1, velocity 0).
+        """
+        n_rows = len(records)
+        if out is None:
+            out = np.empty((n_rows, self.n_features_), dtype=np.float32)
+        elif out.shape[0] < n_rows or out.shape[1] != self.n_features_:
+            raise ValueError(f"Output buffer of shape {out.shape} cannot hold {n_rows} rows.")
+        out = out[:n_rows]
+        out.fill(0.0)
+
+        minmax = np.empty((n_rows, len(MINMAX_COLUMNS)), dtype=np.float64)
+        for i, record in enumerate(records):
+            minmax[i, 0] = record['purchase_value']
+            minmax[i, 1] = record.get('transaction_frequency', 1)
+            minmax[i, 2] = record.get('transaction_velocity', 0.0)
+            sex = record['sex']
+            if sex not in self.sex_codes_:
+                raise ValueError(f"Unseen value for 'sex': {sex}")
+            purchase_time = pd.Timestamp(record['purchase_time'])
+            out[i, 1] = self.sex_codes_[sex]
+            out[i, 2] = (record['age'] - self.age_mean_) / self.age_scale_
+            out[i, 5] = purchase_time.hour
+            out[i, 6] = purchase_time.dayofweek
+            for column in CATEGORICAL_COLUMNS:
+                code = self.category_codes_[column].get(record.get(column), 0)
+                if code > 0:
+                    out[i, self.category_offsets_[column] + code] = 1.0
+
+        minmax = minmax * self.minmax_scale_ + self.minmax_min_
+        out[:, 0] = minmax[:, 0]
+        out[:, 3] = minmax[:, 1]
+        out[:, 4] = minmax[:, 2]
+
+        if self.feature_scaler_ is not None:
+            out -= self.feature_scaler_.mean_.astype(np.float32)
+            out /= self.feature_scaler_.scale_.astype(np.float32)
+        return out
+
+    def save(self, path):
+        """
+        Serialize the fitted transformer next to the model artifacts.
+        """
+        joblib.dump(self, path)
+        logging.info(f"Feature transformer saved to {path}.")
+
+    @staticmethod
+    def load(path):
+        """
+        Load a transformer written by save().
+        """
+        transformer = joblib.load(path)
+        logging.info(f"Feature transformer loaded from {path} ({transformer.n_features_} features).")
+        return transformer
@@ -0,0 +1,191 @@
+import logging
+import numpy as np
+import pandas as pd
+
+IPV4_MAX = 2 ** 32 - 1
+
+
+# Character classes for the dotted-quad parser: 1 digit, 2 dot, 3 padding, 0 anything else
+_CHAR_CLASS = np.zeros(256, dtype=np.uint8)
+_CHAR_CLASS[ord('0'):ord('9') + 1] = 1
+_CHAR_CLASS[ord('.')] = 2
+_CHAR_CLASS[0] = 3
+_DIGIT_VALUE = np.zeros(256, dtype=np.int16)
+_DIGIT_VALUE[ord('0'):ord('9') + 1] = np.arange(10)
+
+
+def _parse_dotted_quads(strings):
+    """
+    Parse an array of 'a.b.c.d' strings with array operations over their characters, with no
+    per-row Python calls. Returns (ips, valid).
+    """
+    strings = np.char.strip(np.asarray(strings, dtype=str))
+    n, width = len(strings), strings.dtype.itemsize // 4
+    ips = np.full(n, -1, dtype=np.int64)
+    if n == 0 or width == 0:
+        return ips, np.zeros(n, dtype=bool)
+    # Fixed-width unicode strings are a (rows, width) matrix of code points, zero-padded. Code
+    # points above 255 are clipped to 255, which like every non-ASCII byte is no IP character.
+    code_points = np.ascontiguousarray(strings).view(np.uint32).reshape(n, width)
+    chars = np.minimum(code_points, 255).astype(np.uint8)
+    kinds = _CHAR_CLASS[chars]
+    dot_rows, dot_columns = np.nonzero(kinds == 2)
+    valid = ~(kinds == 0).any(axis=1) & (np.bincount(dot_rows, minlength=n) == 3)
+
+    # Octets end at the three dots and at the end of the string, and hold one to three digits
+    rows = np.flatnonzero(valid)
+    ends = np.empty((len(rows), 4), dtype=np.int32)
+    ends[:, :3] = dot_columns[valid[dot_rows]].reshape(-1, 3)
+    ends[:, 3] = (kinds != 3).sum(axis=1, dtype=np.int32)[rows]
+    lengths = np.diff(ends, axis=1, prepend=-1) - 1
+    ok = ((lengths >= 1) & (lengths <= 3)).all(axis=1)
+    rows, ends, lengths = rows[ok], ends[ok], lengths[ok]
+
+    # Read each octet's digits right to left from the flattened character matrix
+    digits = _DIGIT_VALUE[chars].reshape(-1)
+    positions = (rows.astype(np.int32) * width)[:, None] + ends
+    octets = digits[positions - 1].astype(np.int32)
+    octets += np.where(lengths >= 2, digits[positions - 2], 0) * 10
+    octets += np.where(lengths >= 3, digits[np.maximum(positions - 3, 0)], 0) * 100
+    ok = (octets <= 255).all(axis=1)
+    rows, octets = rows[ok], octets[ok].astype(np.int64)
+    ips[rows] = (octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3]
+    return ips, ips >= 0
+
+
+def normalize_ips(values):
+    """
+    Convert a batch of IPs to int64: float-encoded (as read from CSV), integer or dotted-quad
+    strings, in any mix. NaN, malformed and out-of-range values become -1, which no range
+    contains.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in 'iu':
+        ips = values.astype(np.int64)
+        return np.where((ips >= 0) & (ips <= IPV4_MAX), ips, -1)
+    if values.dtype.kind != 'f':
+        # Dotted quads first; whatever isn't one is converted as a number or numeric string
+        ips = np.full(len(values), -1, dtype=np.int64)
+        present = np.flatnonzero(pd.notna(values))
+        quads, valid = _parse_dotted_quads(values[present].astype(str))
+        ips[present] = quads
+        others = present[~valid]
+        if len(others):
+            numbers = pd.to_numeric(pd.Series(values[others], dtype=object), errors='coerce')
+            ips[others] = normalize_ips(numbers.to_numpy(dtype=float, na_value=np.nan))
+        return ips
+    valid = (values >= 0) & (values < IPV4_MAX + 1)  # False for NaN
+    return np.where(valid, np.trunc(np.where(valid, values, 0)), -1).astype(np.int64)
+
+
+class IpRangeIndex:
+    """
+    Sorted interval index over the IpAddress_to_Country ranges.
+
+    The bounds are kept as two sorted int64 arrays and countries as integer codes,
+    so a batch of IPs is resolved with a single numpy.searchsorted call instead of
+    scanning the whole table for every IP.
+    """
+
+    def __init__(self, lower, upper, countries, unknown='Unknown'):
+        lower = np.asarray(lower, dtype=np.int64)
+        upper = np.asarray(upper, dtype=np.int64)
+        codes, categories = pd.factorize(np.asarray(countries, dtype=object))
+
+        order = np.argsort(lower, kind='stable')
+        self.lower = np.ascontiguousarray(lower[order])
+        self.upper = np.ascontiguousarray(upper[order])
+        self.codes = np.ascontiguousarray(codes[order].astype(np.int32))
+        self.categories = np.asarray(categories, dtype=object)
+        self.unknown = unknown
+        # Fixed categories for lookup_categorical: the table's countries plus the unknown label
+        country_names = pd.Index(categories, dtype=object)
+        if unknown in country_names:
+            self.unknown_code = int(country_names.get_loc(unknown))
+        else:
+            self.unknown_code = len(country_names)
+            country_names = country_names.append(pd.Index([unknown], dtype=object))
+        self.country_dtype = pd.CategoricalDtype(country_names)
+
+    @classmethod
+    def from_frame(cls, ip_to_country, validate=True, strict=False):
+        """
+        Build the index from a DataFrame with 'lower_bound_ip_address',
+        'upper_bound_ip_address' and 'country' columns.
+        """
+        index = cls(
+            ip_to_country['lower_bound_ip_address'].to_numpy(),
+            ip_to_country['upper_bound_ip_address'].to_numpy(),
+            ip_to_country['country'].to_numpy(),
+        )
+        if validate:
+            index.validate(strict=strict)
+        return index
+
+    @classmethod
+    def from_csv(cls, path, validate=True, strict=False):
+        """
+        Build the index straight from IpAddress_to_Country.csv.
+        """
+        ip_to_country = pd.read_csv(path)
+        return cls.from_frame(ip_to_country, validate=validate, strict=strict)
+
+    def __len__(self):
+        return len(self.lower)
+
+    def validate(self, strict=False):
+        """
+        Check the ranges for inverted bounds, overlaps and gaps.
+
+        Overlapping ranges make the lookup ambiguous, so they are reported as a
+        warning (or raised as ValueError when strict=True). Gaps are expected in the
+        source data and are only counted; IPs that fall in a gap map to 'Unknown'.
+        """
+        inverted = int(np.count_nonzero(self.lower > self.upper))
+        overlaps = int(np.count_nonzero(self.lower[1:] <= self.upper[:-1]))
+        gaps = int(np.count_nonzero(self.lower[1:] > self.upper[:-1] + 1))
+        report = {'ranges': len(self), 'inverted': inverted, 'overlaps': overlaps, 'gaps': gaps}
+
+        logging.info(f"IP range index validation: {report}")
+        if inverted or overlaps:
+            message = f"IP range table has {inverted} inverted and {overlaps} overlapping ranges."
+            if strict:
+                raise ValueError(message)
+            logging.warning(message)
+        return report
+
+    def lookup_codes(self, ips):
+        """
+        Return the country code for each IP, or -1 when no range contains it.
+        """
+        ips = np.asarray(ips)
+        valid = np.ones(ips.shape, dtype=bool)
+        if ips.dtype.kind == 'f':
+            valid = ~np.isnan(ips)
+            ips = np.where(valid, ips, 0)
+        ips = ips.astype(np.int64, copy=False)
+
+        # Position of the last range whose lower bound is <= ip
+        pos = np.searchsorted(self.lower, ips, side='right') - 1
+        valid &= pos >= 0
+        pos = np.clip(pos, 0, None)
+        valid &= ips <= self.upper[pos]
+
+        return np.where(valid, self.codes[pos], -1)
+
+    def lookup(self, ips):
+        """
+        Map a batch of IPs (integers or float-encoded integers) to country names.
+        """
+        codes = self.lookup_codes(ips)
+        # Code -1 picks the trailing 'Unknown' entry
+        countries = np.append(self.categories, self.unknown)
+        return countries[codes]
+
+    def lookup_categorical(self, ips):
+        """
+        Map a batch of IPs to a Categorical of country names with country_dtype, so every batch
+        shares the same categories and codes.
+        """
+        codes = self.lookup_codes(ips)
+        return pd.Categorical.from_codes(np.where(codes >= 0, codes, self.unknown_code), dtype=self.country_dtype)
@@ -0,0 +1,322 @@
+"""
+Chunked, out-of-core version of the fraud data pipeline:
+preprocessing (duplicates, missing values) -> EDA IP-to-country mapping -> feature engineering.
+
+The raw CSV is read three times in bounded-size chunks with an explicit dtype schema:
+
+1. Duplicate pass: spills row hashes to hash buckets on disk and finds the duplicate rows
+   bucket by bucket (DuplicateFilter).
+2. Statistics pass: drops the duplicates, counts missing values and classes, accumulates per-user
+   activity (UserFeatureStore) and the scaler statistics FE.feature_engineering fits on the
+   full table.
+3. Transform pass: drops the same duplicates, maps IPs to countries and writes the engineered
+   features chunk by chunk, with the same columns as FE.feature_engineering.
+
+Memory is bounded by the chunk size, one hash bucket, and state proportional to the number of
+users (per-user aggregates) and of duplicate rows (their row numbers), never the full table.
+
+Run from the repository root:
+    python scripts/pipeline.py --fraud Fraud_Data.csv --ip-to-country IpAddress_to_Country.csv --output merged_data.csv
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.ip_index import IpRangeIndex
+from scripts.user_state import UserFeatureStore, series_to_ns
+
+# Explicit read schema: compact integer types where the value range allows it. ip_address stays
+# float64 because IPv4 values don't fit exactly in float32. The categorical columns take their
+# categories from each chunk, so a value missing from earlier exports is kept (FE.feature_engineering
+# one-hot encodes it too); the statistics pass collects the vocabularies over the full table.
+FRAUD_SCHEMA = {
+    'user_id': 'int32',
+    'purchase_value': 'int16',
+    'device_id': 'string',
+    'source': 'category',
+    'browser': 'category',
+    'sex': 'category',
+    'age': 'int16',
+    'ip_address': 'float64',
+    'class': 'int8',
+}
+ONE_HOT_COLUMNS = ['source', 'browser', 'country']
+
+# Duplicate detection spill records: 64-bit row hash and row number
+SPILL_DTYPE = np.dtype([('hash', '<u8'), ('row', '<i8')])
+
+
+def iter_fraud_chunks(path, chunk_rows):
+    """
+    Yield raw Fraud_Data chunks read with FRAUD_SCHEMA.
+    """
+    yield from pd.read_csv(path, chunksize=chunk_rows, dtype=FRAUD_SCHEMA)
+
+
+class DuplicateFilter:
+    """
+    Drops rows equal to an earlier row of the file, keeping the first occurrence.
+
+    Duplicates are found in a pass of their own: add() spills a 64-bit hash and the row number of
+    every row to one of n_buckets files on disk (chosen by hash), and finish() deduplicates the
+    buckets one at a time. Memory holds one chunk or one bucket (16 bytes per row in it), plus the
+    row numbers of the duplicates, never a structure over all rows.
+    Chunks are identified by their index, which pd.read_csv numbers continuously across chunks.
+    """
+
+    def __init__(self, n_buckets=256, spill_dir=None):
+        self.n_buckets = n_buckets
+        self.spill_dir = tempfile.mkdtemp(prefix='dedup-', dir=spill_dir)
+        self.buckets = [open(os.path.join(self.spill_dir, f'bucket-{i:04d}.bin'), 'wb') for i in range(n_buckets)]
+        self.duplicate_rows = None
+
+    @property
+    def dropped(self):
+        return len(self.duplicate_rows)
+
+    def add(self, chunk):
+        """
+        Spill the hashes and row numbers of one chunk to their buckets.
+        """
+        entries = np.empty(len(chunk), dtype=SPILL_DTYPE)
+        entries['hash'] = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        entries['row'] = chunk.index.to_numpy()
+        bucket = entries['hash'] % np.uint64(self.n_buckets)
+        order = np.argsort(bucket, kind='stable')
+        bounds = np.searchsorted(bucket[order], np.arange(self.n_buckets + 1))
+        for i in np.flatnonzero(np.diff(bounds)):
+            entries[order[bounds[i]:bounds[i + 1]]].tofile(self.buckets[i])
+
+    def finish(self):
+        """
+        Find the duplicate rows bucket by bucket and delete the spill files.
+        """
+        duplicates = []
+        try:
+            for i, bucket_file in enumerate(self.buckets):
+                bucket_file.close()
+                entries = np.fromfile(bucket_file.name, dtype=SPILL_DTYPE)
+                # Sorted by hash, then row: every entry after the first of its hash is a duplicate
+                entries = entries[np.lexsort((entries['row'], entries['hash']))]
+                repeated = np.flatnonzero(entries['hash'][1:] == entries['hash'][:-1]) + 1
+                duplicates.append(entries['row'][repeated])
+        finally:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+        self.duplicate_rows = np.sort(np.concatenate(duplicates)) if duplicates else np.empty(0, dtype=np.int64)
+        return self
+
+    def __call__(self, chunk):
+        rows = chunk.index.to_numpy()
+        # Only the duplicates inside this chunk's row range can match
+        start, stop = np.searchsorted(self.duplicate_rows, [rows.min(), rows.max() + 1]) if len(rows) else (0, 0)
+        duplicate = np.isin(rows, self.duplicate_rows[start:stop])
+        return chunk[~duplicate] if duplicate.any() else chunk
+
+
+class PipelineStats:
+    """
+    Everything the transform pass needs from the full table, accumulated one chunk at a time.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.missing = None
+        self.class_counts = pd.Series(dtype=np.int64)
+        self.users = UserFeatureStore()
+        self.purchase_value_min = np.inf
+        self.purchase_value_max = -np.inf
+        # Exact integer sums for the 'age' StandardScaler
+        self.age_count = 0
+        self.age_sum = 0
+        self.age_sum_squares = 0
+        self.categories = {column: set() for column in ONE_HOT_COLUMNS}
+        self.sexes = set()
+
+    def update(self, chunk, countries):
+        self.rows += len(chunk)
+        missing = chunk.isnull().sum()
+        self.missing = missing if self.missing is None else self.missing.add(missing, fill_value=0)
+        self.class_counts = self.class_counts.add(chunk['class'].value_counts(), fill_value=0)
+        self.users.update_frame(chunk)
+
+        purchase_value = chunk['purchase_value'].to_numpy()
+        if len(purchase_value):
+            self.purchase_value_min = min(self.purchase_value_min, float(purchase_value.min()))
+            self.purchase_value_max = max(self.purchase_value_max, float(purchase_value.max()))
+        age = chunk['age'].to_numpy(dtype=np.int64)
+        self.age_count += len(age)
+        self.age_sum += int(age.sum())
+        self.age_sum_squares += int((age * age).sum())
+
+        for column in ('source', 'browser'):
+            self.categories[column].update(chunk[column].dropna().unique().tolist())
+        self.categories['country'].update(countries.unique().tolist())
+        self.sexes.update(chunk['sex'].dropna().unique().tolist())
+
+    def finalize(self):
+        """
+        Derive the scaling parameters and one-hot vocabularies FE.feature_engineering would fit.
+        """
+        n_users = len(self.users)
+        frequency = self.users.count[:n_users].astype(np.float64)
+        velocity = UserFeatureStore._velocity(self.users.first_time[:n_users], self.users.last_time[:n_users],
+                                              self.users.count[:n_users])
+        # Every user appears in at least one row, so row-level min/max equal the per-user ones
+        self.minmax = {
+            'purchase_value': (self.purchase_value_min, self.purchase_value_max),
+            'transaction_frequency': (frequency.min(), frequency.max()),
+            'transaction_velocity': (velocity.min(), velocity.max()),
+        }
+        self.age_mean = self.age_sum / self.age_count
+        self.age_scale = np.sqrt(self.age_sum_squares / self.age_count - self.age_mean ** 2) or 1.0
+        # pd.get_dummies(drop_first=True) orders categories and drops the first one
+        self.dummies = {column: sorted(values)[1:] for column, values in self.categories.items()}
+        self.sex_codes = {value: code for code, value in enumerate(sorted(self.sexes))}
+
+
+def minmax_scale(values, low, high):
+    # Same arithmetic as MinMaxScaler: x * scale + min, where a constant column keeps scale 1
+    data_range = high - low
+    scale = 1.0 / data_range if data_range != 0 else 1.0
+    return values * scale + (0.0 - low * scale)
+
+
+def engineer_chunk(chunk, countries, stats):
+    """
+    Feature-engineer one deduplicated chunk with the statistics of the full table.
+    """
+    out = chunk.copy()
+    out['ip_address'] = out['ip_address'].astype(np.int64)
+    frequency, velocity = stats.users.frame_features(out['user_id'].to_numpy())
+    purchase_time = pd.to_datetime(out['purchase_time'])
+
+    out['transaction_frequency'] = frequency
+    out['transaction_velocity'] = velocity
+    out['hour_of_day'] = purchase_time.dt.hour.astype(np.int32)
+    out['day_of_week'] = purchase_time.dt.dayofweek.astype(np.int32)
+    for column, (low, high) in stats.minmax.items():
+        out[column] = minmax_scale(out[column].to_numpy(dtype=np.float64), low, high)
+    out['age'] = (out['age'].to_numpy(dtype=np.float64) - stats.age_mean) / stats.age_scale
+    out['signup_time'] = series_to_ns(out['signup_time']) // 10**9
+    out['purchase_time'] = series_to_ns(out['purchase_time']) // 10**9
+
+    values = {'source': out['source'].astype(object), 'browser': out['browser'].astype(object),
+              'country': pd.Series(countries, index=out.index)}
+    out = out.drop(columns=['source', 'browser'])
+    for column in ONE_HOT_COLUMNS:
+        for category in stats.dummies[column]:
+            out[f"{column}_{category}"] = (values[column] == category).to_numpy(dtype=np.int8)
+    out['sex'] = out['sex'].astype(object).map(stats.sex_codes).astype(np.int8)
+    return out
+
+
+class ChunkWriter:
+    """
+    Appends DataFrame chunks to one CSV or Parquet file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self._writer = None
+        self._first = True
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def run_pipeline(fraud_path, ip_to_country_path, output_path, chunk_rows=100_000, user_state_path=None,
+                 dedup_buckets=256, spill_dir=None):
+    """
+    Run preprocessing, IP-to-country mapping and feature engineering over fraud_path in chunks
+    of chunk_rows rows and write the engineered features to output_path (.csv or .parquet).
+    Duplicate detection spills row hashes to dedup_buckets files in spill_dir (default: the
+    system temp directory). Returns the PipelineStats of the statistics pass.
+    """
+    start = time.perf_counter()
+    ip_index = IpRangeIndex.from_csv(ip_to_country_path)
+
+    print(f"Pass 1/3: finding duplicate rows in {fraud_path} in chunks of {chunk_rows:,} rows...")
+    logging.info(f"Pipeline duplicate pass over {fraud_path} (chunk_rows={chunk_rows}).")
+    deduplicate = DuplicateFilter(dedup_buckets, spill_dir)
+    for chunk in iter_fraud_chunks(fraud_path, chunk_rows):
+        deduplicate.add(chunk)
+    deduplicate.finish()
+
+    print("Pass 2/3: collecting statistics...")
+    logging.info(f"Pipeline statistics pass over {fraud_path}.")
+    stats = PipelineStats()
+    for chunk in iter_fraud_chunks(fraud_path, chunk_rows):
+        chunk = deduplicate(chunk)
+        stats.update(chunk, ip_index.lookup_categorical(chunk['ip_address'].to_numpy()))
+    stats.finalize()
+    print(f"Rows: {stats.rows:,} unique ({deduplicate.dropped:,} duplicates dropped), users: {len(stats.users):,}")
+    print(f"Missing values:\n{stats.missing[stats.missing > 0] if stats.missing is not None else 'none'}")
+    print(f"Class distribution:\n{stats.class_counts.astype(np.int64)}")
+    logging.info(f"Statistics pass done: {stats.rows} rows, {deduplicate.dropped} duplicates, {len(stats.users)} users.")
+
+    print(f"Pass 3/3: mapping countries and engineering features into {output_path}...")
+    writer = ChunkWriter(output_path)
+    written = 0
+    try:
+        for chunk in iter_fraud_chunks(fraud_path, chunk_rows):
+            chunk = deduplicate(chunk)
+            countries = ip_index.lookup_categorical(chunk['ip_address'].to_numpy())
+            engineered = engineer_chunk(chunk, countries, stats)
+            writer.write(engineered)
+            written += len(engineered)
+    finally:
+        writer.close()
+
+    if user_state_path is not None:
+        stats.users.save(user_state_path)
+    elapsed = time.perf_counter() - start
+    print(f"Pipeline complete: {written:,} rows written to {output_path} in {elapsed:.1f}s.")
+    logging.info(f"Pipeline wrote {written} rows to {output_path} in {elapsed:.1f}s.")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunked fraud data pipeline (preprocess -> map IPs -> features).")
+    parser.add_argument('--fraud', required=True, help="Raw Fraud_Data CSV")
+    parser.add_argument('--ip-to-country', required=True, help="IpAddress_to_Country CSV")
+    parser.add_argument('--output', required=True, help="Engineered features (.csv or .parquet)")
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    parser.add_argument('--user-state', default=None, help="Also save the per-user feature state snapshot here")
+    parser.add_argument('--dedup-buckets', type=int, default=256,
+                        help="Hash buckets for duplicate detection; memory holds one bucket at a time")
+    parser.add_argument('--spill-dir', default=None, help="Directory for the duplicate detection spill files")
+    args = parser.parse_args()
+
+    os.makedirs("logs", exist_ok=True)
+    logging.basicConfig(
+        filename="logs/pipeline.log",
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+    run_pipeline(args.fraud, args.ip_to_country, args.output, args.chunk_rows, args.user_state,
+                 args.dedup_buckets, args.spill_dir)
+
+
+if __name__ == '__main__':
+    main()
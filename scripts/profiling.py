@@ -0,0 +1,202 @@
+"""
+Stage-level timing and memory records for the preprocessing, EDA and feature engineering scripts.
+
+Each pipeline function is wrapped with `profiled`, or a block with `stage(name)`. Every stage
+records its wall time, CPU time, rows in and out, and the peak RSS reached above the RSS at its
+start. Stages run inside `run_report(name)` are collected into one report. At the end, the report
+is written to `<report_dir>/<name>_report.json` (PIPELINE_REPORT_DIR, 'logs' by default) and printed
+as a table:
+
+    with run_report('process_data'):
+        check_duplicates(fraud_data, creditcard_data, ip_to_country)
+
+Set PIPELINE_PROFILE_STAGE to a stage name to run that stage under cProfile. The stats are dumped to
+`<report_dir>/<stage>.prof` for pstats or snakeviz. For flame graphs, run the script under
+`py-spy record` instead: the stage names in the report tell which functions to look for.
+"""
+import contextlib
+import cProfile
+import functools
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+report_dir = os.environ.get('PIPELINE_REPORT_DIR', 'logs')
+profile_stage = os.environ.get('PIPELINE_PROFILE_STAGE')
+
+_open_stages = []
+_reports = []
+_started = itertools.count()
+
+
+def _proc_status(field):
+    # Resident set sizes from /proc are in kB; None where /proc is not available
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def _max_rss():
+    """
+    The process's peak resident set size in bytes, since start or since the last _reset_peak.
+    """
+    peak = _proc_status('VmHWM')
+    if peak is None and resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        peak = peak if sys.platform == 'darwin' else peak * 1024
+    return peak
+
+
+def _reset_peak():
+    """
+    Reset the peak RSS so that it tracks the stage starting now. Linux only; elsewhere the peak
+    keeps covering the whole process, and stages only see peaks above earlier ones.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _count_rows(value):
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        counts = [_count_rows(item) for item in value]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+def _format_rows(rows):
+    return f"{rows:,}" if rows is not None else '-'
+
+
+class _Stage:
+    def __init__(self, name, rows_in):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.started = next(_started)
+        self.rss_start = _proc_status('VmRSS') or _max_rss()
+        self.peak = None
+
+    def set_rows_out(self, rows_out):
+        self.rows_out = rows_out
+
+
+@contextlib.contextmanager
+def stage(name, rows_in=None):
+    """
+    Record the wall time, CPU time and peak RSS delta of the block, with rows_in and the rows_out
+    set through the yielded stage's set_rows_out().
+    """
+    # The peak so far belongs to the enclosing stages, which see it when this one ends
+    peak = _max_rss()
+    for parent in _open_stages:
+        parent.peak = max(parent.peak or 0, peak or 0)
+    _reset_peak()
+    current = _Stage(name, rows_in)
+    _open_stages.append(current)
+
+    profiler = cProfile.Profile() if name == profile_stage else None
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield current
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        _open_stages.pop()
+        peak = max(current.peak or 0, _max_rss() or 0)
+        for parent in _open_stages:
+            parent.peak = max(parent.peak or 0, peak)
+        record = {
+            'stage': name,
+            'started': current.started,
+            'depth': len(_open_stages),
+            'wall_s': round(wall, 4),
+            'cpu_s': round(cpu, 4),
+            'rows_in': current.rows_in,
+            'rows_out': current.rows_out,
+            'peak_rss_delta_mb': round(max(0, peak - current.rss_start) / 1e6, 1) if current.rss_start else None,
+        }
+        for report in _reports:
+            report.append(record)
+        logging.info(f"Stage {name}: {wall:.3f} s wall, {cpu:.3f} s CPU, rows {_format_rows(current.rows_in)} -> "
+                     f"{_format_rows(current.rows_out)}, peak RSS +{record['peak_rss_delta_mb']} MB")
+        if profiler is not None:
+            os.makedirs(report_dir, exist_ok=True)
+            profile_path = os.path.join(report_dir, f'{name}.prof')
+            profiler.dump_stats(profile_path)
+            logging.info(f"cProfile stats for stage {name} saved to {profile_path}.")
+
+
+def profiled(func):
+    """
+    Decorator running func as a stage named after it. Rows in and out are the lengths of the
+    DataFrame arguments and of the DataFrame(s) it returns.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with stage(func.__name__, _count_rows(list(args) + list(kwargs.values()))) as current:
+            result = func(*args, **kwargs)
+            current.set_rows_out(_count_rows(result))
+            return result
+    return wrapper
+
+
+def format_report(records):
+    """
+    The records as a text table, nested stages indented under the stage that ran them.
+    """
+    lines = [f"{'stage':36s} {'wall s':>8s} {'cpu s':>8s} {'rows in':>11s} {'rows out':>11s} {'peak MB':>8s}"]
+    for record in records:
+        peak = f"{record['peak_rss_delta_mb']:.1f}" if record['peak_rss_delta_mb'] is not None else '-'
+        lines.append(f"{'  ' * record['depth'] + record['stage']:36s} {record['wall_s']:8.3f} {record['cpu_s']:8.3f} "
+                     f"{_format_rows(record['rows_in']):>11s} {_format_rows(record['rows_out']):>11s} {peak:>8s}")
+    return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def run_report(name):
+    """
+    Run the block as stage `name`, collecting every stage that ends inside it. On exit, write the
+    records to <report_dir>/<name>_report.json, and print and log them as a table.
+    """
+    records = []
+    _reports.append(records)
+    try:
+        with stage(name):
+            yield records
+    finally:
+        _reports.remove(records)
+        # Stages are recorded as they end; list them in the order they started
+        records = [dict(record) for record in sorted(records, key=lambda record: record['started'])]
+        for record in records:
+            del record['started']
+        os.makedirs(report_dir, exist_ok=True)
+        report_path = os.path.join(report_dir, f'{name}_report.json')
+        with open(report_path, 'w') as f:
+            json.dump({'run': name, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'stages': records}, f, indent=2)
+        table = format_report(records)
+        print(f"\n{name} run report ({report_path}):\n{table}")
+        logging.info(f"{name} run report saved to {report_path}:\n{table}")
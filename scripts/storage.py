@@ -0,0 +1,166 @@
+"""
+Typed columnar storage for the cleaned and feature-engineered datasets.
+
+CSV round trips lose types: every reader re-parses timestamps and categories are plain strings.
+Here datasets are written as Parquet (optionally partitioned by purchase date) or Feather, keeping
+datetime and categorical columns, and read back with column projection and predicate pushdown:
+
+    save_table(fraud_data, 'cleaned_data/fraud_data.parquet')
+    read_table('cleaned_data/fraud_data.parquet', columns=['purchase_time', 'class'],
+               filters=[('purchase_time', '>=', pd.Timestamp('2015-06-01'))])
+
+The format follows the extension: '.csv', '.feather' or '.parquet'. Partitioned Parquet datasets are
+directories with one 'purchase_date=YYYY-MM-DD' subdirectory per period; filters on purchase_time
+are also applied to the partition column, so non-matching partitions are never opened.
+"""
+import logging
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DATETIME_COLUMNS = ['signup_time', 'purchase_time']
+CATEGORICAL_COLUMNS = ['source', 'browser', 'sex', 'country']
+PARTITION_COLUMN = 'purchase_date'
+
+# Period of the purchase-date partitions: 'D' (day), 'M' (month) or None for a single file
+default_partition_period = 'M'
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.date32())]), flavor='hive')
+
+
+def _format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in ('.csv', '.feather', '.parquet'):
+        raise ValueError(f"Unsupported storage format for {path}; use .csv, .feather or .parquet")
+    return extension[1:]
+
+
+def apply_types(frame):
+    """
+    Parse datetime columns and convert low-cardinality string columns to categoricals, in place
+    of the per-consumer pd.to_datetime calls. Columns that are missing or already typed are left alone.
+    """
+    frame = frame.copy()
+    for column in DATETIME_COLUMNS:
+        if column in frame and not pd.api.types.is_datetime64_any_dtype(frame[column]) \
+                and not pd.api.types.is_numeric_dtype(frame[column]):
+            frame[column] = pd.to_datetime(frame[column])
+    for column in CATEGORICAL_COLUMNS:
+        if column in frame and not isinstance(frame[column].dtype, pd.CategoricalDtype) \
+                and not pd.api.types.is_numeric_dtype(frame[column]):
+            frame[column] = frame[column].astype('category')
+    return frame
+
+
+def save_table(frame, path, partition_period=default_partition_period):
+    """
+    Write a DataFrame to path as CSV, Feather or Parquet. Parquet with a datetime purchase_time
+    is partitioned by purchase date unless partition_period is None.
+    """
+    file_format = _format(path)
+    if file_format == 'csv':
+        frame.to_csv(path, index=False)
+        return path
+
+    frame = apply_types(frame)
+    if file_format == 'feather':
+        frame.reset_index(drop=True).to_feather(path)
+        return path
+
+    partitioned = partition_period is not None and 'purchase_time' in frame \
+        and pd.api.types.is_datetime64_any_dtype(frame['purchase_time'])
+    if not partitioned:
+        frame.to_parquet(path, index=False)
+        return path
+
+    period = frame['purchase_time'].dt.to_period(partition_period).dt.start_time
+    table = pa.Table.from_pandas(frame.assign(**{PARTITION_COLUMN: period.dt.date}), preserve_index=False)
+    if os.path.isdir(path):
+        shutil.rmtree(path)  # Replace the whole dataset, like to_csv overwrites a file
+    ds.write_dataset(table, path, format='parquet', partitioning=_partitioning(),
+                     existing_data_behavior='overwrite_or_ignore', max_partitions=10_000)
+    logging.info(f"Saved {len(frame)} rows to {path}, partitioned by purchase date ({partition_period}).")
+    return path
+
+
+def _filter_expression(filters):
+    expression = pq.filters_to_expression(filters)
+    # Mirror purchase_time bounds onto the partition column so whole partitions are skipped. A
+    # partition is labelled with the first day of its period, which is never after the month start
+    # of any row in it, whether partitions are daily or monthly.
+    partition = ds.field(PARTITION_COLUMN)
+    for column, op, value in filters:
+        if column != 'purchase_time':
+            continue
+        timestamp = pd.Timestamp(value)
+        if op in ('>', '>=', '=', '=='):
+            expression &= partition >= pa.scalar(timestamp.to_period('M').start_time.date(), pa.date32())
+        if op in ('<', '<=', '=', '=='):
+            expression &= partition <= pa.scalar(timestamp.date(), pa.date32())
+    return expression
+
+
+def read_table(path, columns=None, filters=None):
+    """
+    Read a dataset written by save_table (or a CSV). `columns` projects the read to those
+    columns and `filters` is a list of (column, op, value) predicates, e.g.
+    [('class', '=', 1), ('purchase_time', '>=', pd.Timestamp('2015-06-01'))], pushed down to
+    the Parquet/Feather reader. Rows of a partitioned dataset come back grouped by partition.
+    """
+    file_format = _format(path)
+    if file_format == 'csv':
+        frame = apply_types(pd.read_csv(path, usecols=columns))
+        if filters:
+            for column, op, value in filters:
+                frame = frame[_compare(frame[column], op, value)]
+        return frame.reset_index(drop=True)
+
+    partitioned = False
+    if file_format == 'feather':
+        dataset = ds.dataset(path, format='feather')
+    else:
+        partitioned = os.path.isdir(path)
+        dataset = ds.dataset(path, format='parquet', partitioning=_partitioning() if partitioned else None)
+
+    if filters:
+        expression = _filter_expression(filters) if partitioned else pq.filters_to_expression(filters)
+    else:
+        expression = None
+    names = columns or [name for name in dataset.schema.names if name != PARTITION_COLUMN]
+    return dataset.to_table(columns=names, filter=expression).to_pandas()
+
+
+def _compare(series, op, value):
+    if op in ('=', '=='):
+        return series == value
+    if op == '!=':
+        return series != value
+    if op == '<':
+        return series < value
+    if op == '<=':
+        return series <= value
+    if op == '>':
+        return series > value
+    if op == '>=':
+        return series >= value
+    if op == 'in':
+        return series.isin(value)
+    if op == 'not in':
+        return ~series.isin(value)
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def load_table(csv_path, columns=None, filters=None):
+    """
+    Read a dataset given its CSV path, preferring a '.parquet' or '.feather' copy next to it.
+    """
+    stem = os.path.splitext(csv_path)[0]
+    for extension in ('.parquet', '.feather'):
+        if os.path.exists(stem + extension):
+            return read_table(stem + extension, columns, filters)
+    return read_table(csv_path, columns, filters)
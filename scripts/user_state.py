@@ -0,0 +1,233 @@
+"""
+Incremental per-user activity state for 'transaction_frequency' and 'transaction_velocity'.
+
+FE.feature_engineering derives both features with a groupby over the full history. UserFeatureStore
+keeps the same aggregates per user (transaction count, first and last purchase time, total purchase
+value) in compact arrays, updates them in O(1) per transaction and can be snapshotted to disk, so
+the serving path can compute the features for a live transaction without the history.
+
+Build a snapshot and check it against the batch computation:
+    python scripts/user_state.py --input Fraud_Data.csv --output model_api/models/user_state.npz --check
+"""
+import argparse
+import logging
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.feature_transformer import add_user_activity_features
+
+NS_PER_SECOND = 1e9
+
+
+def to_ns(purchase_time):
+    """
+    Nanoseconds since the epoch for one timestamp (string, datetime or pd.Timestamp).
+    """
+    return pd.Timestamp(purchase_time).as_unit('ns').value
+
+
+def series_to_ns(purchase_time):
+    return pd.to_datetime(purchase_time).astype('datetime64[ns]').astype(np.int64).to_numpy()
+
+
+class UserFeatureStore:
+    """
+    Running per-user aggregates in parallel arrays, indexed through a user_id -> slot dict.
+    """
+
+    def __init__(self, capacity=1024):
+        self.slots = {}
+        self.user_ids = []
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.first_time = np.zeros(capacity, dtype=np.int64)
+        self.last_time = np.zeros(capacity, dtype=np.int64)
+        self.total_value = np.zeros(capacity, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def _grow(self, size):
+        capacity = len(self.count)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        for name in ('count', 'first_time', 'last_time', 'total_value'):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def _slot(self, user_id):
+        slot = self.slots.get(user_id)
+        if slot is None:
+            slot = len(self.user_ids)
+            self._grow(slot + 1)
+            self.slots[user_id] = slot
+            self.user_ids.append(user_id)
+        return slot
+
+    def update(self, user_id, purchase_time, purchase_value=0.0):
+        """
+        Record one transaction. O(1) amortized.
+        """
+        slot = self._slot(user_id)
+        time_ns = to_ns(purchase_time)
+        if self.count[slot] == 0:
+            self.first_time[slot] = self.last_time[slot] = time_ns
+        elif time_ns < self.first_time[slot]:
+            self.first_time[slot] = time_ns
+        elif time_ns > self.last_time[slot]:
+            self.last_time[slot] = time_ns
+        self.count[slot] += 1
+        self.total_value[slot] += purchase_value
+
+    def update_frame(self, fraud_data):
+        """
+        Record a batch of transactions (user_id, purchase_time, purchase_value columns) at once.
+        """
+        times = series_to_ns(fraud_data['purchase_time'])
+        values = fraud_data['purchase_value'].to_numpy(dtype=np.float64) if 'purchase_value' in fraud_data \
+            else np.zeros(len(fraud_data))
+        grouped = pd.DataFrame({'user_id': fraud_data['user_id'].to_numpy(), 'time': times, 'value': values}) \
+            .groupby('user_id', sort=False).agg(n=('time', 'size'), first=('time', 'min'),
+                                                last=('time', 'max'), value=('value', 'sum'))
+        slots = np.fromiter((self._slot(user_id) for user_id in grouped.index), dtype=np.int64, count=len(grouped))
+        new = self.count[slots] == 0
+        first, last = grouped['first'].to_numpy(), grouped['last'].to_numpy()
+        self.first_time[slots] = np.where(new, first, np.minimum(self.first_time[slots], first))
+        self.last_time[slots] = np.where(new, last, np.maximum(self.last_time[slots], last))
+        self.count[slots] += grouped['n'].to_numpy()
+        self.total_value[slots] += grouped['value'].to_numpy()
+
+    @staticmethod
+    def _velocity(first_time, last_time, count):
+        # Same arithmetic as the batch version: span in seconds divided by the count
+        return (last_time - first_time) / NS_PER_SECOND / count
+
+    def features(self, user_id):
+        """
+        (transaction_frequency, transaction_velocity) over everything recorded for the user,
+        or None for an unknown user.
+        """
+        slot = self.slots.get(user_id)
+        if slot is None:
+            return None
+        count = int(self.count[slot])
+        return count, float(self._velocity(int(self.first_time[slot]), int(self.last_time[slot]), count))
+
+    def peek(self, user_id, purchase_time):
+        """
+        Features for a live transaction as if it were recorded, without changing the state.
+        """
+        time_ns = to_ns(purchase_time)
+        slot = self.slots.get(user_id)
+        if slot is None:
+            return 1, 0.0
+        count = int(self.count[slot]) + 1
+        first = min(int(self.first_time[slot]), time_ns)
+        last = max(int(self.last_time[slot]), time_ns)
+        return count, float(self._velocity(first, last, count))
+
+    def frame_features(self, user_ids):
+        """
+        Vectorized features for many users; unknown users get frequency 0 and velocity NaN.
+        """
+        slots = np.fromiter((self.slots.get(user_id, -1) for user_id in user_ids), dtype=np.int64)
+        known = slots >= 0
+        frequency = np.zeros(len(slots), dtype=np.int64)
+        velocity = np.full(len(slots), np.nan)
+        s = slots[known]
+        frequency[known] = self.count[s]
+        velocity[known] = self._velocity(self.first_time[s], self.last_time[s], self.count[s])
+        return frequency, velocity
+
+    def enrich(self, records):
+        """
+        Add transaction_frequency / transaction_velocity from the store to raw transaction
+        records that have a user_id and purchase_time but not the features themselves.
+        """
+        enriched = []
+        for record in records:
+            if 'transaction_frequency' not in record and 'user_id' in record and 'purchase_time' in record:
+                frequency, velocity = self.peek(record['user_id'], record['purchase_time'])
+                record = dict(record, transaction_frequency=frequency, transaction_velocity=velocity)
+            enriched.append(record)
+        return enriched
+
+    def save(self, path):
+        """
+        Write an atomic .npz snapshot of the state.
+        """
+        n = len(self)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, user_ids=np.asarray(self.user_ids), count=self.count[:n],
+                 first_time=self.first_time[:n], last_time=self.last_time[:n], total_value=self.total_value[:n])
+        os.replace(tmp_path, path)
+        logging.info(f"User feature state for {n} users saved to {path}.")
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a snapshot written by save().
+        """
+        with np.load(path, allow_pickle=False) as snapshot:
+            n = len(snapshot['count'])
+            store = cls(capacity=max(n, 1024))
+            store.user_ids = snapshot['user_ids'].tolist()
+            store.slots = {user_id: slot for slot, user_id in enumerate(store.user_ids)}
+            store.count[:n] = snapshot['count']
+            store.first_time[:n] = snapshot['first_time']
+            store.last_time[:n] = snapshot['last_time']
+            store.total_value[:n] = snapshot['total_value']
+        logging.info(f"User feature state for {n} users loaded from {path}.")
+        return store
+
+    @classmethod
+    def from_frame(cls, fraud_data):
+        store = cls(capacity=max(1024, fraud_data['user_id'].nunique()))
+        store.update_frame(fraud_data)
+        return store
+
+
+def check_parity(fraud_data, store=None):
+    """
+    Assert that a store fed one transaction at a time reproduces add_user_activity_features
+    exactly for every row. Returns the store.
+    """
+    if store is None:
+        store = UserFeatureStore()
+        for user_id, purchase_time, purchase_value in zip(fraud_data['user_id'], fraud_data['purchase_time'],
+                                                          fraud_data['purchase_value']):
+            store.update(user_id, purchase_time, purchase_value)
+
+    expected = add_user_activity_features(fraud_data)
+    frequency, velocity = store.frame_features(fraud_data['user_id'])
+    if not np.array_equal(frequency, expected['transaction_frequency'].to_numpy()):
+        raise AssertionError("Incremental transaction_frequency differs from the batch computation.")
+    if not np.array_equal(velocity, expected['transaction_velocity'].to_numpy()):
+        raise AssertionError("Incremental transaction_velocity differs from the batch computation.")
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a per-user feature state snapshot.")
+    parser.add_argument('--input', required=True, help="Fraud_Data CSV with user_id and purchase_time")
+    parser.add_argument('--output', required=True, help="Snapshot path (.npz)")
+    parser.add_argument('--check', action='store_true', help="Also check parity with the batch features")
+    args = parser.parse_args()
+
+    fraud_data = pd.read_csv(args.input)
+    store = UserFeatureStore.from_frame(fraud_data)
+    if args.check:
+        check_parity(fraud_data)
+        check_parity(fraud_data, store)
+        print("Parity check passed: incremental and bulk state match the batch features.")
+    store.save(args.output)
+    print(f"User feature state for {len(store):,} users saved to {args.output}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import asyncio
+import importlib
+import json
+import os
+import sys
+import numpy as np
+import pytest
+
+MODEL_API = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_api')
+sys.path.append(MODEL_API)
+from inference import input_size
+
+
+@pytest.fixture
+def asgi_app(tmp_path, monkeypatch):
+    # The app writes app.log to the working directory and finds its models under model_api/models
+    (tmp_path / 'model_api').symlink_to(MODEL_API)
+    monkeypatch.chdir(tmp_path)
+    module = importlib.import_module('asgi_app')
+    monkeypatch.setattr(module, 'executor_threads', 2)
+    monkeypatch.setattr(module, 'bulk_threads', 2)
+    return module
+
+
+def ndjson_chunks(n_chunks, rows_per_chunk, n_features):
+    rng = np.random.default_rng(0)
+    return [''.join(json.dumps({'data': row}) + '\n'
+                    for row in rng.random((rows_per_chunk, n_features)).round(4).tolist()).encode()
+            for _ in range(n_chunks)]
+
+
+async def post_batch(endpoint, chunks, release=None, disconnect_after=None):
+    """
+    Call the raw ASGI endpoint with the body split into chunks. The upload stalls before its
+    second chunk until `release` is set, and the client disconnects after `disconnect_after` chunks.
+    """
+    scope = {'type': 'http', 'method': 'POST', 'path': '/predict/batch', 'query_string': b'model=fraud',
+             'headers': [(b'content-type', b'application/x-ndjson')]}
+    sent = iter(enumerate(chunks))
+    messages = []
+
+    async def receive():
+        index, chunk = next(sent, (None, None))
+        if index is None or (disconnect_after is not None and index >= disconnect_after):
+            return {'type': 'http.disconnect'}
+        if index == 1 and release is not None:
+            await release.wait()
+        await asyncio.sleep(0)
+        return {'type': 'http.request', 'body': chunk, 'more_body': index < len(chunks) - 1}
+
+    async def send(message):
+        messages.append(message)
+
+    await endpoint(scope, receive, send)
+    body = b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def test_concurrent_uploads_beyond_the_thread_pools(asgi_app):
+    chunks = ndjson_chunks(20, 8, input_size)
+
+    async def scenario():
+        async with asgi_app.lifespan(asgi_app.app):
+            release = asyncio.Event()
+            uploads = [asyncio.ensure_future(post_batch(asgi_app.BulkScoringEndpoint(), chunks, release))
+                       for _ in range(6)]
+            await asyncio.sleep(0.2)
+            # Stalled uploads must not hold the executor the single-request endpoints use
+            loop = asyncio.get_running_loop()
+            assert await asyncio.wait_for(loop.run_in_executor(asgi_app.state.executor, lambda: 'free'), 5) == 'free'
+            release.set()
+            return await asyncio.wait_for(asyncio.gather(*uploads), 60)
+
+    for records in asyncio.run(scenario()):
+        assert len(records) == 20 * 8
+        assert all('fraud_probability' in record for record in records)
+
+
+def test_client_disconnect_releases_the_scorer(asgi_app):
+    chunks = ndjson_chunks(30, 8, input_size)
+
+    async def scenario():
+        async with asgi_app.lifespan(asgi_app.app):
+            await asyncio.wait_for(post_batch(asgi_app.BulkScoringEndpoint(), chunks, disconnect_after=12), 30)
+            # Every scoring thread finished, so a full pool of new uploads still runs
+            uploads = [post_batch(asgi_app.BulkScoringEndpoint(), chunks[:2]) for _ in range(asgi_app.bulk_threads)]
+            return await asyncio.wait_for(asyncio.gather(*uploads), 30)
+
+    for records in asyncio.run(scenario()):
+        assert len(records) == 2 * 8
@@ -0,0 +1,87 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'model_api'))
+from batch_score import feature_matrix, score_features
+from inference import CREDITCARD_FEATURES, CREDITCARD_RAW_FEATURES, creditcard_model_path, load_creditcard_model
+from scripts.feature_transformer import FraudFeatureTransformer, add_user_activity_features
+from benchmarks.synthetic import make_creditcard_data, make_fraud_data
+
+
+@pytest.fixture
+def fraud_data():
+    return make_fraud_data(3000)
+
+
+def test_engineered_and_raw_fraud_input_give_the_same_scaled_features(fraud_data, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # FE writes its log under logs/
+    from scripts.FE import feature_engineering
+
+    transformer = FraudFeatureTransformer().fit(fraud_data)
+    feature_engineering(fraud_data.copy(), str(tmp_path / 'engineered.feather'))
+    engineered = pd.read_feather(tmp_path / 'engineered.feather')
+    raw = add_user_activity_features(fraud_data)
+
+    from_engineered = feature_matrix('fraud', engineered, transformer, transformer.n_features_)
+    from_raw = feature_matrix('fraud', raw, transformer, transformer.n_features_)
+    np.testing.assert_allclose(from_engineered, from_raw, atol=1e-4)
+    # The transformer's final StandardScaler is applied
+    np.testing.assert_allclose(from_raw.mean(axis=0), 0, atol=1e-3)
+
+    # Column order comes from the transformer, not from the file
+    shuffled = engineered[engineered.columns[::-1]]
+    np.testing.assert_array_equal(feature_matrix('fraud', shuffled, transformer, transformer.n_features_),
+                                  from_engineered)
+
+
+def test_width_mismatch_raises(fraud_data):
+    transformer = FraudFeatureTransformer().fit(fraud_data)
+    raw = add_user_activity_features(fraud_data)
+    with pytest.raises(ValueError, match="the model expects 194"):
+        feature_matrix('fraud', raw, transformer, 194)
+    with pytest.raises(ValueError, match="missing"):
+        feature_matrix('fraud', raw.drop(columns='transaction_velocity'), transformer, transformer.n_features_)
+
+
+def notebook_creditcard_scaler(creditcard_data):
+    """
+    The training scaler as the notebooks fit it: time_in_days and Amount_scaled added over the full
+    table, then a StandardScaler fitted on the training split.
+    """
+    data = creditcard_data.assign(time_in_days=creditcard_data['Time'] / (60 * 60 * 24),
+                                  Amount_scaled=StandardScaler().fit_transform(creditcard_data[['Amount']])[:, 0])
+    X_train, X_test = train_test_split(data.drop('Class', axis=1), test_size=0.2, random_state=42)
+    return StandardScaler().fit(X_train), X_test
+
+
+def test_raw_creditcard_input_is_scored_by_the_shipped_model():
+    model = load_creditcard_model(os.path.join(ROOT, creditcard_model_path), backend='sklearn')
+    scaler, X_test = notebook_creditcard_scaler(make_creditcard_data(2000))
+    assert list(scaler.feature_names_in_) == CREDITCARD_FEATURES
+
+    # Raw rows, columns shuffled: the derived columns come out as the notebook computed them
+    raw = X_test[CREDITCARD_RAW_FEATURES[::-1]]
+    features = feature_matrix('creditcard', raw, scaler, model.n_features_in_)
+    np.testing.assert_allclose(features, scaler.transform(X_test), rtol=1e-5, atol=1e-5)
+    prediction, probability = score_features('creditcard', model, features)
+    assert len(prediction) == len(probability) == len(X_test)
+
+    # Input that already has the derived columns is used as is
+    np.testing.assert_array_equal(feature_matrix('creditcard', X_test, scaler, model.n_features_in_), features)
+
+
+def test_creditcard_scaler_fitted_on_arrays_uses_the_training_column_order():
+    creditcard_data = make_creditcard_data(1000)
+    _, X_test = notebook_creditcard_scaler(creditcard_data)
+    scaler = StandardScaler().fit(X_test[CREDITCARD_FEATURES].to_numpy())
+    features = feature_matrix('creditcard', X_test[CREDITCARD_FEATURES[::-1]], scaler, 32)
+    np.testing.assert_allclose(features, scaler.transform(X_test.to_numpy()), rtol=1e-5, atol=1e-5)
+    with pytest.raises(ValueError, match="missing columns \\['Amount', 'Amount_scaled'\\]"):
+        feature_matrix('creditcard', X_test.drop(columns=['Amount', 'Amount_scaled']), scaler, 32)
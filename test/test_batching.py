@@ -0,0 +1,80 @@
+import os
+import sys
+import threading
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_api'))
+from batching import MicroBatcher
+
+
+def row_sums(features):
+    return features.sum(axis=1, keepdims=True)
+
+
+def submit_together(batcher, requests):
+    """
+    Submit all requests from separate threads at once and return each result or exception.
+    """
+    results = [None] * len(requests)
+    start = threading.Barrier(len(requests))
+
+    def call(index, features):
+        start.wait()
+        try:
+            results[index] = batcher.submit(features, timeout=10)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=call, args=(i, features)) for i, features in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_submit_rejects_bad_shapes_before_queueing():
+    batcher = MicroBatcher(row_sums, max_batch_size=64, max_wait_ms=5, n_features=4, dtype=np.float32)
+    try:
+        with pytest.raises(ValueError, match="Expected 4 features, got 3"):
+            batcher.submit(np.ones((1, 3)))
+        with pytest.raises(ValueError, match="2D"):
+            batcher.submit(np.ones((1, 2, 2)))
+        with pytest.raises(ValueError, match="numeric"):
+            batcher.submit(np.array([['a', 'b', 'c', 'd']]))
+        assert batcher.stats()['requests'] == 0
+        assert batcher.submit(np.ones(4)).dtype == np.float32
+    finally:
+        batcher.close()
+
+
+def test_bad_request_fails_alone():
+    # Without n_features the width mismatch only shows when the batch is stacked
+    batcher = MicroBatcher(row_sums, max_batch_size=64, max_wait_ms=200)
+    try:
+        requests = [np.full((1, 194), float(i)) for i in range(5)] + [np.ones((1, 193))]
+        results = submit_together(batcher, requests)
+        for i in range(5):
+            np.testing.assert_allclose(results[i], [[194.0 * i]])
+        np.testing.assert_allclose(results[5], [[193.0]])
+        assert batcher.stats()['batches'] < len(requests)
+    finally:
+        batcher.close()
+
+
+def test_failing_predict_only_fails_the_bad_request():
+    def predict(features):
+        if np.isnan(features).any():
+            raise ValueError("NaN input")
+        return row_sums(features)
+
+    batcher = MicroBatcher(predict, max_batch_size=64, max_wait_ms=200)
+    try:
+        requests = [np.ones((2, 3)), np.array([[np.nan, 1.0, 1.0]]), np.full((1, 3), 2.0)]
+        results = submit_together(batcher, requests)
+        np.testing.assert_allclose(results[0], [[3.0], [3.0]])
+        assert isinstance(results[1], ValueError)
+        np.testing.assert_allclose(results[2], [[6.0]])
+    finally:
+        batcher.close()
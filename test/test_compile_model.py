@@ -0,0 +1,45 @@
+import os
+import sys
+import pytest
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_api'))
+from compile_model import check_parity, compile_fraud_model
+from inference import input_size, load_fraud_model
+from model_definitions import RNNModel
+
+BATCH_SIZES = (1, 7, 64, 4096)
+
+
+@pytest.fixture
+def eager_model():
+    torch.manual_seed(0)
+    return RNNModel(input_size).eval()
+
+
+def test_compiled_model_matches_eager_model(eager_model, tmp_path):
+    compiled_model = compile_fraud_model(eager_model)
+    assert check_parity(eager_model, compiled_model, batch_sizes=BATCH_SIZES) <= 1e-6
+
+    # The saved artifact, as serving loads it, gives the same outputs at every batch size
+    compiled_model.save(str(tmp_path / 'fraud.torchscript.pt'))
+    loaded = load_fraud_model(str(tmp_path / 'fraud.torchscript.pt'), backend='torchscript')
+    features = torch.randn(max(BATCH_SIZES), input_size, generator=torch.Generator().manual_seed(1))
+    with torch.no_grad():
+        for batch_size in BATCH_SIZES:
+            batch = features[:batch_size]
+            expected = eager_model(batch)
+            assert loaded(batch).shape == expected.shape == (batch_size, 1)
+            torch.testing.assert_close(loaded(batch), expected, rtol=0, atol=1e-6)
+
+
+def test_parity_check_rejects_a_different_model(eager_model):
+    torch.manual_seed(1)
+    other_model = compile_fraud_model(RNNModel(input_size))
+    with pytest.raises(AssertionError, match="differs from eager model"):
+        check_parity(eager_model, other_model)
+
+
+def test_missing_compiled_model_explains_how_to_build_it(tmp_path):
+    with pytest.raises(FileNotFoundError, match="compile_model.py"):
+        load_fraud_model(str(tmp_path / 'missing.torchscript.pt'), backend='torchscript')
@@ -0,0 +1,48 @@
+import os
+import sys
+import pytest
+import torch
+
+MODEL_API = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_api')
+sys.path.append(MODEL_API)
+from inference import input_size, load_fraud_model, quantize_fraud_model
+from model_definitions import RNNModel, SingleStepRNNModel
+
+
+def random_model(seed=0):
+    torch.manual_seed(seed)
+    model = RNNModel(input_size).eval()
+    # Non-zero recurrent biases, so dropping bias_hh from the fold would show
+    with torch.no_grad():
+        model.rnn.bias_hh_l0.uniform_(-0.5, 0.5)
+    return model
+
+
+def features(n_rows, seed=1):
+    return torch.randn(n_rows, input_size, generator=torch.Generator().manual_seed(seed))
+
+
+@pytest.mark.parametrize('load', [random_model, lambda: load_fraud_model(os.path.join(MODEL_API, 'models', 'RNN_Fraud.pt'),
+                                                                         backend='eager')],
+                         ids=['random', 'shipped'])
+def test_single_step_model_matches_the_rnn(load):
+    model = load()
+    single_step = SingleStepRNNModel.from_rnn_model(model)
+    with torch.no_grad():
+        for batch_size in (1, 64, 4096):
+            x = features(batch_size)
+            torch.testing.assert_close(single_step(x), model(x), rtol=0, atol=1e-6)
+
+
+def test_int8_model_stays_close_to_the_float_model():
+    model = random_model()
+    quantized = quantize_fraud_model(model)
+    x = features(4096)
+    with torch.no_grad():
+        expected, actual = model(x), quantized(x)
+    assert actual.shape == expected.shape == (4096, 1)
+    diff = (actual - expected).abs()
+    assert diff.max().item() < 0.05
+    assert diff.mean().item() < 0.01
+    # The int8 model is not just the float model under another name
+    assert diff.max().item() > 0
@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import sys
+import threading
+import numpy as np
+import pytest
+import torch
+
+MODEL_API = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_api')
+sys.path.append(MODEL_API)
+from inference import input_size
+from model_definitions import RNNModel
+from model_registry import ModelRegistry, ModelSpec, create_registry
+
+FEATURES = np.zeros((2, 3), dtype=np.float32)
+
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def constant_predictor(model):
+    return lambda features: np.full((len(features), 1), model['score'])
+
+
+def write_model(directory, file_name, score, mtime=None):
+    path = directory / file_name
+    path.write_text(json.dumps({'score': score}))
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+@pytest.fixture
+def registry(tmp_path):
+    loads = []
+
+    def loader(path):
+        loads.append(os.path.basename(path))
+        return load_json(path)
+
+    registry = ModelRegistry(str(tmp_path), [ModelSpec('creditcard_model', 'Model', '.json', loader, constant_predictor)])
+    registry.loads = loads
+    return registry
+
+
+def test_latest_version_is_loaded_lazily(registry, tmp_path):
+    write_model(tmp_path, 'Model.json', 0.0)
+    write_model(tmp_path, 'Model-v2.json', 0.2)
+    write_model(tmp_path, 'Model-v10.json', 0.1)
+    write_model(tmp_path, 'Model-vX.json', 0.9)  # Not a version
+    assert registry.describe()['creditcard_model'] == {'active': None, 'available': [0, 2, 10]}
+    assert registry.loads == []
+
+    predict = registry.predictor('creditcard_model')
+    np.testing.assert_allclose(predict(FEATURES), [[0.1], [0.1]])
+    assert registry.get('creditcard_model').version == 10
+    assert registry.loads == ['Model-v10.json']
+
+
+def test_missing_artifacts_raise(registry):
+    with pytest.raises(FileNotFoundError, match="No artifacts for creditcard_model"):
+        registry.get('creditcard_model')
+
+
+def test_reload_swaps_only_on_a_change(registry, tmp_path):
+    write_model(tmp_path, 'Model-v1.json', 0.1, mtime=1_000_000)
+    swaps = []
+    registry.add_listener(swaps.append)
+    registry.get('creditcard_model')
+
+    assert registry.reload() == {}
+    # An older version changing is not a reason to reload
+    write_model(tmp_path, 'Model.json', 0.0, mtime=1_000_000)
+    assert registry.reload() == {}
+    # The active artifact rewritten in place is
+    write_model(tmp_path, 'Model-v1.json', 0.15, mtime=1_000_100)
+    assert registry.reload() == {'creditcard_model': 1}
+    assert registry.get('creditcard_model').model['score'] == 0.15
+    # And so is a new version
+    write_model(tmp_path, 'Model-v2.json', 0.2, mtime=1_000_100)
+    assert registry.reload() == {'creditcard_model': 2}
+    assert registry.reload() == {}
+    assert swaps == ['creditcard_model', 'creditcard_model']
+    assert registry.loads == ['Model-v1.json', 'Model-v1.json', 'Model-v2.json']
+
+
+def test_half_written_artifact_keeps_the_active_version(registry, tmp_path):
+    write_model(tmp_path, 'Model-v1.json', 0.1, mtime=1_000_000)
+    registry.get('creditcard_model')
+    (tmp_path / 'Model-v2.json').write_text('{"score": 0.')
+    assert registry.reload() == {}
+    assert registry.get('creditcard_model').version == 1
+
+    # Once the copy completes, the next check picks it up
+    write_model(tmp_path, 'Model-v2.json', 0.2, mtime=1_000_100)
+    assert registry.reload() == {'creditcard_model': 2}
+
+
+def test_activate_rolls_back_and_rejects_unknown_versions(registry, tmp_path):
+    write_model(tmp_path, 'Model-v1.json', 0.1)
+    write_model(tmp_path, 'Model-v2.json', 0.2)
+    assert registry.get('creditcard_model').version == 2
+    assert registry.activate('creditcard_model', 1).version == 1
+    np.testing.assert_allclose(registry.predictor('creditcard_model')(FEATURES), [[0.1], [0.1]])
+    with pytest.raises(KeyError, match="no version 7"):
+        registry.activate('creditcard_model', 7)
+    assert registry.get('creditcard_model').version == 1
+
+
+def test_watcher_hot_swaps_new_versions(registry, tmp_path):
+    write_model(tmp_path, 'Model-v1.json', 0.1)
+    registry.get('creditcard_model')
+    swapped = threading.Event()
+    registry.add_listener(lambda name: swapped.set())
+    registry.start_watcher(0.05)
+    try:
+        write_model(tmp_path, 'Model-v2.json', 0.2)
+        assert swapped.wait(5)
+        assert registry.get('creditcard_model').version == 2
+    finally:
+        registry.stop_watcher()
+
+
+def test_served_fraud_model_versions(tmp_path):
+    shutil.copy(os.path.join(MODEL_API, 'models', 'RNN_Fraud.pt'), tmp_path / 'RNN_Fraud.pt')
+    registry = create_registry(str(tmp_path))
+    features = np.random.default_rng(0).standard_normal((4, input_size)).astype(np.float32)
+    original = registry.predictor('fraud_model')(features)
+
+    # A truncated copy of a new version fails to load and the original keeps serving
+    torch.manual_seed(0)
+    torch.save(RNNModel(input_size).state_dict(), tmp_path / 'retrained.pt')
+    (tmp_path / 'RNN_Fraud-v2.pt').write_bytes((tmp_path / 'retrained.pt').read_bytes()[:1000])
+    assert registry.reload() == {}
+    np.testing.assert_array_equal(registry.predictor('fraud_model')(features), original)
+
+    os.replace(tmp_path / 'retrained.pt', tmp_path / 'RNN_Fraud-v2.pt')
+    assert registry.reload() == {'fraud_model': 2}
+    assert not np.array_equal(registry.predictor('fraud_model')(features), original)
@@ -0,0 +1,63 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.ip_index import IpRangeIndex
+from scripts.pipeline import DuplicateFilter, iter_fraud_chunks, run_pipeline
+from benchmarks.synthetic import add_duplicates, make_fraud_data, make_ip_to_country
+
+
+def test_duplicate_filter_matches_drop_duplicates(tmp_path):
+    data = add_duplicates(make_fraud_data(5000), 0.1)
+    data.to_csv(tmp_path / 'fraud.csv', index=False)
+
+    deduplicate = DuplicateFilter(n_buckets=8, spill_dir=str(tmp_path))
+    for chunk in iter_fraud_chunks(str(tmp_path / 'fraud.csv'), 700):
+        deduplicate.add(chunk)
+    deduplicate.finish()
+    kept = pd.concat([deduplicate(chunk) for chunk in iter_fraud_chunks(str(tmp_path / 'fraud.csv'), 700)])
+
+    expected = pd.read_csv(tmp_path / 'fraud.csv').drop_duplicates()
+    assert deduplicate.dropped == len(data) - len(expected)
+    # First occurrences are kept, so the surviving row numbers are the same
+    assert kept.index.tolist() == expected.index.tolist()
+    # The spill files are removed once the duplicates are known
+    assert sorted(os.listdir(tmp_path)) == ['fraud.csv']
+
+
+def test_pipeline_matches_feature_engineering_on_unseen_categories(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # EDA and FE write their logs under logs/
+    from scripts import EDA, FE
+
+    data = add_duplicates(make_fraud_data(3000, with_country=False), 0.05)
+    # Values the original exports never had
+    data.loc[data.index[:7], 'source'] = 'Email'
+    data.loc[data.index[10:12], 'browser'] = 'Edge'
+    data.to_csv('fraud.csv', index=False)
+    ip_to_country = make_ip_to_country(2000)
+    ip_to_country.to_csv('ip_to_country.csv', index=False)
+
+    run_pipeline('fraud.csv', 'ip_to_country.csv', 'pipeline.csv', chunk_rows=500, dedup_buckets=8)
+    mapped = EDA.map_ip_to_country(pd.read_csv('fraud.csv').drop_duplicates(), IpRangeIndex.from_frame(ip_to_country))
+    FE.feature_engineering(mapped, 'fe.feather')
+
+    expected = pd.read_feather('fe.feather')
+    actual = pd.read_csv('pipeline.csv')
+    assert list(actual.columns) == list(expected.columns)
+    assert {'source_Email', 'browser_Edge'} <= set(actual.columns)
+    for column in expected.columns:
+        if column == 'device_id':
+            assert actual[column].tolist() == expected[column].tolist()
+        else:
+            np.testing.assert_allclose(actual[column].to_numpy(dtype=np.float64),
+                                       expected[column].to_numpy(dtype=np.float64), atol=1e-6, err_msg=column)
+
+
+def test_country_lookup_shares_categories_across_batches():
+    index = IpRangeIndex([0, 10, 20], [5, 15, 25], ['Japan', 'Chile', 'Japan'])
+    first, second = index.lookup_categorical(np.array([1.0, 7.0])), index.lookup_categorical(np.array([12, 22]))
+    assert first.tolist() == ['Japan', 'Unknown'] and second.tolist() == ['Chile', 'Japan']
+    assert first.dtype == second.dtype == index.country_dtype
+    assert list(index.country_dtype.categories) == ['Japan', 'Chile', 'Unknown']
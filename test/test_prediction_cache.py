@@ -0,0 +1,121 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_api'))
+from model_registry import ModelRegistry, ModelSpec
+from prediction_cache import CacheServer, LocalBackend, PredictionCache, SocketBackend, decode_array, encode_array
+
+
+@pytest.fixture
+def cache_server():
+    # Unix socket paths are limited to ~100 characters, shorter than pytest's tmp_path can be
+    directory = tempfile.mkdtemp(prefix='cache-')
+    server = CacheServer(os.path.join(directory, 'cache.sock'), max_entries=100)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    os.unlink(server.server_address)
+    os.rmdir(directory)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    for version in (1, 2):
+        (tmp_path / f'Model-v{version}.json').write_text(json.dumps({'score': version / 10}))
+
+    def load(path):
+        with open(path) as f:
+            return json.load(f)
+
+    return ModelRegistry(str(tmp_path), [
+        ModelSpec('fraud_model', 'Model', '.json', load,
+                  lambda model: lambda features: np.full((len(features), 1), model['score'], dtype=np.float32))])
+
+
+def test_entries_expire_after_their_ttl():
+    backend = LocalBackend()
+    backend.put(b'fraud_model\0a', np.ones(2), ttl=0.05)
+    backend.put(b'fraud_model\0b', np.ones(2), ttl=60)
+    np.testing.assert_array_equal(backend.get(b'fraud_model\0a'), np.ones(2))
+    time.sleep(0.1)
+    assert backend.get(b'fraud_model\0a') is None
+    assert backend.get(b'fraud_model\0b') is not None
+    assert len(backend) == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    backend = LocalBackend(max_entries=3)
+    for key in (b'a', b'b', b'c'):
+        backend.put(key, np.zeros(1), ttl=60)
+    backend.get(b'a')
+    backend.put(b'd', np.zeros(1), ttl=60)
+    assert len(backend) == 3
+    assert backend.get(b'b') is None
+    assert all(backend.get(key) is not None for key in (b'a', b'c', b'd'))
+
+
+def test_invalidate_drops_only_that_models_entries():
+    backend = LocalBackend()
+    for key in (b'fraud_model\0x', b'fraud_model\0y', b'fraud_model_v2\0x', b'creditcard_model\0x'):
+        backend.put(key, np.zeros(1), ttl=60)
+    backend.invalidate('fraud_model')
+    assert backend.get(b'fraud_model\0x') is None and backend.get(b'fraud_model\0y') is None
+    assert backend.get(b'fraud_model_v2\0x') is not None
+    assert backend.get(b'creditcard_model\0x') is not None
+
+
+@pytest.mark.parametrize('array', [
+    np.arange(6, dtype=np.float32).reshape(3, 2),
+    np.array([[0.25]], dtype=np.float64),
+    np.array([1, 0, 1], dtype=np.int8),
+    np.zeros((0, 4), dtype=np.float32),
+])
+def test_arrays_round_trip_through_the_socket_server(cache_server, array):
+    assert decode_array(encode_array(array)).dtype == array.dtype
+    backend = SocketBackend(cache_server.server_address, timeout=2)
+    backend.put(b'fraud_model\0k', array, ttl=60)
+    result = backend.get(b'fraud_model\0k')
+    assert result.dtype == array.dtype and result.shape == array.shape
+    np.testing.assert_array_equal(result, array)
+    assert backend.get(b'fraud_model\0missing') is None
+    backend.invalidate('fraud_model')
+    assert backend.get(b'fraud_model\0k') is None
+
+
+def test_unreachable_socket_is_a_miss(tmp_path):
+    backend = SocketBackend(str(tmp_path / 'none.sock'))
+    assert backend.get(b'fraud_model\0k') is None
+    backend.put(b'fraud_model\0k', np.zeros(1), ttl=60)
+
+
+@pytest.mark.parametrize('backend_kind', ['local', 'socket'])
+def test_cached_until_the_model_is_swapped(registry, cache_server, backend_kind):
+    backend = LocalBackend() if backend_kind == 'local' else SocketBackend(cache_server.server_address, timeout=2)
+    cache = PredictionCache(registry, backend)
+    calls = []
+
+    def compute(features):
+        calls.append(len(features))
+        return registry.predictor('fraud_model')(features)
+
+    features = np.ones((1, 3), dtype=np.float32)
+    np.testing.assert_allclose(cache.get_or_compute('fraud_model', features, compute), [[0.2]])
+    np.testing.assert_allclose(cache.get_or_compute('fraud_model', features.astype(np.float64), compute), [[0.2]])
+    assert len(calls) == 1
+    assert cache.get_or_compute('fraud_model', features + 1, compute) is not None
+    assert len(calls) == 2
+
+    key = cache.key('fraud_model', features)
+    registry.activate('fraud_model', 1)
+    # The swap dropped the old version's entries, not just changed the keys
+    assert backend.get(key) is None
+    np.testing.assert_allclose(cache.get_or_compute('fraud_model', features, compute), [[0.1]])
+    assert len(calls) == 3
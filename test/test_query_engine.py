@@ -0,0 +1,23 @@
+import importlib
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dashboard'))
+import query_engine
+
+
+def test_popcount_without_numpy_bitwise_count(monkeypatch):
+    mask = np.random.default_rng(0).random(1000) < 0.3
+    words = query_engine.pack_bitmap(mask)
+    assert query_engine.popcount(words) == mask.sum()
+
+    # NumPy 1.x has no bitwise_count; the fallback counts the same bits, also on strided words
+    monkeypatch.delattr(np, 'bitwise_count', raising=False)
+    fallback = importlib.reload(query_engine)
+    try:
+        assert fallback.popcount(words) == mask.sum()
+        assert fallback.popcount(words[::2]) == sum(bin(int(word)).count('1') for word in words[::2])
+    finally:
+        monkeypatch.undo()
+        importlib.reload(query_engine)
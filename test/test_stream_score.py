@@ -0,0 +1,115 @@
+import json
+import os
+import queue
+import sys
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'model_api'))
+from stream_score import QueueSource, StreamScorer, load_windows
+from scripts.feature_transformer import FraudFeatureTransformer
+from scripts.user_state import UserFeatureStore
+from benchmarks.synthetic import make_fraud_data
+
+
+class ListSink:
+    def __init__(self):
+        self.alerts = []
+
+    def write(self, alerts):
+        self.alerts.extend(alerts)
+
+
+def make_scorer(tmp_path, lines, sink=None, predict_fn=None):
+    transformer = FraudFeatureTransformer().fit(make_fraud_data(2000))
+    source = QueueSource(queue.Queue())
+    for line in lines:
+        source.queue.put(line)
+    source.queue.put(None)
+    predict_fn = predict_fn or (lambda features: np.zeros((len(features), 1), dtype=np.float32))
+    return StreamScorer(source, sink or ListSink(), transformer, predict_fn, burst_limit=1, snapshot_interval=0,
+                        user_state_path=str(tmp_path / 'user_state.npz'),
+                        window_state_path=str(tmp_path / 'windows.npz'))
+
+
+def transaction(**fields):
+    record = {'user_id': 7, 'device_id': 'DEV1', 'purchase_time': '2015-03-01 10:00:00', 'purchase_value': 40,
+              'source': 'SEO', 'browser': 'Chrome', 'sex': 'M', 'age': 30, 'country': 'Japan'}
+    record.update(fields)
+    return {key: value for key, value in record.items() if value is not ...}
+
+
+def test_invalid_records_are_counted_and_skipped(tmp_path):
+    lines = [
+        json.dumps(transaction()),
+        json.dumps(transaction(purchase_time=...)),
+        json.dumps(transaction(purchase_time='not a time')),
+        json.dumps(transaction(age='thirty')),
+        json.dumps(transaction(sex='X')),
+        json.dumps([1, 2, 3]),
+        '{"user_id": ',
+        json.dumps(transaction(purchase_time='2015-03-01 10:05:00')),
+    ]
+    scorer = make_scorer(tmp_path, lines)
+    assert scorer.run() == 2
+    assert scorer.errors == 6
+    # The second valid transaction is a burst for the user and the device
+    assert [alert['reasons'] for alert in scorer.sink.alerts] == [['user_burst', 'device_burst']]
+
+
+def test_state_is_saved_when_the_scorer_fails(tmp_path):
+    class FailingSink(ListSink):
+        def write(self, alerts):
+            raise OSError("disk full")
+
+    lines = [json.dumps(transaction(purchase_time=f'2015-03-01 10:0{i}:00')) for i in range(3)]
+    scorer = make_scorer(tmp_path, lines, sink=FailingSink())
+    with pytest.raises(OSError):
+        scorer.run()
+    assert 7 in UserFeatureStore.load(str(tmp_path / 'user_state.npz')).slots
+    user_windows, _ = load_windows(str(tmp_path / 'windows.npz'), scorer.window_seconds)
+    assert len(user_windows) == 1
+
+
+def test_a_failing_batch_does_not_stop_the_stream(tmp_path):
+    calls = []
+
+    def predict_fn(features):
+        calls.append(len(features))
+        if len(calls) == 1:
+            raise RuntimeError("model failure")
+        return np.zeros((len(features), 1), dtype=np.float32)
+
+    lines = [json.dumps(transaction(purchase_time=f'2015-03-01 10:0{i}:00')) for i in range(3)]
+    scorer = make_scorer(tmp_path, lines, predict_fn=predict_fn)
+    scorer.batch_size = 1
+    scorer.features = scorer.features[:1]
+    assert scorer.run() == 2
+    assert scorer.errors == 1
+
+
+def test_window_snapshot_survives_a_restart_with_missing_ids(tmp_path):
+    lines = [json.dumps(transaction(device_id=None)),
+             json.dumps(transaction(user_id=None, device_id='DEV2', purchase_time='2015-03-01 10:01:00')),
+             json.dumps(transaction(user_id='u-8', device_id=None, purchase_time='2015-03-01 10:02:00'))]
+    scorer = make_scorer(tmp_path, lines)
+    assert scorer.run() == 3
+    assert scorer.errors == 0
+
+    # The restarted scorer loads the snapshot and keeps counting the same ids
+    restarted = make_scorer(tmp_path, [json.dumps(transaction(user_id=None, purchase_time='2015-03-01 10:03:00')),
+                                       json.dumps(transaction(device_id='DEV2', purchase_time='2015-03-01 10:04:00'))])
+    assert sorted(restarted.user_windows.events) == ['7', 'u-8']
+    assert sorted(restarted.device_windows.events) == ['DEV2']
+    assert restarted.run() == 2
+    assert [alert['reasons'] for alert in restarted.sink.alerts] == [['user_burst', 'device_burst']]
+
+
+def test_snapshot_evicts_idle_devices_without_users(tmp_path):
+    lines = [json.dumps(transaction(user_id=None, device_id='OLD', purchase_time='2015-03-01 10:00:00')),
+             json.dumps(transaction(user_id=None, device_id='NEW', purchase_time='2015-03-02 10:00:00'))]
+    scorer = make_scorer(tmp_path, lines)
+    assert scorer.run() == 2
+    assert list(scorer.device_windows.events) == ['NEW']
@@ -0,0 +1,54 @@
+import os
+import sys
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'model_api'))
+from inference import creditcard_model_path, load_creditcard_model
+from tree_scorer import CompiledTree
+from benchmarks.bench_tree_scorer import make_features
+
+
+def assert_identical(model, compiled, X):
+    # Batch path
+    np.testing.assert_array_equal(compiled.predict_proba(X), model.predict_proba(X))
+    np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+    # Single-row path, with the row given as a 1D and as a 2D array
+    for row in X[:200]:
+        expected = model.predict_proba(row.reshape(1, -1))
+        np.testing.assert_array_equal(compiled.predict_proba(row), expected)
+        np.testing.assert_array_equal(compiled.predict_proba(row.reshape(1, -1)), expected)
+        np.testing.assert_array_equal(compiled.predict(row), model.predict(row.reshape(1, -1)))
+
+
+def test_shipped_credit_card_model():
+    model = load_creditcard_model(os.path.join(ROOT, creditcard_model_path), backend='sklearn')
+    compiled = CompiledTree.from_sklearn(model)
+    X = make_features(model, 20_000)
+    assert len(np.unique(compiled.apply(X))) > 1
+    assert_identical(model, compiled, X)
+    # float64 input is cast to float32 as sklearn does, including values on the thresholds
+    tree = model.tree_
+    X64 = X.astype(np.float64)
+    split_nodes = np.flatnonzero(tree.feature >= 0)
+    X64[:len(split_nodes), tree.feature[split_nodes]] = tree.threshold[split_nodes]
+    assert_identical(model, compiled, X64)
+    with pytest.raises(ValueError, match="the model expects 32"):
+        compiled.predict_proba(X[:, :30])
+
+
+def test_small_fitted_tree_with_missing_values_and_string_classes():
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((500, 5)).astype(np.float32)
+    y = np.where(X[:, 0] + X[:, 1] > 0.5, 'fraud', np.where(X[:, 2] > 0, 'review', 'ok'))
+    X[rng.random(X.shape) < 0.1] = np.nan
+    model = DecisionTreeClassifier(max_depth=6, random_state=0).fit(X, y)
+    compiled = CompiledTree.from_sklearn(model)
+
+    X_new = rng.standard_normal((1000, 5)).astype(np.float32)
+    X_new[rng.random(X_new.shape) < 0.1] = np.nan
+    assert_identical(model, compiled, X_new)
+    assert set(compiled.predict(X_new)) <= {'fraud', 'ok', 'review'}
@@ -0,0 +1,60 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts import user_state
+from scripts.user_state import UserFeatureStore, check_parity
+from benchmarks.synthetic import make_fraud_data
+
+
+@pytest.fixture
+def fraud_data():
+    # Repeat users across rows whose purchase times are not in order, per user or overall
+    data = make_fraud_data(3000)
+    data['user_id'] = data['user_id'] % 400
+    assert not data.sort_values('user_id', kind='stable')['purchase_time'].is_monotonic_increasing
+    return data
+
+
+def test_incremental_and_bulk_state_match_the_batch_features(fraud_data):
+    check_parity(fraud_data)
+    check_parity(fraud_data, UserFeatureStore.from_frame(fraud_data))
+
+    # Chunks fed newest first still give the batch result
+    store = UserFeatureStore(capacity=16)
+    newest_first = fraud_data.sort_values('purchase_time', ascending=False)
+    for start in range(0, len(newest_first), 700):
+        store.update_frame(newest_first.iloc[start:start + 700])
+    check_parity(fraud_data, store)
+
+
+def test_snapshot_round_trip(fraud_data, tmp_path):
+    store = check_parity(fraud_data)
+    store.save(str(tmp_path / 'user_state.npz'))
+    loaded = UserFeatureStore.load(str(tmp_path / 'user_state.npz'))
+
+    assert loaded.user_ids == store.user_ids
+    check_parity(fraud_data, loaded)
+    # A loaded store keeps updating like the original, including with an earlier purchase
+    for updated in (store, loaded):
+        updated.update(5, '2014-12-31 23:00:00', 10)
+        updated.update(100_000, '2015-06-01 12:00:00', 10)
+    for user_id in (5, 100_000, fraud_data['user_id'].iloc[0]):
+        assert loaded.features(user_id) == store.features(user_id)
+        assert loaded.peek(user_id, '2016-01-01') == store.peek(user_id, '2016-01-01')
+
+
+def test_parity_check_catches_a_stale_store(fraud_data):
+    store = UserFeatureStore.from_frame(fraud_data.iloc[1:])
+    with pytest.raises(AssertionError, match="transaction_frequency"):
+        check_parity(fraud_data, store)
+
+
+def test_cli_check_writes_the_snapshot(fraud_data, tmp_path, monkeypatch, capsys):
+    fraud_data.to_csv(tmp_path / 'fraud.csv', index=False)
+    monkeypatch.setattr(sys, 'argv', ['user_state.py', '--input', str(tmp_path / 'fraud.csv'),
+                                      '--output', str(tmp_path / 'user_state.npz'), '--check'])
+    user_state.main()
+    assert "Parity check passed" in capsys.readouterr().out
+    assert len(UserFeatureStore.load(str(tmp_path / 'user_state.npz'))) == fraud_data['user_id'].nunique()